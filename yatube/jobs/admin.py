@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "func", "queue", "priority", "status", "attempts", "run_at")
+    list_filter = ("status", "queue")
+    search_fields = ("func",)
+    actions = ("retry",)
+
+    @admin.action(description="Повторить выбранные задачи")
+    def retry(self, request, queryset):
+        queryset.update(status=Job.QUEUED, attempts=0, last_error="", locked_by="", locked_until=None)
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,88 @@
+"""
+Отправка писем через очередь задач.
+
+QueuedEmailBackend (EMAIL_BACKEND) не отправляет письмо в запросе, а
+ставит задачу deliver с письмом в JSON; обработчик отправляет его через
+JOBS_EMAIL_BACKEND и при ошибке повторяет отправку.
+"""
+import base64
+from email import message_from_string
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import queue
+
+
+def serialize(message):
+    """
+    EmailMessage -> словарь для JSON
+    """
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, tuple):
+            filename, content, mimetype = attachment
+            if isinstance(content, str):
+                attachments.append({'filename': filename, 'text': content, 'mimetype': mimetype})
+            else:
+                attachments.append({
+                    'filename': filename,
+                    'base64': base64.b64encode(content).decode(),
+                    'mimetype': mimetype,
+                })
+        else:
+            attachments.append({'mime': attachment.as_string()})
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'content_subtype': message.content_subtype,
+        'alternatives': [list(alternative) for alternative in getattr(message, 'alternatives', ())],
+        'attachments': attachments,
+    }
+
+
+def deserialize(data):
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(alternative) for alternative in data['alternatives']],
+    )
+    message.content_subtype = data['content_subtype']
+    for attachment in data['attachments']:
+        if 'mime' in attachment:
+            message.attach(message_from_string(attachment['mime']))
+        elif 'base64' in attachment:
+            content = base64.b64decode(attachment['base64'])
+            message.attach(attachment['filename'], content, attachment['mimetype'])
+        else:
+            message.attach(attachment['filename'], attachment['text'], attachment['mimetype'])
+    return message
+
+
+def deliver(data):
+    """
+    Задача: отправить письмо; ошибка отправки - повтор задачи
+    """
+    with get_connection(settings.JOBS_EMAIL_BACKEND, fail_silently=False) as connection:
+        connection.send_messages([deserialize(data)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            queue.enqueue(deliver, serialize(message), queue='mail', priority=10)
+        return len(email_messages)
@@ -0,0 +1,66 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queues',
+            nargs='+',
+            help='Брать задачи только из этих очередей (по умолчанию - из всех)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Сколько задач выполнять одновременно (потоков обработчика)',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда в очереди не останется готовых задач',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда задач нет',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            # SIGTERM и Ctrl+C: дописать текущие задачи и выйти
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: stop.set())
+
+        work_options = {'queues': options['queues'], 'burst': options['burst'], 'stop': stop, 'sleep': options['sleep']}
+        if options['concurrency'] <= 1:
+            done = queue.work(**work_options)
+        else:
+            results = []
+
+            def thread_work():
+                try:
+                    results.append(queue.work(**work_options))
+                finally:
+                    connections.close_all()
+
+            threads = [
+                threading.Thread(target=thread_work, name=f'runworker-{number}')
+                for number in range(options['concurrency'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            done = sum(results)
+
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
@@ -0,0 +1,53 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди (jobs/queue.py)
+
+    func: путь к функции, например posts.thumbnails.generate
+    args, kwargs: аргументы функции в JSON
+    queue: имя очереди, для очереди можно ограничить число задач,
+        выполняемых одновременно (JOBS_QUEUE_CONCURRENCY)
+    priority: задачи с большим приоритетом выбираются первыми
+    status: в очереди, выполняется или окончательно не удалась;
+        выполненные задачи удаляются
+    run_at: не раньше какого времени выполнять, отодвигается при повторах
+    attempts: сколько раз задачу брали в работу
+    max_attempts: после стольких неудач задача больше не повторяется
+    unique_key: пока в очереди есть задача с таким ключом, такая же
+        задача не добавляется
+    locked_by, locked_until: какой обработчик выполняет задачу и до
+        какого времени; после этого задача считается брошенной
+    last_error: трассировка последней ошибки
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = ((QUEUED, "в очереди"), (RUNNING, "выполняется"), (FAILED, "не удалась"))
+
+    func = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=50, default="default")
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    unique_key = models.CharField(max_length=200, blank=True, default="")
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "queue", "-priority", "run_at"], name="job_pick_idx"),
+            models.Index(fields=["unique_key"], name="job_unique_key_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.func} #{self.pk}"
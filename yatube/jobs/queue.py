@@ -0,0 +1,189 @@
+"""
+Очередь фоновых задач в таблице базы данных (модель Job), без внешнего
+брокера.
+
+enqueue() добавляет задачу строкой в текущей транзакции: если
+транзакция откатится, задачи тоже не будет, а после фиксации ее
+выполнит обработчик manage.py runworker. Задача - функция модуля с
+аргументами, которые сохраняются в JSON.
+
+Обработчик берет задачу условным UPDATE (status='queued' -> 'running'),
+поэтому одну задачу не возьмут два обработчика, даже без SELECT ... FOR
+UPDATE. Сначала берутся задачи с большим приоритетом, затем более
+старые. Для очереди можно ограничить число задач, выполняемых
+одновременно всеми обработчиками (JOBS_QUEUE_CONCURRENCY). Задача
+держится за обработчиком JOBS_LEASE секунд; если обработчик за это
+время пропал, задача возвращается в очередь.
+
+Выполненная задача удаляется. Упавшая повторяется через
+JOBS_RETRY_DELAY * 2 ** (попытка - 1) секунд, но не позже
+JOBS_RETRY_MAX_DELAY, после max_attempts попыток остается со статусом
+failed и трассировкой ошибки (повторить можно из админки).
+
+JOBS_EAGER = True выполняет задачи сразу после фиксации транзакции в
+том же процессе - для разработки без обработчика.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+CANDIDATES = 10
+
+
+def func_path(func):
+    """
+    Функция или путь к ней -> путь для сохранения в задаче
+    """
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, queue=DEFAULT_QUEUE, priority=0, delay=0, max_attempts=None, unique_key='', **kwargs):
+    """
+    Поставить в очередь вызов func(*args, **kwargs); задача или None,
+    если задача с тем же unique_key еще ждет в очереди или включен
+    JOBS_EAGER
+    """
+    path = func_path(func)
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: import_string(path)(*args, **kwargs))
+        return None
+    if unique_key and Job.objects.filter(unique_key=unique_key, status=Job.QUEUED).exists():
+        return None
+    return Job.objects.create(
+        func=path,
+        args=list(args),
+        kwargs=kwargs,
+        queue=queue,
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        unique_key=unique_key,
+    )
+
+
+def retry_delay(attempts):
+    """
+    Через сколько секунд повторить задачу после attempts неудачных попыток
+    """
+    return min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_DELAY)
+
+
+def requeue_expired():
+    """
+    Вернуть в очередь задачи пропавших обработчиков; число задач
+    """
+    now = timezone.now()
+    expired = Job.objects.filter(status=Job.RUNNING, locked_until__lt=now)
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_until=None, last_error='Обработчик не завершил задачу',
+    )
+    return failed + expired.update(status=Job.QUEUED, locked_by='', locked_until=None)
+
+
+def _at_capacity(queue):
+    """
+    Условие "в очереди уже выполняется предельное число задач" или None,
+    если предела нет
+    """
+    limit = settings.JOBS_QUEUE_CONCURRENCY.get(queue)
+    if limit is None:
+        return None
+    running = Job.objects.filter(queue=queue, status=Job.RUNNING).order_by().values('pk')
+    return Exists(running[limit - 1:limit])
+
+
+def claim(worker, queues=None):
+    """
+    Взять в работу следующую задачу из queues (None - из всех); задача
+    или None, если брать нечего
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+    if queues:
+        candidates = candidates.filter(queue__in=queues)
+    candidates = candidates.order_by('-priority', 'run_at', 'pk').values_list('pk', 'queue')
+
+    for pk, queue in candidates[:CANDIDATES]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED)
+        at_capacity = _at_capacity(queue)
+        if at_capacity is not None:
+            # проверка предела - в том же UPDATE, что и захват задачи
+            claimed = claimed.filter(~at_capacity)
+        updated = claimed.update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=settings.JOBS_LEASE),
+            attempts=F('attempts') + 1,
+        )
+        if updated:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """
+    Выполнить взятую задачу; True, если она выполнена
+    """
+    try:
+        import_string(job.func)(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+        if job.attempts >= job.max_attempts:
+            logger.exception('Задача %s не выполнена после %s попыток', job, job.attempts)
+            mine.update(status=Job.FAILED, locked_by='', locked_until=None, last_error=error)
+        else:
+            logger.warning('Задача %s не выполнена, попытка %s', job, job.attempts)
+            mine.update(
+                status=Job.QUEUED,
+                locked_by='',
+                locked_until=None,
+                last_error=error,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+    return True
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}'
+
+
+def work(queues=None, burst=False, stop=None, sleep=1):
+    """
+    Цикл обработчика: брать и выполнять задачи, пока не установлен stop
+    (threading.Event); с burst=True - пока в очереди есть задачи.
+    Число выполненных задач.
+    """
+    name, done = worker_name(), 0
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        close_old_connections()
+        requeue_expired()
+        job = claim(name, queues)
+        if job is None:
+            if burst:
+                break
+            stop.wait(sleep)
+            continue
+        run(job)
+        done += 1
+    return done
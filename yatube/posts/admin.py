@@ -1,5 +1,22 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.db import models
+
+from .images import ImageField
 from .models import Post, Group
+from .search import search_posts
+
+
+class SearchChangeList(ChangeList):
+    """
+    Список постов, в котором результаты поиска идут по rank из
+    search_posts(), пока не выбрана сортировка по колонке
+    """
+
+    def get_ordering(self, request, queryset):
+        if self.query.strip() and ORDER_VAR not in self.params:
+            return ["-rank", "-pub_date", "-pk"]
+        return super().get_ordering(request, queryset)
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -7,6 +24,16 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
+    formfield_overrides = {models.ImageField: {'form_class': ImageField}}
+
+    def get_changelist(self, request, **kwargs):
+        return SearchChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        # поиск по полнотекстовому индексу вместо LIKE '%...%' по search_fields
+        if not search_term.strip():
+            return queryset, False
+        return search_posts(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
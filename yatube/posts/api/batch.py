@@ -0,0 +1,248 @@
+"""
+Пакетная запись: до BATCH_MAX_OPERATIONS операций create/update/delete
+над постами, комментариями и подписками за один запрос.
+
+POST /api/v1/batch/
+{"operations": [
+    {"op": "create", "model": "post", "data": {"text": "..."}},
+    {"op": "update", "model": "post", "id": 1, "data": {"text": "..."}},
+    {"op": "create", "model": "comment", "post": 1, "data": {"text": "..."}},
+    {"op": "delete", "model": "follow", "id": 3}
+]}
+
+Все операции проверяются существующими сериализаторами до записи. Если
+хотя бы одна не прошла проверку, ничего не пишется и ответ 400 содержит
+результат по каждой операции. Иначе операции выполняются по порядку в
+одной транзакции, подряд идущие однотипные - одним bulk-запросом
+(posts/bulk.py), и ответ 200 содержит результат по каждой операции.
+
+Если запись нарушила ограничение базы - например, параллельный запрос
+успел создать ту же подписку или удалить пост, - транзакция
+откатывается, операции, на которых это случилось, получают 409, а
+остальные - 'not applied'.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from posts import bulk
+from posts.api.serializer import CommentSerializer, FollowSerializer, PostSerializer
+from posts.models import Comment, Follow, Post
+
+MODELS = {
+    'post': (Post, PostSerializer),
+    'comment': (Comment, CommentSerializer),
+    'follow': (Follow, FollowSerializer),
+}
+
+OPERATIONS = {
+    'post': ('create', 'update', 'delete'),
+    'comment': ('create', 'update', 'delete'),
+    'follow': ('create', 'delete'),
+}
+
+
+class OperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=('create', 'update', 'delete'))
+    model = serializers.ChoiceField(choices=tuple(MODELS))
+    id = serializers.IntegerField(required=False, min_value=1)
+    post = serializers.IntegerField(required=False, min_value=1)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['op'] not in OPERATIONS[attrs['model']]:
+            raise serializers.ValidationError(f"Operation '{attrs['op']}' is not allowed for {attrs['model']}.")
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError({'id': 'This field is required.'})
+        if attrs['model'] == 'comment' and attrs['op'] == 'create' and 'post' not in attrs:
+            raise serializers.ValidationError({'post': 'This field is required.'})
+        return attrs
+
+
+class BatchSerializer(serializers.Serializer):
+    operations = OperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > settings.BATCH_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f'Ensure this field has no more than {settings.BATCH_MAX_OPERATIONS} elements.'
+            )
+        return operations
+
+
+class Operation:
+    """
+    Проверенная операция пакета, готовая к записи
+    """
+
+    def __init__(self, index, op, model, instance=None, serializer=None):
+        self.index = index
+        self.op = op
+        self.model = model
+        self.instance = instance
+        self.serializer = serializer
+        self.fields = ()
+
+
+class BatchView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        batch = BatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        operations = batch.validated_data['operations']
+
+        results, prepared = self.prepare(operations)
+        if any('errors' in result for result in results):
+            for result in results:
+                result.setdefault('status', 'not applied')
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        conflicts = self.apply(prepared)
+        if conflicts is not None:
+            for operation in prepared:
+                if operation.index in conflicts:
+                    results[operation.index] = {'status': 409, 'errors': {'detail': 'Conflicts with a concurrent change.'}}
+                else:
+                    results[operation.index] = {'status': 'not applied'}
+            return Response({'results': results}, status=status.HTTP_409_CONFLICT)
+
+        for operation in prepared:
+            results[operation.index] = self.result(operation)
+        return Response({'results': results})
+
+    def apply(self, prepared):
+        """
+        Записать операции одной транзакцией; None - если она закоммичена,
+        иначе индексы операций, нарушивших ограничения базы
+        """
+        conflicts = set()
+        try:
+            with transaction.atomic():
+                for (model, op), run in groupby(prepared, key=lambda item: (item.model, item.op)):
+                    run = list(run)
+                    try:
+                        with transaction.atomic():
+                            self.write(model, op, run)
+                    except IntegrityError:
+                        conflicts = self.find_conflicts(model, op, run)
+                        raise
+        except IntegrityError:
+            # отложенные внешние ключи проверяются только при коммите,
+            # тогда виноватую операцию уже не найти - конфликтуют все
+            return conflicts or {operation.index for operation in prepared}
+        return None
+
+    def find_conflicts(self, model, op, run):
+        """
+        Повторить bulk-запрос, нарушивший ограничение, по одной операции:
+        каждая в своей точке сохранения, все откатится вместе с пакетом
+        """
+        conflicts = set()
+        for operation in run:
+            try:
+                with transaction.atomic():
+                    self.write(model, op, [operation])
+            except IntegrityError:
+                conflicts.add(operation.index)
+        return conflicts
+
+    def prepare(self, operations):
+        """
+        Проверка всех операций до записи: права, существование объектов,
+        данные - сериализаторами API
+        """
+        instances = self.fetch_instances(operations)
+        posts = Post.objects.in_bulk({item['post'] for item in operations if 'post' in item})
+        results = [{} for _ in operations]
+        prepared = []
+        seen = set()
+        # посты, удаленные раньше в этом же пакете, вместе со своими комментариями
+        deleted_posts = set()
+        for index, item in enumerate(operations):
+            op, model_name = item['op'], item['model']
+            model, serializer_class = MODELS[model_name]
+            context = {'request': self.request, 'view': self}
+
+            if op == 'create':
+                data = {key: value for key, value in item['data'].items() if key != 'user'}
+                serializer = serializer_class(data=data, context=context)
+                instance = None
+            else:
+                instance = instances[model].get(item['id'])
+                if instance is None:
+                    results[index] = {'status': 404, 'errors': {'detail': 'Not found.'}}
+                    continue
+                owner = instance.user_id if model is Follow else instance.author_id
+                if owner != self.request.user.pk:
+                    results[index] = {'status': 403, 'errors': {'detail': 'You do not have permission to perform this action.'}}
+                    continue
+                if model is Comment and instance.post_id in deleted_posts:
+                    results[index] = {'status': 404, 'errors': {'detail': 'Not found.'}}
+                    continue
+                if (model, instance.pk) in seen:
+                    results[index] = {'status': 400, 'errors': {'id': 'Object is already changed in this batch.'}}
+                    continue
+                seen.add((model, instance.pk))
+                serializer = serializer_class(instance, data=item['data'], partial=True, context=context) if op == 'update' else None
+
+            if serializer is not None and not serializer.is_valid():
+                results[index] = {'status': 400, 'errors': serializer.errors}
+                continue
+
+            operation = Operation(index, op, model, instance, serializer)
+            if op == 'create':
+                operation.instance = model(**serializer.validated_data)
+                if model is Follow:
+                    operation.instance.user = self.request.user
+                    key = (Follow, 'author', operation.instance.author_id)
+                    if key in seen:
+                        results[index] = {'status': 400, 'errors': {'author': 'Subscription is already in this batch.'}}
+                        continue
+                    seen.add(key)
+                else:
+                    operation.instance.author = self.request.user
+                if model is Comment:
+                    post = posts.get(item['post'])
+                    if post is None or post.pk in deleted_posts:
+                        results[index] = {'status': 404, 'errors': {'post': 'Not found.'}}
+                        continue
+                    operation.instance.post = post
+            elif op == 'update':
+                for field, value in serializer.validated_data.items():
+                    setattr(instance, field, value)
+                operation.fields = tuple(serializer.validated_data)
+            elif model is Post:
+                deleted_posts.add(instance.pk)
+            prepared.append(operation)
+        return results, prepared
+
+    def fetch_instances(self, operations):
+        ids = {model: set() for model, _ in MODELS.values()}
+        for item in operations:
+            if item['op'] != 'create':
+                ids[MODELS[item['model']][0]].add(item['id'])
+        return {model: model.objects.in_bulk(model_ids) if model_ids else {} for model, model_ids in ids.items()}
+
+    def write(self, model, op, run):
+        if op == 'create':
+            bulk.create(operation.instance for operation in run)
+        elif op == 'update':
+            bulk.update(
+                [operation.instance for operation in run],
+                {field for operation in run for field in operation.fields},
+            )
+        else:
+            model.objects.filter(pk__in=[operation.instance.pk for operation in run]).delete()
+
+    def result(self, operation):
+        if operation.op == 'delete':
+            return {'status': 204, 'id': operation.instance.pk}
+        _, serializer_class = MODELS[operation.model._meta.model_name]
+        data = serializer_class(operation.instance, context={'request': self.request}).data
+        return {'status': 201 if operation.op == 'create' else 200, 'data': data}
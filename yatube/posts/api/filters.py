@@ -1,5 +1,8 @@
 from django_filters import rest_framework as filters
-from posts.models import Post
+from rest_framework.filters import BaseFilterBackend
+
+from posts.models import Comment, Post
+from posts.search import search_posts
 
 
 class PostFilter(filters.FilterSet):
@@ -9,3 +12,25 @@ class PostFilter(filters.FilterSet):
     class Meta:
         model = Post
         fields = ['date_from', 'date_to']
+
+
+class CommentFilter(filters.FilterSet):
+    date_from = filters.DateTimeFilter(field_name="created", lookup_expr='gte')
+    date_to = filters.DateTimeFilter(field_name="created", lookup_expr='lte')
+
+    class Meta:
+        model = Comment
+        fields = ['date_from', 'date_to']
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по ?q=, результаты упорядочены по релевантности
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_posts(queryset, query)
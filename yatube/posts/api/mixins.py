@@ -0,0 +1,26 @@
+from posts import page_cache
+
+
+class ConditionalMixin:
+    """
+    Условные GET для list/retrieve: ETag и Last-Modified строятся из
+    версий областей кэша (posts/page_cache.py), на совпадающие
+    If-None-Match/If-Modified-Since отвечаем 304 без запроса к базе и
+    сериализации. Проверки доступа выполняются до этого, в initial().
+    """
+    condition_scopes = ()
+
+    def get_condition_scopes(self):
+        return list(self.condition_scopes)
+
+    def conditional(self, request, respond):
+        etag, last_modified = page_cache.validators(
+            request, self.get_condition_scopes(), request.accepted_media_type,
+        )
+        return page_cache.conditional_response(request, etag, last_modified, respond)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, lambda: super(ConditionalMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, lambda: super(ConditionalMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from posts.pagination import InvalidCursor, KeysetPaginator
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация API по курсору: ответ содержит next/previous c
+    непрозрачным ?cursor= и не считает COUNT(*) по таблице
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    keys = ('pub_date', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(queryset, self.page_size, self.keys)
+        try:
+            self.page = paginator.page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.get_cursor_link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self.get_cursor_link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class PostCursorPagination(KeysetPagination):
+    keys = ('pub_date', 'id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    keys = ('created', 'id')
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Результаты поиска упорядочены по релевантности, а не по дате,
+    поэтому листаются по номерам страниц
+    """
+    page_size = api_settings.PAGE_SIZE
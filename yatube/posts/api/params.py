@@ -0,0 +1,40 @@
+"""
+Параметры чтения постов в API.
+
+?fields=id,text - только перечисленные поля (и только их колонки);
+?embed=comments или ?embed=comments:N - последние N комментариев
+каждого поста внутри ответа, одним дополнительным запросом.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+
+def requested_fields(request, available):
+    """
+    Поля из ?fields= в порядке сериализатора, None - все поля
+    """
+    value = request.query_params.get('fields')
+    if value is None:
+        return None
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = fields - set(available)
+    if not fields or unknown:
+        raise ValidationError({'fields': [f"Unknown fields: {', '.join(sorted(unknown)) or value!r}."]})
+    return tuple(name for name in available if name in fields)
+
+
+def embedded_comments(request):
+    """
+    Сколько последних комментариев встроить в каждый пост, None - не встраивать
+    """
+    value = request.query_params.get('embed')
+    if not value:
+        return None
+    name, _, limit = value.partition(':')
+    if name != 'comments':
+        raise ValidationError({'embed': ["Only 'comments' can be embedded."]})
+    if not limit:
+        return settings.API_EMBED_COMMENTS
+    if not limit.isdigit() or not 1 <= int(limit) <= settings.API_EMBED_COMMENTS_MAX:
+        raise ValidationError({'embed': [f'Comments limit must be from 1 to {settings.API_EMBED_COMMENTS_MAX}.']})
+    return int(limit)
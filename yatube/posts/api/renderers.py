@@ -0,0 +1,26 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson не обязателен
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON для данных из простых типов (str, int, None, dict, list):
+    orjson, если он установлен, иначе json без DRF-кодировщика.
+    Результат побайтно совпадает с компактным JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is not None:
+            ret = orjson.dumps(data)
+        else:
+            ret = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+        # как и JSONRenderer, экранируем разделители строк, недопустимые в JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -1,8 +1,10 @@
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.validators import UniqueTogetherValidator
 
-from posts.models import Post, Comment, Group, Follow, User
+from posts.images import ImageField
+from posts.models import Post, Comment, Group, Follow, Recommendation, User
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -16,13 +18,26 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 class PostSerializer(serializers.ModelSerializer):
+    """
+    context['fields'] - только эти поля, context['embed_comments'] -
+    добавить поле comments с последними комментариями (latest_comments)
+    """
     author = serializers.SlugRelatedField(slug_field='username', read_only=True)
+    image = serializers.ImageField(required=False, allow_null=True, _DjangoImageField=ImageField)
     permission_classes = [IsAuthenticated]
-    # comments = CommentSerializer(many=True, required=False)
 
     class Meta:
         model = Post
-        fields = '__all__'
+        fields = ('id', 'author', 'text', 'pub_date', 'image', 'group')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if self.context.get('embed_comments'):
+            self.fields['comments'] = CommentSerializer(many=True, read_only=True, source='latest_comments')
 
 
 class GroupSerializer(serializers.ModelSerializer):
@@ -61,3 +76,32 @@ class FollowSerializer(serializers.ModelSerializer):
         if data['user'] == data['author']:
             raise serializers.ValidationError("You can't subscribe to yourself.")
         return data
+
+
+class RecommendationSerializer(serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(slug_field='username', read_only=True)
+
+    class Meta:
+        model = Recommendation
+        fields = ('author', 'score', 'shared_follows')
+
+
+class FollowBulkSerializer(serializers.Serializer):
+    follow = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list, max_length=settings.FOLLOW_BULK_MAX,
+    )
+    unfollow = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list, max_length=settings.FOLLOW_BULK_MAX,
+    )
+
+    def validate(self, data):
+        if not data['follow'] and not data['unfollow']:
+            raise serializers.ValidationError('Nothing to follow or unfollow.')
+        if set(data['follow']) & set(data['unfollow']):
+            raise serializers.ValidationError('The same author cannot be followed and unfollowed.')
+        return data
+
+
+class FollowImportSerializer(serializers.Serializer):
+    authors = serializers.ListField(child=serializers.CharField(), max_length=settings.FOLLOW_IMPORT_MAX)
+    replace = serializers.BooleanField(default=False)
@@ -0,0 +1,74 @@
+"""
+Синхронизация локальной копии клиента по журналу изменений
+(posts/changelog.py).
+
+GET /api/v1/sync/ - текущий курсор: клиент запоминает его, загружает
+ленту обычными списками и дальше спрашивает только изменения.
+GET /api/v1/sync/?since=<курсор>
+{"cursor": 42, "more": false,
+ "posts": {"created": [...], "updated": [...], "deleted": [1, 2]},
+ "comments": {...}, "follows": {...}}
+
+Объекты отдаются в текущем состоянии в формате списков API, удаленные -
+только pk. За один ответ читается не больше SYNC_PAGE_SIZE записей
+журнала; при "more": true клиент сразу спрашивает снова с новым
+курсором. Если журнал после курсора уже вычищен, ответ 410 - клиенту
+нужно загрузить копию заново.
+"""
+from django.conf import settings
+from rest_framework import serializers, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from posts import changelog
+from posts.api.renderers import FastJSONRenderer
+from posts.api.values import CommentValuesSerializer, FollowValuesSerializer, PostValuesSerializer
+from posts.models import ChangeLog, Comment, Follow, Post
+
+SECTIONS = (
+    ('posts', ChangeLog.POST, Post, PostValuesSerializer),
+    ('comments', ChangeLog.COMMENT, Comment, CommentValuesSerializer),
+    ('follows', ChangeLog.FOLLOW, Follow, FollowValuesSerializer),
+)
+
+
+class SyncParamsSerializer(serializers.Serializer):
+    since = serializers.IntegerField(required=False, min_value=0)
+
+
+class SyncView(APIView):
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (FastJSONRenderer,)
+
+    def get(self, request):
+        params = SyncParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        since = params.validated_data.get('since')
+        if since is None:
+            return Response({'cursor': changelog.safe_cursor()})
+
+        try:
+            cursor, more, changes = changelog.changes(request.user, since, settings.SYNC_PAGE_SIZE)
+        except changelog.CursorExpired:
+            return Response(
+                {'detail': 'Cursor has expired, download the data again.'}, status=status.HTTP_410_GONE
+            )
+
+        data = {'cursor': cursor, 'more': more}
+        for name, model_name, model, serializer_class in SECTIONS:
+            data[name] = self.section(model, serializer_class, changes[model_name])
+        return Response(data)
+
+    def section(self, model, serializer_class, actions):
+        section = {'created': [], 'updated': [], 'deleted': []}
+        alive = [pk for pk, action in actions.items() if action != ChangeLog.DELETED]
+        if alive:
+            queryset = model.objects.filter(pk__in=alive).order_by('id')
+            if model is Follow:
+                queryset = queryset.filter(user=self.request.user)
+            serializer = serializer_class(self.request)
+            for item in serializer.serialize(serializer.values(queryset)):
+                section[actions[item['id']]].append(item)
+        section['deleted'] = sorted(pk for pk, action in actions.items() if action == ChangeLog.DELETED)
+        return section
@@ -0,0 +1,131 @@
+"""
+Ограничение частоты запросов к API со скользящим окном.
+
+Вместо списка времен всех запросов (как в throttling DRF) на ключ
+хранятся два счетчика - за текущее и предыдущее окно длиной duration.
+Оценка числа запросов за последние duration секунд:
+
+    предыдущее * (1 - прошедшая доля текущего окна) + текущее
+
+Счетчики лежат в общем для всех процессов кэше
+settings.THROTTLE_CACHE_ALIAS и увеличиваются атомарным incr(), поэтому
+лимит общий для всех воркеров, а проверка стоит одной записи и одного
+чтения независимо от лимита.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    timer = time.time
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def get_rate(self):
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def get_ident_key(self, request):
+        """
+        Пользователь для авторизованных запросов, адрес - для анонимных
+        """
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def _incr(self, key, delta=1):
+        cache = self.cache
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            if cache.add(key, delta, self.duration * 2):
+                return delta
+            return cache.incr(key, delta)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, elapsed = divmod(self.now, self.duration)
+        current_key, previous_key = f'{self.key}:{int(window)}', f'{self.key}:{int(window) - 1}'
+        self.weight = 1 - elapsed / self.duration
+
+        # сначала занимаем место, потом проверяем: incr атомарен, поэтому
+        # одновременные запросы не пропустят больше лимита
+        self.current = self._incr(current_key)
+        self.previous = self.cache.get(previous_key, 0)
+        if self.previous * self.weight + self.current <= self.num_requests:
+            return True
+        self._incr(current_key, -1)
+        self.current -= 1
+        return self.throttle_failure()
+
+    def wait(self):
+        """
+        Через сколько секунд оценка опустится ниже лимита
+        """
+        elapsed = (1 - self.weight) * self.duration
+        if self.current >= self.num_requests or not self.previous:
+            return self.duration - elapsed
+        # предыдущее окно должно "вытечь" настолько, чтобы освободилось место
+        fraction = 1 - (self.num_requests - self.current) / self.previous
+        return max(fraction * self.duration - elapsed, 0)
+
+
+class AnonRateThrottle(SlidingWindowThrottle):
+    """
+    Общий лимит анонимных запросов по адресу
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident_key(request)
+
+
+class UserRateThrottle(SlidingWindowThrottle):
+    """
+    Общий лимит запросов пользователя
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.get_ident_key(request)
+
+
+class ScopedRateThrottle(SlidingWindowThrottle):
+    """
+    Лимит по области: throttle_scope представления (например, 'token'),
+    иначе 'read' для чтения и 'write' для записи
+    """
+
+    def __init__(self):
+        # область известна только в allow_request
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None) or (
+            'read' if request.method in SAFE_METHODS else 'write'
+        )
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        return self.get_ident_key(request)
@@ -1,17 +1,26 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import CommentViewSet, PostViewSet, GroupViewSet, FollowViewSet
+from .batch import BatchView
+from .sync import SyncView
+from .views import (
+    CommentViewSet, ExportView, PostViewSet, GroupViewSet, FollowViewSet, RecommendationViewSet, TokenObtainView,
+    TokenRefreshView,
+)
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet, basename='posts')
 router.register(r'posts/(?P<post_id>\d+)/comments', CommentViewSet, basename='comments')
 router.register(r'groups', GroupViewSet, basename='groups')
 router.register(r'follow', FollowViewSet, basename='follow')
+router.register(r'recommendations', RecommendationViewSet, basename='recommendations')
 
 urlpatterns = [
+    path('v1/batch/', BatchView.as_view(), name='batch'),
+    path('v1/sync/', SyncView.as_view(), name='sync'),
+    # выгрузка, формат задается расширением, а не ?format= DRF
+    re_path(r'^v1/export/(?P<kind>posts|comments)\.(?P<extension>ndjson|csv)$', ExportView.as_view(), name='export'),
     path('v1/', include(router.urls)),
     # jwt token
-    path('v1/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('v1/token/', TokenObtainView.as_view(), name='token_obtain_pair'),
     path('v1/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
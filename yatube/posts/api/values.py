@@ -0,0 +1,156 @@
+"""
+Быстрое чтение списков постов и комментариев.
+
+Вместо экземпляров моделей и полей DRF строки берутся из values() с
+именем автора из JOIN и превращаются в те же словари, что отдают
+PostSerializer и CommentSerializer, а затем в JSON через
+FastJSONRenderer. Ответ побайтно совпадает с обычным путем, который
+остается для браузерного API и для записи.
+"""
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from posts.api.renderers import FastJSONRenderer
+from posts.models import Comment, Follow, Post
+
+
+def datetime_representation(tz):
+    """
+    Преобразование как у DateTimeField.to_representation с форматом
+    ISO 8601 для часового пояса tz (None - без USE_TZ)
+    """
+
+    def convert(value):
+        if not value:
+            return None
+        if tz is not None:
+            value = value.astimezone(tz) if value.tzinfo is not None else timezone.make_aware(value, tz)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+class ValuesSerializer:
+    """
+    fields: (имя в ответе, поле для values(), имя метода-преобразования
+    или None), в порядке полей сериализатора модели. only - имена полей
+    ответа (?fields=), None - все.
+    """
+    fields = ()
+
+    def __init__(self, request=None, only=None):
+        self.request = request
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.output = [field for field in self.fields if only is None or field[0] in only]
+
+    def values(self, queryset, keys=()):
+        """
+        Колонки выводимых полей, id и ключей пагинации keys
+        """
+        lookups = dict.fromkeys(['id', *(lookup for _, lookup, _ in self.output), *keys])
+        return queryset.values(*lookups)
+
+    def serialize(self, rows):
+        plain = [(name, lookup) for name, lookup, convert in self.output if convert is None]
+        converted = [(name, lookup, getattr(self, convert)()) for name, lookup, convert in self.output if convert]
+        order = [name for name, _, _ in self.output]
+        data = []
+        for row in rows:
+            item = {name: row[lookup] for name, lookup in plain}
+            for name, lookup, convert in converted:
+                item[name] = convert(row[lookup])
+            data.append({name: item[name] for name in order})
+        return data
+
+    def datetime(self):
+        return datetime_representation(self.timezone)
+
+
+class PostValuesSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id', None),
+        ('author', 'author__username', None),
+        ('text', 'text', None),
+        ('pub_date', 'pub_date', 'datetime'),
+        ('image', 'image', 'image_url'),
+        ('group', 'group_id', None),
+    )
+
+    storage = Post._meta.get_field('image').storage
+
+    def __init__(self, request=None, only=None, embed_comments=None):
+        super().__init__(request, only)
+        self.embed_comments = embed_comments
+
+    def serialize(self, rows):
+        rows = list(rows)
+        data = super().serialize(rows)
+        if self.embed_comments:
+            serializer = CommentValuesSerializer(self.request)
+            latest = Comment.objects.latest_for_posts([row['id'] for row in rows], self.embed_comments)
+            comment_rows = list(serializer.values(latest))
+            by_post = {row['id']: [] for row in rows}
+            for comment, row in zip(serializer.serialize(comment_rows), comment_rows):
+                by_post[row['post_id']].append(comment)
+            for item, row in zip(data, rows):
+                item['comments'] = by_post[row['id']]
+        return data
+
+    def image_url(self):
+        # как FileField.to_representation: абсолютный адрес, если есть запрос
+        def convert(name):
+            if not name:
+                return None
+            url = self.storage.url(name)
+            return self.request.build_absolute_uri(url) if self.request is not None else url
+
+        return convert
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id', None),
+        ('author', 'author__username', None),
+        ('post', 'post_id', None),
+        ('text', 'text', None),
+        ('created', 'created', 'datetime'),
+    )
+
+
+class FollowValuesSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id', None),
+        ('user', 'user__username', None),
+        ('author', 'author__username', None),
+    )
+
+
+class ValuesListMixin:
+    """
+    list() по values_serializer_class, когда ответ - обычный JSON
+    """
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        return self.values_serializer_class(self.request)
+
+    def use_values(self, request):
+        return settings.API_VALUES_LISTS and type(request.accepted_renderer) is JSONRenderer
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values(request):
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.get_values_serializer()
+        keys = getattr(self.paginator, 'keys', ())
+        rows = serializer.values(self.filter_queryset(self.get_queryset()), keys)
+        page = self.paginate_queryset(rows)
+        request.accepted_renderer = FastJSONRenderer()
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
@@ -1,26 +1,114 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from posts.models import Post, Group
-from posts.api.serializer import PostSerializer, CommentSerializer, GroupSerializer, FollowSerializer
+from posts.models import Comment, Post, Group, User
+from posts.api.serializer import (
+    PostSerializer, CommentSerializer, GroupSerializer, FollowSerializer, FollowBulkSerializer, FollowImportSerializer,
+    RecommendationSerializer,
+)
 from rest_framework import filters, mixins
-from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from posts.api.permissions import IsAuthor
-from rest_framework.pagination import PageNumberPagination
+from posts import follows, page_cache
+from posts.api.filters import PostFilter, PostSearchFilter
+from posts.api.params import embedded_comments, requested_fields
+from posts.api.mixins import ConditionalMixin
+from posts.api.pagination import PostCursorPagination, CommentCursorPagination, SearchPagination
+from posts.api.values import CommentValuesSerializer, PostValuesSerializer, ValuesListMixin
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework_simplejwt import views as jwt_views
+from posts.export import EXPORTS, FORMATS, stream
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+class PostViewSet(ConditionalMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = PostSerializer
+    values_serializer_class = PostValuesSerializer
     permission_classes = (IsAuthor,)
-    pagination_class = PageNumberPagination
+    pagination_class = PostCursorPagination
+    filter_backends = (DjangoFilterBackend, PostSearchFilter)
+    filterset_class = PostFilter
+    condition_scopes = (page_cache.CARDS, page_cache.INDEX)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            if request is not None and request.query_params.get(PostSearchFilter.search_param, '').strip():
+                self._paginator = SearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def read_params(self):
+        """
+        ?fields= и ?embed= для чтения, при записи не действуют
+        """
+        if not hasattr(self, '_read_params'):
+            fields, embed = None, None
+            if self.request.method in SAFE_METHODS:
+                fields = requested_fields(self.request, PostSerializer.Meta.fields)
+                embed = embedded_comments(self.request)
+            self._read_params = fields, embed
+        return self._read_params
+
+    def get_queryset(self):
+        queryset = Post.objects.feed()
+        fields, _ = self.read_params()
+        if fields is not None:
+            queryset = queryset.defer(*({'text', 'image'} - set(fields)))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['embed_comments'] = self.read_params()
+        return context
+
+    def get_values_serializer(self):
+        fields, embed = self.read_params()
+        return self.values_serializer_class(self.request, fields, embed)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page and not isinstance(page[0], dict):
+            self.attach_comments(page)
+        return page
+
+    def get_object(self):
+        post = super().get_object()
+        self.attach_comments([post])
+        return post
+
+    def attach_comments(self, posts):
+        _, embed = self.read_params()
+        if not embed:
+            return
+        latest = Comment.objects.latest_for_posts([post.pk for post in posts], embed).select_related('author')
+        by_post = {post.pk: [] for post in posts}
+        for comment in latest:
+            by_post[comment.post_id].append(comment)
+        for post in posts:
+            post.latest_comments = by_post[post.pk]
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
     permission_classes = (IsAuthor,)
-    pagination_class = PageNumberPagination
+    pagination_class = CommentCursorPagination
+
+    def get_condition_scopes(self):
+        return [page_cache.CARDS, page_cache.comments_scope(self.kwargs.get('post_id'))]
 
     def perform_create(self, serializer):
         post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
@@ -28,13 +116,14 @@ class CommentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
-        return post.comments.all()
+        return post.comments.select_related('author')
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(ConditionalMixin, viewsets.ModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
     permission_classes = (IsAuthor,)
+    condition_scopes = (page_cache.GROUPS,)
 
 
 class FollowViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
@@ -47,4 +136,119 @@ class FollowViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.Gen
         return self.request.user.follower.all()
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # такую же подписку параллельно создал другой запрос
+            raise ValidationError({'non_field_errors': ['Subscription to the author is already arranged.']})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Подписаться на авторов follow и отписаться от авторов unfollow
+        в одной транзакции; неизвестные имена возвращаются в not_found
+        """
+        serializer = FollowBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        authors = follows.authors_by_username(data['follow'] + data['unfollow'])
+        usernames = {pk: username for username, pk in authors.items()}
+
+        follow = [authors[name] for name in data['follow'] if name in authors]
+        unfollow = [authors[name] for name in data['unfollow'] if name in authors]
+        with transaction.atomic():
+            followed = follows.follow_many(request.user, follow)
+            unfollowed = sorted(
+                request.user.follower.filter(author_id__in=unfollow).values_list('author_id', flat=True)
+            )
+            follows.unfollow(request.user, unfollowed)
+
+        return Response({
+            'followed': [usernames[pk] for pk in followed],
+            'unfollowed': [usernames[pk] for pk in unfollowed],
+            'not_found': sorted({*data['follow'], *data['unfollow']} - set(authors)),
+        })
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_follows(self, request):
+        """
+        Импорт списка подписок одной транзакцией: с replace=true
+        подписки становятся ровно authors. Если хотя бы один автор не
+        найден, ничего не меняется.
+        """
+        serializer = FollowImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        authors = follows.authors_by_username(data['authors'])
+        not_found = sorted(set(data['authors']) - set(authors))
+        if not_found:
+            return Response({'not_found': not_found}, status=status.HTTP_400_BAD_REQUEST)
+
+        if data['replace']:
+            followed, unfollowed = follows.replace_follows(request.user, authors.values())
+        else:
+            followed, unfollowed = follows.follow_many(request.user, authors.values()), []
+        usernames = dict(User.objects.filter(pk__in=[*followed, *unfollowed]).values_list('pk', 'username'))
+        return Response({
+            'followed': [usernames[pk] for pk in followed],
+            'unfollowed': [usernames[pk] for pk in unfollowed],
+        })
+
+
+class RecommendationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Рекомендованные пользователю авторы, лучшие первыми
+    (posts/recommendations.py)
+    """
+    serializer_class = RecommendationSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+
+    def get_queryset(self):
+        return (
+            self.request.user.recommendations
+            .select_related('author')
+            .order_by('-score')[:settings.RECOMMENDATIONS_PER_USER]
+        )
+
+
+class FirstRendererNegotiation(BaseContentNegotiation):
+    """
+    Выгрузка сама выбирает формат по адресу, Accept клиента не важен
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка /api/v1/export/<posts|comments>.<ndjson|csv>
+    c фильтром по датам ?date_from=&date_to=
+    """
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (JSONRenderer,)
+    content_negotiation_class = FirstRendererNegotiation
+
+    def get(self, request, kind, extension):
+        export = EXPORTS[kind]
+        filterset = export.filterset(request.query_params)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        response = StreamingHttpResponse(
+            stream(export, filterset.qs, extension, request), content_type=FORMATS[extension],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{kind}.{extension}"'
+        return response
+
+
+class TokenObtainView(jwt_views.TokenObtainPairView):
+    throttle_scope = 'token'
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    throttle_scope = 'token'
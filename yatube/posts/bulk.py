@@ -0,0 +1,52 @@
+"""
+Массовая запись моделей с сигналами.
+
+Ленты, счетчики, версии карточек, кэш страниц и поисковый индекс
+обновляются сигналами pre_save/post_save (posts/signals.py), а
+bulk_create и bulk_update их не отправляют. Функции этого модуля пишут
+объекты одним запросом и сами отправляют сигналы для каждого объекта.
+"""
+from django.db import connections, router
+from django.db.models.signals import post_save, pre_save
+
+
+def _send(signal, objects, **kwargs):
+    for obj in objects:
+        model = type(obj)
+        signal.send(sender=model, instance=obj, raw=False, using=router.db_for_write(model), **kwargs)
+
+
+def create(objects):
+    """
+    Создать объекты одной модели. Если база не возвращает id из
+    bulk_create (SQLite), объекты сохраняются по одному.
+    """
+    objects = list(objects)
+    if not objects:
+        return objects
+    model = type(objects[0])
+    using = router.db_for_write(model)
+    if not connections[using].features.can_return_rows_from_bulk_insert:
+        for obj in objects:
+            obj.save(using=using)
+        return objects
+
+    _send(pre_save, objects, update_fields=None)
+    model.objects.using(using).bulk_create(objects)
+    _send(post_save, objects, created=True, update_fields=None)
+    return objects
+
+
+def update(objects, fields):
+    """
+    Сохранить поля fields у объектов одной модели одним запросом
+    """
+    objects = list(objects)
+    fields = sorted(set(fields))
+    if not objects or not fields:
+        return objects
+    model = type(objects[0])
+    _send(pre_save, objects, update_fields=frozenset(fields))
+    model.objects.using(router.db_for_write(model)).bulk_update(objects, fields)
+    _send(post_save, objects, created=False, update_fields=frozenset(fields))
+    return objects
@@ -0,0 +1,23 @@
+"""
+Кэш карточек постов (posts/post_item.html).
+
+Карточка кэшируется фрагментом {% cache %} по ключу (id поста, версия).
+Версия хранится в Post.version и увеличивается при любом изменении,
+которое меняет карточку: правка поста, новый или удаленный комментарий,
+переименование группы или автора. Старые фрагменты просто перестают
+читаться и вытесняются из кэша по таймауту.
+"""
+from django.db.models import F
+
+from .models import Post
+
+
+def bump(posts):
+    """
+    Увеличить версию карточек постов из набора posts
+    """
+    return posts.update(version=F('version') + 1)
+
+
+def bump_post(post_id):
+    return bump(Post.objects.filter(pk=post_id))
@@ -0,0 +1,127 @@
+"""
+Журнал изменений для синхронизации клиентов (модель ChangeLog).
+
+Сигналы записывают каждое создание, изменение и удаление поста,
+комментария и подписки в той же транзакции, что и само изменение.
+changes() отдает изменения после курсора, свернутые до последнего
+действия над каждым объектом, prune() удаляет записи старше
+SYNC_RETENTION_DAYS.
+
+Порядок. Курсор - id записи журнала, а id выдается при вставке, не при
+фиксации транзакции: запись с меньшим id может стать видимой позже
+записи с большим. Поэтому чтение ограничено safe_cursor() - записями
+до первой, сделанной меньше SYNC_COMMIT_LAG секунд назад. Изменения
+транзакции, которая фиксируется быстрее SYNC_COMMIT_LAG, клиент
+получит не раньше чем через SYNC_COMMIT_LAG секунд, но не пропустит;
+изменения более долгих транзакций могут быть пропущены.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import ChangeLog, Comment, Follow, Post
+
+MODELS = {
+    Post: ChangeLog.POST,
+    Comment: ChangeLog.COMMENT,
+    Follow: ChangeLog.FOLLOW,
+}
+
+
+class CursorExpired(Exception):
+    """
+    Изменения после курсора уже удалены из журнала
+    """
+
+
+def record(instance, action):
+    ChangeLog.objects.create(
+        model=MODELS[type(instance)],
+        object_id=instance.pk,
+        action=action,
+        owner=instance.user_id if isinstance(instance, Follow) else None,
+    )
+
+
+def record_updated(queryset):
+    """
+    Изменение всех объектов queryset одной вставкой, для изменений в
+    обход save(): SET_NULL при удалении группы, новое имя автора
+    """
+    model = MODELS[queryset.model]
+    ChangeLog.objects.bulk_create(
+        [ChangeLog(model=model, object_id=pk, action=ChangeLog.UPDATED) for pk in queryset.values_list('pk', flat=True)],
+        batch_size=500,
+    )
+
+
+def changes(user, since, limit):
+    """
+    (курсор, есть ли еще, {модель: {pk: действие}}) для не больше чем
+    limit записей журнала после since. Объект, созданный и затем
+    измененный после since, остается созданным; удаленный - удаленным.
+    Подписки других пользователей пропускаются, но сдвигают курсор.
+    Записи после safe_cursor() не читаются.
+    """
+    check_cursor(since)
+    rows = list(
+        ChangeLog.objects
+        .filter(id__gt=since, id__lte=safe_cursor())
+        .order_by('id')
+        .values_list('id', 'model', 'object_id', 'action', 'owner')[:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    result = {model: {} for model in MODELS.values()}
+    for _, model, object_id, action, owner in rows:
+        if model == ChangeLog.FOLLOW and owner != user.pk:
+            continue
+        actions = result[model]
+        if action == ChangeLog.UPDATED and object_id in actions:
+            continue
+        actions[object_id] = action
+    cursor = rows[-1][0] if rows else since
+    return cursor, more, result
+
+
+def latest_cursor():
+    return ChangeLog.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def safe_cursor():
+    """
+    Курсор, до которого журнал можно читать: id перед первой записью за
+    последние SYNC_COMMIT_LAG секунд - их транзакции могут быть еще не
+    зафиксированы, а id перед ними уже заняты. Свежие записи ищутся по
+    индексу changed, их немного.
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.SYNC_COMMIT_LAG)
+    recent = ChangeLog.objects.filter(changed__gte=horizon).aggregate(first=Min('id'))['first']
+    if recent is not None:
+        return recent - 1
+    return latest_cursor()
+
+
+def check_cursor(since):
+    """
+    Курсор устарел, если записи сразу после него удалены prune(). На
+    PostgreSQL пропуски в последовательности id после отката транзакций
+    могут дать ложное устаревание - клиент просто загрузит все заново.
+    """
+    oldest = ChangeLog.objects.order_by('id').values_list('id', flat=True).first()
+    if since and oldest is not None and since < oldest - 1:
+        raise CursorExpired(since)
+
+
+def prune(days=None):
+    """
+    Удалить записи старше days дней, кроме последней: по ней проверяются
+    устаревшие курсоры
+    """
+    days = settings.SYNC_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = ChangeLog.objects.filter(changed__lt=cutoff).exclude(id=latest_cursor()).delete()
+    return deleted
@@ -0,0 +1,100 @@
+"""
+Денормализованные счетчики: посты, подписчики и подписки пользователя
+(UserStats) и комментарии поста (Post.comment_count). Обновляются
+сигналами при создании и удалении Post, Comment и Follow, поэтому
+страницы профиля и ленты ничего не считают.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def change_user_counter(user_id, field, delta):
+    updated = UserStats.objects.filter(pk=user_id).update(**{field: F(field) + delta})
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(pk=user_id, **{field: delta})
+    except IntegrityError:
+        UserStats.objects.filter(pk=user_id).update(**{field: F(field) + delta})
+
+
+def change_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(comment_count=F('comment_count') + delta)
+
+
+def stats_for(user):
+    """
+    Счетчики пользователя, для пользователя без записи - нули
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def is_following(user, author):
+    """
+    Подписан ли пользователь на автора, для анонима - нет
+    """
+    return user.is_authenticated and Follow.objects.filter(user=user, author=author).exists()
+
+
+def actual_user_counters():
+    """
+    Счетчики пользователей, посчитанные по данным
+    """
+    return {
+        'posts_count': Counter(dict(
+            Post.objects.values_list('author').annotate(n=Count('id')).order_by()
+        )),
+        'followers_count': Counter(dict(
+            Follow.objects.values_list('author').annotate(n=Count('id')).order_by()
+        )),
+        'following_count': Counter(dict(
+            Follow.objects.values_list('user').annotate(n=Count('id')).order_by()
+        )),
+    }
+
+
+def rebuild(fix=True):
+    """
+    Сверить счетчики с данными и, если fix=True, исправить расхождения.
+    Возвращает список расхождений (модель, pk, поле, хранимое, верное).
+    """
+    mismatches = []
+
+    counters = actual_user_counters()
+    stored = {stats.pk: stats for stats in UserStats.objects.all()}
+    user_ids = set(stored) | set().union(*(set(counter) for counter in counters.values()))
+    existing_users = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    changed_stats = []
+    for user_id in sorted(existing_users):
+        stats = stored.get(user_id) or UserStats(pk=user_id)
+        changed = user_id not in stored
+        for field, counter in counters.items():
+            if getattr(stats, field) != counter[user_id]:
+                mismatches.append(('UserStats', user_id, field, getattr(stats, field), counter[user_id]))
+                setattr(stats, field, counter[user_id])
+                changed = True
+        if changed:
+            changed_stats.append(stats)
+
+    comments = Counter(dict(Comment.objects.values_list('post').annotate(n=Count('id')).order_by()))
+    changed_posts = []
+    for post in Post.objects.only('pk', 'comment_count').iterator():
+        if post.comment_count != comments[post.pk]:
+            mismatches.append(('Post', post.pk, 'comment_count', post.comment_count, comments[post.pk]))
+            post.comment_count = comments[post.pk]
+            changed_posts.append(post)
+
+    if fix:
+        with transaction.atomic():
+            for stats in changed_stats:
+                stats.save()
+            Post.objects.bulk_update(changed_posts, ['comment_count'], batch_size=500)
+    return mismatches
@@ -0,0 +1,166 @@
+"""
+События о новых постах и комментариях для потоков server-sent events
+(posts/sse.py).
+
+После фиксации транзакции сигналы публикуют события в каналы брокера:
+новый пост - в канал автора, новый комментарий - в канал поста,
+подписка и отписка - в канал подписчика, чтобы открытый поток ленты
+подписок сразу начал или перестал получать посты автора.
+
+Брокер задается настройкой EVENTS_BROKER. LocalBroker раздает события
+внутри процесса, поэтому публикующий и читающий код должны работать в
+одном процессе; брокер для нескольких процессов (например, поверх
+Redis pub/sub) реализует те же publish(), listening() и subscribe().
+"""
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .api.values import CommentValuesSerializer, PostValuesSerializer
+from .models import Comment, Post
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def post_channel(post_id):
+    return f'post:{post_id}'
+
+
+def follower_channel(user_id):
+    return f'follower:{user_id}'
+
+
+class Subscription:
+    """
+    Подписка одного потока на набор каналов. События складываются в
+    очередь цикла событий потока; если клиент не успевает их читать,
+    старые события вытесняются новыми.
+    """
+
+    def __init__(self, broker, loop, maxsize):
+        self.broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.channels = set()
+
+    def add(self, *channels):
+        self.broker.add(self, channels)
+
+    def discard(self, *channels):
+        self.broker.discard(self, channels)
+
+    def close(self):
+        self.broker.discard(self, list(self.channels))
+
+    def put(self, event):
+        # вызывается в цикле событий подписки
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroker:
+    """
+    Pub/sub внутри процесса. publish() можно вызывать из любого потока.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def subscribe(self, *channels):
+        """
+        Подписка для текущего цикла событий
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), settings.EVENTS_QUEUE_SIZE)
+        subscription.add(*channels)
+        return subscription
+
+    def add(self, subscription, channels):
+        with self.lock:
+            for channel in channels:
+                self.subscribers.setdefault(channel, set()).add(subscription)
+                subscription.channels.add(channel)
+
+    def discard(self, subscription, channels):
+        with self.lock:
+            for channel in channels:
+                subscribers = self.subscribers.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self.subscribers.pop(channel, None)
+                subscription.channels.discard(channel)
+
+    def listening(self, channel):
+        """
+        Есть ли подписчики: без них событие даже не собирается
+        """
+        return channel in self.subscribers
+
+    def publish(self, channel, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # цикл событий потока уже закрыт
+                subscription.close()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.EVENTS_BROKER)()
+
+
+def post_events(queryset):
+    """
+    События 'post' в формате списков API
+    """
+    serializer = PostValuesSerializer()
+    rows = list(serializer.values(queryset, ['author_id']))
+    return [
+        {'event': 'post', 'id': item['id'], 'data': item, 'author_id': row['author_id']}
+        for item, row in zip(serializer.serialize(rows), rows)
+    ]
+
+
+def comment_events(queryset):
+    serializer = CommentValuesSerializer()
+    items = serializer.serialize(serializer.values(queryset))
+    return [{'event': 'comment', 'id': item['id'], 'data': item} for item in items]
+
+
+def _publish(channel, make_events):
+    broker = get_broker()
+    if broker.listening(channel):
+        for event in make_events():
+            broker.publish(channel, event)
+
+
+def publish_post(post):
+    channel, queryset = author_channel(post.author_id), Post.objects.filter(pk=post.pk)
+    transaction.on_commit(lambda: _publish(channel, lambda: post_events(queryset)))
+
+
+def publish_comment(comment):
+    channel, queryset = post_channel(comment.post_id), Comment.objects.filter(pk=comment.pk)
+    transaction.on_commit(lambda: _publish(channel, lambda: comment_events(queryset)))
+
+
+def publish_follow(follow, followed):
+    """
+    Подписка (followed=True) или отписка для открытых потоков подписчика
+    """
+    channel = follower_channel(follow.user_id)
+    event = {'event': 'follow', 'author_id': follow.author_id, 'followed': followed}
+    transaction.on_commit(lambda: _publish(channel, lambda: [event]))
@@ -0,0 +1,92 @@
+"""
+Потоковая выгрузка постов и комментариев в NDJSON и CSV.
+
+Строки читаются через values().iterator(chunk_size=...) - курсором на
+стороне сервера там, где база это умеет, - и отдаются по одному блоку
+на каждые chunk_size строк. В памяти одновременно находится не больше
+одного блока, сколько бы строк ни попало в выгрузку. Поля и их формат -
+как в API (posts/api/values.py).
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+
+from posts.api.filters import CommentFilter, PostFilter
+from posts.api.values import CommentValuesSerializer, PostValuesSerializer
+from posts.models import Comment, Post
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson не обязателен
+    orjson = None
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Export:
+    """
+    Выгрузка одной модели: queryset, фильтр по датам и сериализатор строк.
+    ordering совпадает с порядком индекса, чтобы база не сортировала
+    весь диапазон перед выдачей первой строки.
+    """
+
+    def __init__(self, model, filterset_class, serializer_class, ordering):
+        self.model = model
+        self.filterset_class = filterset_class
+        self.serializer_class = serializer_class
+        self.ordering = ordering
+
+    def filterset(self, data):
+        return self.filterset_class(data, queryset=self.model.objects.all())
+
+
+EXPORTS = {
+    'posts': Export(Post, PostFilter, PostValuesSerializer, ('pub_date', 'id')),
+    'comments': Export(Comment, CommentFilter, CommentValuesSerializer, ('id',)),
+}
+
+
+def _dumps(item):
+    if orjson is not None:
+        return orjson.dumps(item).decode()
+    return json.dumps(item, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def _ndjson(items, header):
+    return ''.join(_dumps(item) + '\n' for item in items)
+
+
+def _csv(items, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(['' if value is None else value for value in item.values()] for item in items)
+    return buffer.getvalue()
+
+
+def stream(export, queryset, export_format, request=None, chunk_size=None):
+    """
+    Генератор блоков текста выгрузки queryset в формате export_format
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    serializer = export.serializer_class(request)
+    rows = serializer.values(queryset.order_by(*export.ordering)).iterator(chunk_size=chunk_size)
+    render = _csv if export_format == 'csv' else _ndjson
+    header = [name for name, _, _ in serializer.output]
+
+    first = True
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            if first and export_format == 'csv':
+                yield render([], header)
+            return
+        yield render(serializer.serialize(chunk), header if first else None)
+        first = False
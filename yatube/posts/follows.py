@@ -0,0 +1,81 @@
+"""
+Подписки без гонок.
+
+Уникальность пары (user, author) и запрет подписки на себя держат
+ограничения базы unique_follow и no_self_follow, поэтому подписка -
+сразу INSERT, а повтор распознается по IntegrityError, без
+предварительной проверки SELECT. Отписка - один DELETE по условию.
+Массовые операции выполняются в одной транзакции и отправляют сигналы
+для каждой подписки (posts/bulk.py), чтобы ленты, счетчики и журнал
+изменений оставались согласованными.
+"""
+from django.db import IntegrityError, transaction
+
+from . import bulk
+from .models import Follow, User
+
+
+def follow(user, author_id):
+    """
+    Подписать user на автора; False, если подписка уже есть или это он сам
+    """
+    if author_id == user.pk:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author_id=author_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author_ids):
+    """
+    Отписать user от авторов; число удаленных подписок
+    """
+    deleted, _ = Follow.objects.filter(user=user, author_id__in=list(author_ids)).delete()
+    return deleted
+
+
+def follow_many(user, author_ids):
+    """
+    Подписать user на всех авторов, на которых он еще не подписан;
+    pk авторов новых подписок
+    """
+    author_ids = set(author_ids) - {user.pk}
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                existing = set(
+                    Follow.objects.filter(user=user, author_id__in=author_ids).values_list('author_id', flat=True)
+                )
+                new = sorted(author_ids - existing)
+                bulk.create(Follow(user=user, author_id=author_id) for author_id in new)
+            return new
+        except IntegrityError:
+            # те же подписки параллельно создал другой запрос - читаем заново
+            if attempt:
+                raise
+    return []
+
+
+def replace_follows(user, author_ids):
+    """
+    Сделать подписки user ровно author_ids в одной транзакции;
+    (pk новых авторов, pk авторов, от которых он отписан)
+    """
+    author_ids = set(author_ids) - {user.pk}
+    with transaction.atomic():
+        removed = sorted(
+            Follow.objects.filter(user=user).exclude(author_id__in=author_ids).values_list('author_id', flat=True)
+        )
+        unfollow(user, removed)
+        added = follow_many(user, author_ids)
+    return added, removed
+
+
+def authors_by_username(usernames):
+    """
+    {username: pk} для существующих пользователей
+    """
+    return dict(User.objects.filter(username__in=set(usernames)).values_list('username', 'pk'))
@@ -1,4 +1,5 @@
 from django import forms
+from .images import ImageField
 from .models import Post, Comment
 
 
@@ -6,6 +7,7 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {'image': ImageField}
 
 
 class CommentForm(forms.ModelForm):
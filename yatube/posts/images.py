@@ -0,0 +1,185 @@
+"""
+Прием изображений постов без загрузки всего файла в память.
+
+LimitedUploadHandler (FILE_UPLOAD_HANDLERS) пишет загрузку на диск
+блоками и перестает сохранять ее после POST_IMAGE_MAX_BYTES байт -
+такой файл отклоняется по размеру, не открываясь.
+
+ImageField (поле формы поста и сериализатора API вместо стандартного,
+которое целиком декодирует загрузку в Pillow) проверяет формат и
+размеры в пикселях по заголовку файла, до декодирования. Затем
+изображение поворачивается по EXIF-ориентации и сохраняется заново без
+EXIF (координаты, модель камеры), а слишком большое - уменьшается до
+POST_IMAGE_MAX_SIDE по большей стороне; JPEG при этом декодируется
+сразу в уменьшенном масштабе (draft). Файл без EXIF и в пределах
+размеров сохраняется как есть, без повторного сжатия.
+
+Ширина и высота записываются в Post.image_width и image_height
+(сигнал pre_save), поэтому шаблонам не нужно открывать файл.
+"""
+import math
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.forms import FileField
+from PIL import Image, ImageOps
+
+# EXIF-тег ориентации
+ORIENTATION = 0x0112
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Загрузка во временный файл на диске; после POST_IMAGE_MAX_BYTES байт
+    данные отбрасываются, а size файла остается полным размером загрузки
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+
+class ProcessedImage(File):
+    """
+    Подготовленное изображение с известными размерами
+    """
+
+    def __init__(self, file, name, width, height):
+        super().__init__(file, name)
+        self.image_size = (width, height)
+
+
+def open_checked(file):
+    """
+    Открыть изображение, прочитав только заголовок, и проверить формат и
+    размеры; ValidationError, если изображение не подходит
+    """
+    if file.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            f'Файл больше {settings.POST_IMAGE_MAX_BYTES // 2 ** 20} МБ.', code='file_too_large',
+        )
+    file.seek(0)
+    try:
+        image = Image.open(file)
+    except Exception:
+        raise ValidationError(
+            'Загрузите правильное изображение. Файл, который вы загрузили, поврежден или не является изображением.',
+            code='invalid_image',
+        )
+    if image.format not in settings.POST_IMAGE_UPLOAD_FORMATS:
+        raise ValidationError(
+            f"Поддерживаются форматы: {', '.join(settings.POST_IMAGE_UPLOAD_FORMATS)}.", code='invalid_format',
+        )
+    width, height = image.size
+    frames = getattr(image, 'n_frames', 1)
+    if width * height * frames > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Изображение больше {settings.POST_IMAGE_MAX_PIXELS // 10 ** 6} мегапикселей.', code='too_many_pixels',
+        )
+    return image
+
+
+def _output_name(name, image_format):
+    root = os.path.splitext(os.path.basename(name or 'image'))[0]
+    return f'{root}.{EXTENSIONS[image_format]}'
+
+
+def process(file):
+    """
+    Проверенное и подготовленное изображение из загрузки (ProcessedImage)
+    """
+    image = open_checked(file)
+    image_format = image.format
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    oversized = max(image.size) > max_side
+    if image_format == 'PNG':
+        # getexif() у PNG декодирует все изображение: eXIf может быть после данных
+        has_exif = bool(image.info.get('exif'))
+    else:
+        has_exif = bool(image.getexif())
+
+    if getattr(image, 'is_animated', False) or not (oversized or has_exif):
+        # анимацию не пересжимаем, остальное - только при необходимости
+        file.seek(0)
+        return ProcessedImage(file, _output_name(file.name, image_format), *image.size)
+
+    if image_format == 'JPEG' and oversized:
+        # декодирование сразу в масштабе 1/2, 1/4 или 1/8, не меньше нужного
+        ratio = max_side / max(image.size)
+        image.draft(image.mode, tuple(math.ceil(side * ratio) for side in image.size))
+    image.load()
+    if image.getexif().get(ORIENTATION):
+        # exif_transpose сам убирает тег ориентации
+        image = ImageOps.exif_transpose(image)
+    if oversized:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    options = {'exif': b''}
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    if image_format == 'JPEG':
+        options.update(quality=settings.POST_IMAGE_QUALITY, optimize=True)
+        if image.mode not in ('RGB', 'L', 'CMYK'):
+            image = image.convert('RGB')
+    elif image_format == 'WEBP':
+        options['quality'] = settings.POST_IMAGE_QUALITY
+
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, dir=settings.FILE_UPLOAD_TEMP_DIR,
+    )
+    image.save(output, image_format, **options)
+    output.seek(0)
+    return ProcessedImage(output, _output_name(file.name, image_format), *image.size)
+
+
+def dimensions(field_file):
+    """
+    (ширина, высота) изображения поля модели: из ProcessedImage или по
+    заголовку файла; (None, None), если изображения нет или его не
+    прочитать
+    """
+    if not field_file:
+        return None, None
+    try:
+        file = field_file.file
+        if hasattr(file, 'image_size'):
+            return file.image_size
+        position = file.tell()
+        try:
+            file.seek(0)
+            return Image.open(file).size
+        finally:
+            file.seek(position)
+    except (OSError, ValueError):
+        return None, None
+
+
+class ImageField(FileField):
+    """
+    Поле формы для изображения поста: проверка по заголовку и подготовка
+    вместо полного декодирования в django.forms.ImageField
+    """
+
+    def to_python(self, data):
+        file = super().to_python(data)
+        if file is None:
+            return None
+        return process(file)
+
+    def widget_attrs(self, widget):
+        attrs = super().widget_attrs(widget)
+        if not widget.is_hidden:
+            attrs.setdefault('accept', 'image/*')
+        return attrs
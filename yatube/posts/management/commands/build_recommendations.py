@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов по изменениям подписок или целиком'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рекомендации всех пользователей',
+        )
+
+    def handle(self, *args, **options):
+        if options['full']:
+            stored = recommendations.build()
+            self.stdout.write(self.style.SUCCESS(f'Рекомендации построены заново, записей: {stored}'))
+            return
+
+        refreshed = recommendations.refresh()
+        if refreshed is None:
+            self.stdout.write(self.style.SUCCESS('Курсора изменений нет, рекомендации построены заново'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Пересчитаны рекомендации пользователей: {refreshed}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORTS, FORMATS, stream
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка постов или комментариев в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS), help='Что выгружать')
+        parser.add_argument('--format', dest='export_format', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--date-from', help='Начало диапазона дат, включительно')
+        parser.add_argument('--date-to', help='Конец диапазона дат, включительно')
+        parser.add_argument('--chunk-size', type=int, help='Строк в одном блоке чтения')
+        parser.add_argument('--output', help='Файл для выгрузки, по умолчанию - стандартный вывод')
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options['kind']]
+        filterset = export.filterset({
+            key: options[option] for key, option in (('date_from', 'date_from'), ('date_to', 'date_to'))
+            if options[option]
+        })
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        chunks = stream(export, filterset.qs, options['export_format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
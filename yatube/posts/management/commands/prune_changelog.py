@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import changelog
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из журнала изменений записи старше SYNC_RETENTION_DAYS дней'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Сколько дней хранить записи вместо SYNC_RETENTION_DAYS',
+        )
+
+    def handle(self, *args, **options):
+        deleted = changelog.prune(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей журнала: {deleted}'))
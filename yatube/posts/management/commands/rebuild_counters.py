@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет и пересчитывает счетчики постов, комментариев и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить счетчики, ничего не исправляя',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = counters.rebuild(fix=not options['check'])
+        for model, pk, field, stored, actual in mismatches:
+            self.stdout.write(f'{model} {pk}: {field} = {stored}, должно быть {actual}')
+
+        if options['check'] and mismatches:
+            raise CommandError(f'Расхождений в счетчиках: {len(mismatches)}')
+        if mismatches:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено расхождений: {len(mismatches)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Счетчики в порядке'))
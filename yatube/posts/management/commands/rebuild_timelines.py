@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Пересобрать ленты только этих пользователей')
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.all()
+        if options['usernames']:
+            follows = follows.filter(user__username__in=options['usernames'])
+        user_ids = follows.values_list('user_id', flat=True).distinct().order_by()
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            timelines.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Пересобрано лент: {rebuilt}'))
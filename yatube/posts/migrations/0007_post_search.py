@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.db import migrations
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, group_title, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "SELECT p.id, p.text, COALESCE(g.title, '') FROM posts_post p "
+    "LEFT JOIN posts_group g ON g.id = p.group_id",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts (rowid, text, group_title) VALUES ("
+    "new.id, new.text, COALESCE((SELECT title FROM posts_group WHERE id = new.group_id), '')); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text, group_id ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; "
+    "INSERT INTO posts_post_fts (rowid, text, group_title) VALUES ("
+    "new.id, new.text, COALESCE((SELECT title FROM posts_group WHERE id = new.group_id), '')); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; "
+    "END",
+    "CREATE TRIGGER posts_group_fts_update AFTER UPDATE OF title ON posts_group BEGIN "
+    "UPDATE posts_post_fts SET group_title = new.title "
+    "WHERE rowid IN (SELECT id FROM posts_post WHERE group_id = new.id); "
+    "END",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS posts_group_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_post_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+    "DROP TABLE IF EXISTS posts_post_fts",
+]
+
+
+def postgres_create(schema_editor):
+    # конфигурация - та же, что в запросах posts/search.py, иначе индекс
+    # не подходит к выражению запроса
+    config = schema_editor.quote_value(settings.SEARCH_CONFIG)
+    return [
+        "CREATE INDEX posts_post_text_search_idx ON posts_post "
+        f"USING GIN (to_tsvector({config}, COALESCE(text, '')))",
+    ]
+
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS posts_post_text_search_idx",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        vendor_statements = statements.get(vendor, [])
+        if callable(vendor_statements):
+            vendor_statements = vendor_statements(schema_editor)
+        for sql in vendor_statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_CREATE, 'postgresql': postgres_create}),
+            run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}),
+        ),
+    ]
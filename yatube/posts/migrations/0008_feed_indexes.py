@@ -0,0 +1,53 @@
+# Generated by Django 3.2.17 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    duplicates = (
+        Follow.objects.values('user', 'author')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        extra = Follow.objects.filter(user=row['user'], author=row['author']).order_by('id')[1:]
+        Follow.objects.filter(pk__in=list(extra.values_list('pk', flat=True))).delete()
+        # счетчики считали каждую копию подписки
+        UserStats.objects.filter(pk=row['author']).update(followers_count=F('followers_count') - (row['n'] - 1))
+        UserStats.objects.filter(pk=row['user']).update(following_count=F('following_count') - (row['n'] - 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created', '-id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.17 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+# Индекс поиска теперь обновляют сигналы (posts/search.py): триггеры
+# ссылаются на posts_post и мешают SQLite пересоздавать таблицу при
+# изменении ее полей
+FTS_TRIGGERS = (
+    'posts_group_fts_update',
+    'posts_post_fts_delete',
+    'posts_post_fts_update',
+    'posts_post_fts_insert',
+)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for name in FTS_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
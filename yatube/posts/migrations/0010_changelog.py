@@ -0,0 +1,24 @@
+# Generated by Django 3.2.17 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(choices=[('post', 'post'), ('comment', 'comment'), ('follow', 'follow')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'created'), ('updated', 'updated'), ('deleted', 'deleted')], max_length=16)),
+                ('owner', models.BigIntegerField(blank=True, null=True)),
+                ('changed', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
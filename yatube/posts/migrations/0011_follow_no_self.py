@@ -0,0 +1,32 @@
+# Generated by Django 3.2.17 on 2026-10-18 18:44
+
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.expressions
+
+
+def remove_self_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    for user_id in list(Follow.objects.filter(user=F('author')).values_list('user', flat=True)):
+        Follow.objects.filter(user=user_id, author=user_id).delete()
+        # подписка на себя считалась и подписчиком, и подпиской
+        UserStats.objects.filter(pk=user_id).update(
+            followers_count=F('followers_count') - 1, following_count=F('following_count') - 1,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_changelog'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_self_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(('user', django.db.models.expressions.F('author')), _negated=True), name='no_self_follow'),
+        ),
+    ]
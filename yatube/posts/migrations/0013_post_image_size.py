@@ -0,0 +1,37 @@
+# Generated by Django 3.2.17 on 2026-10-18 18:56
+
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_image_size(apps, schema_editor):
+    # размеры уже загруженных изображений - по заголовку файла
+    Post = apps.get_model('posts', 'Post')
+    for post in Post.objects.exclude(image='').exclude(image=None).only('image').iterator():
+        try:
+            with post.image.open() as file:
+                width, height = Image.open(file).size
+        except (OSError, ValueError):
+            continue
+        Post.objects.filter(pk=post.pk).update(image_width=width, image_height=height)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_image_size, migrations.RunPython.noop),
+    ]
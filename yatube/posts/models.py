@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.expressions import RawSQL
 from django.contrib.auth import get_user_model
 
+from .pagination import KeysetPaginator
+
 User = get_user_model()
 
 
@@ -22,6 +26,20 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """
+    Набор запросов для постов.
+
+    feed: посты для лент (главная, группа, профиль, подписки, API) -
+    автор и группа подтягиваются одним JOIN, количество комментариев
+    хранится в самом посте, поэтому страница ленты стоит постоянное
+    число запросов вне зависимости от числа постов на ней.
+    """
+
+    def feed(self):
+        return self.select_related("author", "group").order_by("-pub_date", "-id")
+
+
 class Post(models.Model):
     """
     Модель Post.
@@ -30,19 +48,85 @@ class Post(models.Model):
     author: ссылка на автора поста, на модель User
     group: ссылка на группу, на модель Group
     image: изображение
+    image_width, image_height: размеры изображения, записываются при
+    его сохранении (posts/images.py)
+    image_variants: готовые превью изображения {размер: {формат: файл}},
+    заполняются фоновым обработчиком (posts/thumbnails.py)
+    comment_count: счетчик комментариев, обновляется сигналами и не
+    записывается save() (COUNTER_FIELDS)
+    version: версия карточки поста, ключ кэша шаблона post_item.html,
+    только растет и тоже не записывается save()
     """
     text = models.TextField()
     pub_date = models.DateTimeField("date published", auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     group = models.ForeignKey(Group, blank=True, null=True, on_delete=models.SET_NULL, related_name="posts")
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    # меняются только запросами UPDATE ... F() (posts/counters.py,
+    # posts/cards.py), поэтому save() существующего поста их не пишет:
+    # иначе копия, загруженная до нового комментария, вернула бы старое
+    # значение
+    COUNTER_FIELDS = ("comment_count", "version")
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"], name="post_pub_date_idx"),
+            models.Index(fields=["author", "-pub_date", "-id"], name="post_author_pub_date_idx"),
+            models.Index(fields=["group", "-pub_date", "-id"], name="post_group_pub_date_idx"),
+        ]
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+    """
+    Набор запросов для комментариев.
+
+    latest_for_posts: последние limit комментариев каждого поста из
+    post_ids одним запросом - для каждого поста читается только начало
+    индекса comment_post_created_idx, сколько бы комментариев у него ни было.
+    page: страница комментариев с авторами, новые первыми, по курсору
+    (created, id) - тоже по индексу comment_post_created_idx.
+    """
+
+    def latest_for_posts(self, post_ids, limit):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return self.none()
+        comments, posts = self.model._meta.db_table, Post._meta.db_table
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        latest = RawSQL(
+            f'SELECT c.id FROM {posts} p, {comments} c WHERE p.id IN ({placeholders}) AND c.id IN ('
+            f'SELECT id FROM {comments} WHERE post_id = p.id ORDER BY created DESC, id DESC LIMIT %s)',
+            [*post_ids, limit],
+        )
+        return self.filter(id__in=latest).order_by("-created", "-id")
+
+    def page(self, cursor=None, per_page=None):
+        paginator = KeysetPaginator(
+            self.select_related("author"), per_page or settings.COMMENTS_PAGE_SIZE, ("created", "id")
+        )
+        return paginator.get_page(cursor)
+
 
 class Comment(models.Model):
     """
@@ -59,8 +143,13 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField("date created", auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["post", "-created", "-id"], name="comment_post_created_idx"),
+        ]
 
 
 class Follow(models.Model):
@@ -74,3 +163,107 @@ class Follow(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="follower")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="following")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "author"], name="unique_follow"),
+            models.CheckConstraint(check=~models.Q(user=models.F("author")), name="no_self_follow"),
+        ]
+
+
+class UserStats(models.Model):
+    """
+    Счетчики пользователя, обновляются сигналами
+
+    user: пользователь
+    posts_count: количество постов
+    followers_count: количество подписчиков
+    following_count: количество авторов, на которых подписан
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class TimelineEntry(models.Model):
+    """
+    Запись материализованной ленты подписок
+
+    user: владелец ленты
+    post: пост автора, на которого подписан user
+    author: автор поста, нужен для очистки ленты при отписке
+    pub_date: копия даты публикации поста, лента сортируется без JOIN
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"], name="unique_timeline_post"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-pub_date", "-post"], name="timeline_user_pub_date_idx"),
+            models.Index(fields=["user", "author"], name="timeline_user_author_idx"),
+        ]
+
+
+class ChangeLog(models.Model):
+    """
+    Журнал изменений постов, комментариев и подписок для синхронизации
+    клиентов (/api/v1/sync/), заполняется сигналами
+
+    id: курсор синхронизации, растет с каждым изменением
+    model: изменившаяся модель
+    object_id: pk изменившегося объекта, после удаления объекта запись
+        остается как tombstone
+    action: создание, изменение или удаление
+    owner: подписчик для подписок (видны только ему), без FK - запись
+        переживает удаление пользователя
+    changed: время изменения, по нему журнал чистится
+    """
+
+    POST = "post"
+    COMMENT = "comment"
+    FOLLOW = "follow"
+    MODELS = ((POST, "post"), (COMMENT, "comment"), (FOLLOW, "follow"))
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTIONS = ((CREATED, "created"), (UPDATED, "updated"), (DELETED, "deleted"))
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=16, choices=MODELS)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=16, choices=ACTIONS)
+    owner = models.BigIntegerField(null=True, blank=True)
+    changed = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class Recommendation(models.Model):
+    """
+    Рекомендованный пользователю автор, строится заранее по графу
+    подписок (posts/recommendations.py)
+
+    user: кому рекомендуется
+    author: рекомендованный автор
+    score: оценка, по убыванию которой рекомендации показываются
+    shared_follows: сколько авторов из подписок user подписаны на author
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recommendations")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    shared_follows = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "author"], name="unique_recommendation"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-score"], name="recommendation_user_score_idx"),
+        ]
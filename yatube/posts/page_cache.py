@@ -0,0 +1,243 @@
+"""
+Кэш страниц целиком для анонимных посетителей.
+
+Страница кэшируется по адресу и версиям областей (scope), от которых
+зависит ее содержимое: главная - 'index', группа - 'group:<slug>',
+профиль - 'profile:<username>', статические страницы - 'flatpages',
+плюс 'cards' - общая для всех лент (названия групп, имена авторов).
+Профиль и лента подписок у вошедшего пользователя зависят еще от его
+рекомендаций - 'recommendations:<pk>'.
+Сигналы (posts/signals.py) поднимают версии затронутых областей при
+изменении Post, Comment, Follow, Group, пользователя или FlatPage,
+поэтому новый пост виден сразу, а старые копии перестают читаться.
+
+Версия области - время последнего изменения в микросекундах. Из тех
+же версий строятся ETag и Last-Modified (conditional_page и
+posts/api/mixins.py): на If-None-Match/If-Modified-Since с неизменными
+версиями сервер отвечает 304, не выполняя представление.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Group, Post
+
+CARDS = 'cards'
+INDEX = 'index'
+GROUPS = 'groups'
+FLATPAGES = 'flatpages'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def comments_scope(post_id):
+    return f'comments:{post_id}'
+
+
+def recommendations_scope(user_id):
+    return f'recommendations:{user_id}'
+
+
+def _viewer_scopes(request):
+    # блок "Кого читать" у каждого свой, его версию поднимает posts/recommendations.py
+    if request.user.is_authenticated:
+        return [recommendations_scope(request.user.pk)]
+    return []
+
+
+def _cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def _hash(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def _version_key(scope):
+    return f'scope_version:{_hash(scope)}'
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def get_versions(scopes):
+    """
+    Версии областей, для неизвестной области версия заводится сейчас
+    """
+    cache = _cache()
+    keys = {_version_key(scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    for key in keys:
+        if key not in found:
+            cache.add(key, _now(), None)
+            found[key] = cache.get(key, 0)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def request_versions(request, scopes):
+    """
+    get_versions с запоминанием на время запроса: ETag и кэш страницы
+    читают версии один раз
+    """
+    memo = request.__dict__.setdefault('_scope_versions', {})
+    key = tuple(sorted(scopes))
+    if key not in memo:
+        memo[key] = get_versions(key)
+    return memo[key]
+
+
+def bump(*scopes):
+    """
+    Поднять версии областей: все закэшированные по ним страницы устаревают
+    """
+    now = _now()
+    _cache().set_many({_version_key(scope): now for scope in scopes if scope}, None)
+
+
+def page_key(request, versions):
+    signature = '.'.join(f'{scope}={versions[scope]}' for scope in sorted(versions))
+    return f'page:{_hash(request.get_full_path())}:{_hash(signature)}'
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def cache_anonymous_page(get_scopes):
+    """
+    Декоратор представления: для анонимных GET/HEAD страница отдается из
+    кэша без обращения к базе. get_scopes(request, *args, **kwargs)
+    возвращает области, от которых зависит страница.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            cache = _cache()
+            key = page_key(request, request_versions(request, get_scopes(request, *args, **kwargs)))
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view(request, *args, **kwargs)
+
+            def store(response):
+                if _cacheable(request, response):
+                    cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def validators(request, scopes, *variants):
+    """
+    ETag и Last-Modified ответа по адресу, версиям областей и variants
+    (например, пользователю, если ответ от него зависит)
+    """
+    versions = request_versions(request, scopes)
+    signature = '.'.join(f'{scope}={versions[scope]}' for scope in sorted(versions))
+    etag = '"%s"' % _hash('|'.join([request.build_absolute_uri(), signature, *map(str, variants)]))
+    last_modified = datetime.fromtimestamp(max(versions.values(), default=0) / 10 ** 6, timezone.utc)
+    return etag, last_modified
+
+
+def conditional_response(request, etag, last_modified, respond):
+    """
+    304 без вызова respond(), если у клиента актуальная копия, иначе
+    ответ respond() с валидаторами
+    """
+    timestamp = int(last_modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        return response
+    response = respond()
+    if response.status_code == 200 and not response.streaming:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def conditional_page(get_scopes):
+    """
+    Декоратор представления: условные GET/HEAD по версиям областей,
+    от которых зависит страница. Страница зависит и от пользователя
+    (меню, кнопки подписки и правки), поэтому он входит в ETag.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag, last_modified = validators(request, get_scopes(request, *args, **kwargs), request.user.pk)
+            return conditional_response(request, etag, last_modified, lambda: view(request, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def index_scopes(request, *args, **kwargs):
+    return [CARDS, INDEX]
+
+
+def group_scopes(request, slug, *args, **kwargs):
+    return [CARDS, group_scope(slug)]
+
+
+def profile_scopes(request, *args, **kwargs):
+    return [CARDS, profile_scope(kwargs.get('slug') or kwargs.get('username')), *_viewer_scopes(request)]
+
+
+def follow_scopes(request, *args, **kwargs):
+    # лента меняется с любым новым постом и с подписками пользователя
+    return [CARDS, INDEX, profile_scope(request.user.username), *_viewer_scopes(request)]
+
+
+def comment_scopes(request, username, post_id, *args, **kwargs):
+    return [CARDS, comments_scope(post_id)]
+
+
+def post_scopes(post_id, group_ids=()):
+    """
+    Области, в которых показывается пост
+    """
+    post = Post.objects.filter(pk=post_id).values_list('author__username', 'group_id').first()
+    author, group_id = post or (None, None)
+    slugs = Group.objects.filter(pk__in={group_id, *group_ids} - {None}).values_list('slug', flat=True)
+    scopes = [INDEX, *(group_scope(slug) for slug in slugs)]
+    if author:
+        scopes.append(profile_scope(author))
+    return scopes
+
+
+def flatpage_scopes(request, *args, **kwargs):
+    return [FLATPAGES]
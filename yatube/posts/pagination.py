@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position, reverse=False):
+    """
+    Непрозрачный токен курсора: позиция в ленте и направление листания
+    """
+    payload = {'p': [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, model, keys):
+    """
+    Разбор токена курсора, значения приводятся к типам полей модели
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = payload['p']
+        if len(values) != len(keys):
+            raise InvalidCursor(token)
+        position = tuple(
+            model._meta.get_field(key).to_python(value) for key, value in zip(keys, values)
+        )
+    except (binascii.Error, ValueError, KeyError, TypeError) as error:
+        raise InvalidCursor(token) from error
+    if any(value is None for value in position):
+        raise InvalidCursor(token)
+    return position, bool(payload.get('r'))
+
+
+def keyset_filter(queryset, keys, position, reverse=False):
+    """
+    Условие "строго после позиции" для сортировки по убыванию ключей,
+    при reverse=True - "строго до позиции"
+    """
+    lookup = 'gt' if reverse else 'lt'
+    condition = Q()
+    for i, key in enumerate(keys):
+        prefix = {keys[j]: position[j] for j in range(i)}
+        condition |= Q(**prefix, **{f'{key}__{lookup}': position[i]})
+    return queryset.filter(condition)
+
+
+def row_position(row, keys):
+    if isinstance(row, dict):
+        return tuple(row[key] for key in keys)
+    return tuple(getattr(row, key) for key in keys)
+
+
+class CursorPage:
+    """
+    Страница ленты при листании по курсору.
+
+    Повторяет интерфейс django.core.paginator.Page, который нужен
+    шаблонам, но вместо номеров страниц отдает токены next/previous.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу (keyset): вместо COUNT(*) и OFFSET
+    выбирается per_page + 1 строк после позиции курсора, поэтому любая
+    страница стоит столько же, сколько первая.
+
+    keys: поля сортировки по убыванию, последнее должно быть уникальным.
+    """
+
+    def __init__(self, queryset, per_page, keys=('pub_date', 'id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keys = tuple(keys)
+
+    def fetch(self, position, reverse, limit):
+        """
+        Первые limit строк после позиции (до нее при reverse=True)
+        в порядке листания
+        """
+        queryset = self.queryset
+        if position is not None:
+            queryset = keyset_filter(queryset, self.keys, position, reverse)
+        ordering = self.keys if reverse else [f'-{key}' for key in self.keys]
+        return list(queryset.order_by(*ordering)[:limit])
+
+    def decode(self, cursor):
+        return decode_cursor(cursor, self.queryset.model, self.keys)
+
+    def resolve(self, rows):
+        """
+        Объекты страницы по выбранным строкам
+        """
+        return rows
+
+    def page(self, cursor=None):
+        position, reverse = None, False
+        if cursor:
+            position, reverse = self.decode(cursor)
+
+        rows = self.fetch(position, reverse, self.per_page + 1)
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            if not rows:
+                return self.page()
+
+        has_next = True if reverse else has_more
+        has_previous = has_more if reverse else position is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(row_position(rows[-1], self.keys))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(row_position(rows[0], self.keys), reverse=True)
+        return CursorPage(self.resolve(rows), next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """
+        Как page(), но битый курсор открывает первую страницу
+        """
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class CursorPaginationMixin:
+    """
+    Подключает KeysetPaginator к ListView, курсор берется из ?cursor=
+    """
+    cursor_keys = ('pub_date', 'id')
+
+    def get_cursor_paginator(self, queryset, page_size):
+        return KeysetPaginator(queryset, page_size, self.cursor_keys)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        page = paginator.get_page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_other_pages()
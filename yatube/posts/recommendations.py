@@ -0,0 +1,180 @@
+"""
+Рекомендации "кого читать" по графу подписок.
+
+Кандидаты для пользователя - авторы, на которых подписаны его авторы
+(друзья друзей). Оценка - число таких общих подписок плюс
+RECOMMENDATIONS_ACTIVITY_WEIGHT * log(1 + число постов автора за
+RECOMMENDATIONS_ACTIVITY_DAYS дней). Для каждого пользователя заранее
+сохраняются лучшие RECOMMENDATIONS_PER_USER (модель Recommendation),
+страницы и API только читают их по индексу.
+
+build() пересчитывает всех: граф подписок читается одним проходом в
+разреженные списки смежности (pk пользователя -> frozenset pk авторов).
+refresh() пересчитывает только затронутых по журналу изменений
+подписок (posts/changelog.py) после сохраненного курсора: подписчика и
+тех, кто подписан на него, - их кандидаты тоже изменились. Курсор
+хранится в кэше; если его нет или журнал после него вычищен, refresh()
+делает полный build(). После подписок и отписок refresh() ставится
+задачей очереди (jobs/queue.py).
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from jobs.queue import enqueue
+
+from . import changelog, page_cache
+from .models import ChangeLog, Follow, Post, Recommendation
+
+CURSOR_KEY = 'recommendations:cursor'
+CHUNK_SIZE = 500
+
+
+def adjacency(pairs):
+    """
+    Пары (подписчик, автор) -> {подписчик: frozenset авторов}
+    """
+    graph = defaultdict(set)
+    for user_id, author_id in pairs:
+        graph[user_id].add(author_id)
+    return {user_id: frozenset(authors) for user_id, authors in graph.items()}
+
+
+def activity():
+    """
+    {автор: число постов за последние RECOMMENDATIONS_ACTIVITY_DAYS дней}
+    """
+    since = timezone.now() - timedelta(days=settings.RECOMMENDATIONS_ACTIVITY_DAYS)
+    rows = Post.objects.filter(pub_date__gte=since).values('author').annotate(posts=Count('id')).order_by()
+    return {row['author']: row['posts'] for row in rows}
+
+
+def score(user_id, following, posts):
+    """
+    Лучшие кандидаты user_id: [(оценка, автор, общих подписок)]
+    """
+    own = following.get(user_id, frozenset())
+    shared = Counter()
+    for author_id in own:
+        shared.update(following.get(author_id, ()))
+    for author_id in (*own, user_id):
+        shared.pop(author_id, None)
+
+    weight = settings.RECOMMENDATIONS_ACTIVITY_WEIGHT
+    candidates = (
+        (count + weight * math.log1p(posts.get(author_id, 0)), author_id, count)
+        for author_id, count in shared.items()
+    )
+    return heapq.nlargest(settings.RECOMMENDATIONS_PER_USER, candidates)
+
+
+def store(user_ids, following, posts):
+    """
+    Заменить рекомендации пользователей user_ids одной транзакцией
+    """
+    rows = [
+        Recommendation(user_id=user_id, author_id=author_id, score=value, shared_follows=count)
+        for user_id in user_ids
+        for value, author_id, count in score(user_id, following, posts)
+    ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        Recommendation.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+    _bump(user_ids)
+    return len(rows)
+
+
+def _bump(user_ids):
+    # страницы с блоком "Кого читать" этих пользователей устарели, в том числе для ETag
+    page_cache.bump(*(page_cache.recommendations_scope(user_id) for user_id in user_ids))
+
+
+def _chunks(items):
+    items = sorted(items)
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def build():
+    """
+    Пересчитать рекомендации всех пользователей; число сохраненных строк
+    """
+    # курсор - до чтения графа: изменения во время сборки учтет refresh()
+    cursor = changelog.safe_cursor()
+    following = adjacency(Follow.objects.values_list('user_id', 'author_id').iterator(chunk_size=5000))
+    posts = activity()
+
+    stale = Recommendation.objects.exclude(user_id__in=Follow.objects.values('user_id'))
+    _bump(set(stale.values_list('user_id', flat=True)))
+    stale.delete()
+    stored = sum(store(chunk, following, posts) for chunk in _chunks(following))
+    cache.set(CURSOR_KEY, cursor, None)
+    return stored
+
+
+def refresh():
+    """
+    Пересчитать рекомендации пользователей, затронутых изменениями
+    подписок после курсора; число пересчитанных пользователей
+    """
+    cursor = cache.get(CURSOR_KEY)
+    if cursor is None:
+        build()
+        return None
+    try:
+        changelog.check_cursor(cursor)
+    except changelog.CursorExpired:
+        build()
+        return None
+
+    latest = changelog.safe_cursor()
+    owners = set(
+        ChangeLog.objects
+        .filter(id__gt=cursor, id__lte=latest, model=ChangeLog.FOLLOW)
+        .values_list('owner', flat=True)
+    ) - {None}
+
+    affected = set(owners)
+    for chunk in _chunks(owners):
+        affected.update(Follow.objects.filter(author_id__in=chunk).values_list('user_id', flat=True))
+
+    posts = activity() if affected else {}
+    for chunk in _chunks(affected):
+        following = adjacency(Follow.objects.filter(user_id__in=chunk).values_list('user_id', 'author_id'))
+        authors = set().union(*following.values()) - set(following)
+        for authors_chunk in _chunks(authors):
+            following.update(adjacency(
+                Follow.objects.filter(user_id__in=authors_chunk).values_list('user_id', 'author_id')
+            ))
+        store(chunk, following, posts)
+
+    cache.set(CURSOR_KEY, latest, None)
+    return len(affected)
+
+
+def schedule_refresh():
+    """
+    Поставить refresh() в очередь, если он еще не ждет там
+    """
+    enqueue(
+        refresh,
+        queue='recommendations',
+        delay=settings.RECOMMENDATIONS_REFRESH_DELAY,
+        unique_key='recommendations:refresh',
+    )
+
+
+def forget(user_id, author_id):
+    """
+    Автор, на которого пользователь подписался, сразу пропадает из его
+    рекомендаций, не дожидаясь refresh()
+    """
+    if Recommendation.objects.filter(user_id=user_id, author_id=author_id).delete()[0]:
+        _bump([user_id])
@@ -0,0 +1,113 @@
+"""
+Полнотекстовый поиск по постам (текст поста и название группы).
+
+SQLite: виртуальная таблица FTS5 posts_post_fts (миграция
+0007_post_search), которую сигналы сохранения и удаления постов и групп
+держат в синхронизации с posts_post и posts_group. Результаты
+упорядочены по bm25.
+PostgreSQL: совпадение ищется по to_tsvector(SEARCH_CONFIG, text) -
+тому же выражению, что и в GIN-индексе миграции 0007_post_search, - или
+по названию группы; ранжирование через SearchRank по тексту и названию
+группы.
+Остальные базы: поиск подстроки без ранжирования.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, Value
+
+from .models import Group
+
+FTS_TABLE = 'posts_post_fts'
+
+_words = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(query):
+    """
+    Строка пользователя -> запрос MATCH: все слова, каждое как префикс
+    """
+    words = _words.findall(query)[:settings.SEARCH_MAX_WORDS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_post(post_id):
+    """
+    Обновить пост в индексе (SQLite)
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, text, group_title) "
+            f"SELECT p.id, p.text, COALESCE(g.title, '') FROM posts_post p "
+            f"LEFT JOIN posts_group g ON g.id = p.group_id WHERE p.id = %s",
+            [post_id],
+        )
+
+
+def unindex_post(post_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def index_group_title(group_id, title):
+    """
+    Новое название группы у всех ее постов в индексе (SQLite)
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET group_title = %s '
+            f'WHERE rowid IN (SELECT id FROM posts_post WHERE group_id = %s)',
+            [title, group_id],
+        )
+
+
+def search_posts(queryset, query):
+    """
+    Посты из queryset, подходящие под запрос, лучшие - первыми; степень
+    совпадения - в поле rank (больше - лучше)
+    """
+    if connection.vendor == 'sqlite':
+        match = fts_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = posts_post.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            # bm25 тем меньше, чем лучше совпадение; rank, как и на
+            # PostgreSQL, тем больше, чем лучше
+            select={'rank': f'-bm25({FTS_TABLE})'},
+            order_by=['-rank', '-pub_date'],
+        )
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        config = settings.SEARCH_CONFIG
+        search_query = SearchQuery(query, config=config, search_type='websearch')
+        # to_tsvector(config, COALESCE(text, '')) - выражение индекса
+        text_vector = SearchVector('text', config=config)
+        groups = Group.objects.alias(vector=SearchVector('title', config=config)).filter(vector=search_query)
+        vector = SearchVector('text', weight='A', config=config) + SearchVector('group__title', weight='B', config=config)
+        return (
+            queryset.alias(text_vector=text_vector)
+            .filter(Q(text_vector=search_query) | Q(group__in=groups.values('pk')))
+            .annotate(rank=SearchRank(vector, search_query))
+            .order_by('-rank', '-pub_date')
+        )
+
+    words = _words.findall(query)
+    if not words:
+        return queryset.none()
+    condition = Q()
+    for word in words:
+        condition &= Q(text__icontains=word) | Q(group__title__icontains=word)
+    return queryset.filter(condition).annotate(rank=Value(0))
@@ -0,0 +1,281 @@
+from django.contrib.flatpages.models import FlatPage
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cards, changelog, counters, events, images, page_cache, recommendations, search, thumbnails, timelines
+from .models import ChangeLog, Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """
+    Новый пост попадает в ленты подписчиков автора
+    """
+    if created:
+        timelines.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """
+    После подписки в ленте появляются последние посты автора
+    """
+    if created:
+        timelines.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    """
+    После отписки посты автора уходят из ленты
+    """
+    timelines.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def count_post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_post_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_deleted(sender, instance, **kwargs):
+    counters.change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'followers_count', 1)
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def bump_card_on_edit(sender, instance, created, **kwargs):
+    if not created:
+        cards.bump_post(instance.pk)
+        # версия из базы: копия могла быть загружена до других изменений
+        instance.refresh_from_db(fields=['version'])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_card_on_comment(sender, instance, **kwargs):
+    cards.bump_post(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def bump_cards_of_group(sender, instance, **kwargs):
+    cards.bump(Post.objects.filter(group=instance))
+
+
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def author_names(user):
+    return {name: getattr(user, name) for name in AUTHOR_NAME_FIELDS}
+
+
+@receiver(post_save, sender=User)
+def bump_cards_of_author(sender, instance, created, **kwargs):
+    # карточки показывают имя автора: вход, смена пароля и т.п. их не меняют
+    if created or getattr(instance, '_previous_names', None) == author_names(instance):
+        return
+    cards.bump(Post.objects.filter(author=instance))
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    previous = Post.objects.filter(pk=instance.pk).values_list('group_id', 'image').first() if instance.pk else None
+    instance._previous_group_id, instance._previous_image = previous or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_pages_on_post_save(sender, instance, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    page_cache.bump(*page_cache.post_scopes(instance.pk, [previous_group_id]))
+
+
+@receiver(pre_delete, sender=Post)
+def remember_page_scopes(sender, instance, **kwargs):
+    # имя автора и адрес группы - одним запросом, пока строки на месте,
+    # а не по запросу на instance.author и instance.group
+    names = Post.objects.filter(pk=instance.pk).values_list('author__username', 'group__slug').first()
+    instance._author_username, instance._group_slug = names or (None, None)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_pages_on_post_delete(sender, instance, **kwargs):
+    scopes = [page_cache.INDEX, page_cache.comments_scope(instance.pk)]
+    if getattr(instance, '_author_username', None):
+        scopes.append(page_cache.profile_scope(instance._author_username))
+    if getattr(instance, '_group_slug', None):
+        scopes.append(page_cache.group_scope(instance._group_slug))
+    page_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_pages_on_comment(sender, instance, **kwargs):
+    page_cache.bump(*page_cache.post_scopes(instance.post_id), page_cache.comments_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_pages_on_follow(sender, instance, **kwargs):
+    usernames = User.objects.filter(pk__in=[instance.user_id, instance.author_id]).values_list('username', flat=True)
+    page_cache.bump(*(page_cache.profile_scope(username) for username in usernames))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_pages_on_group(sender, instance, **kwargs):
+    page_cache.bump(page_cache.CARDS, page_cache.GROUPS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_pages_on_user(sender, instance, created, **kwargs):
+    # как и bump_cards_of_author: страницы меняет только имя автора
+    if created or getattr(instance, '_previous_names', None) == author_names(instance):
+        return
+    page_cache.bump(page_cache.CARDS)
+
+
+@receiver(post_save, sender=FlatPage)
+@receiver(post_delete, sender=FlatPage)
+def invalidate_flatpages(sender, instance, **kwargs):
+    page_cache.bump(page_cache.FLATPAGES)
+
+
+@receiver(pre_save, sender=Post)
+def reset_image_variants(sender, instance, **kwargs):
+    """
+    Превью старого изображения не подходят новому; размеры нового
+    записываются в пост
+    """
+    instance._image_changed = (instance.image.name or '') != (instance._previous_image or '')
+    if instance._image_changed:
+        instance.image_variants = {}
+        instance.image_width, instance.image_height = images.dimensions(instance.image)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if instance.image and getattr(instance, '_image_changed', False):
+        thumbnails.schedule(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def index_group_title(sender, instance, created, **kwargs):
+    if not created:
+        search.index_group_title(instance.pk, instance.title)
+
+
+@receiver(pre_delete, sender=Group)
+def unindex_group_title(sender, instance, **kwargs):
+    # посты удаленной группы останутся без группы
+    search.index_group_title(instance.pk, '')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def record_saved(sender, instance, created, **kwargs):
+    changelog.record(instance, ChangeLog.CREATED if created else ChangeLog.UPDATED)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Follow)
+def record_deleted(sender, instance, **kwargs):
+    changelog.record(instance, ChangeLog.DELETED)
+
+
+@receiver(pre_delete, sender=Group)
+def record_group_removed(sender, instance, **kwargs):
+    changelog.record_updated(Post.objects.filter(group=instance))
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_names(sender, instance, update_fields=None, **kwargs):
+    if not instance.pk or (update_fields and not set(update_fields) & set(AUTHOR_NAME_FIELDS)):
+        instance._previous_names = author_names(instance)
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*AUTHOR_NAME_FIELDS).first()
+    instance._previous_names = previous or author_names(instance)
+
+
+@receiver(post_save, sender=User)
+def record_author_renamed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_names', None)
+    if created or previous is None or previous['username'] == instance.username:
+        return
+    changelog.record_updated(Post.objects.filter(author=instance))
+    changelog.record_updated(Comment.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Post)
+def publish_new_post(sender, instance, created, **kwargs):
+    if created:
+        events.publish_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    if created:
+        events.publish_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def publish_follow(sender, instance, created, **kwargs):
+    if created:
+        events.publish_follow(instance, followed=True)
+
+
+@receiver(post_delete, sender=Follow)
+def publish_unfollow(sender, instance, **kwargs):
+    events.publish_follow(instance, followed=False)
+
+
+@receiver(post_save, sender=Follow)
+def forget_recommendation(sender, instance, created, **kwargs):
+    if created:
+        recommendations.forget(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def schedule_recommendations(sender, instance, **kwargs):
+    """
+    Пересчет рекомендаций по журналу подписок - задачей очереди, одной
+    на все подписки за RECOMMENDATIONS_REFRESH_DELAY секунд
+    """
+    recommendations.schedule_refresh()
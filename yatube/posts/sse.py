@@ -0,0 +1,207 @@
+"""
+Потоки server-sent events вместо периодического опроса страниц.
+
+GET /events/follow/ - новые посты авторов, на которых подписан
+    пользователь сессии (event: post)
+GET /events/posts/<id>/comments/ - новые комментарии к посту
+    (event: comment)
+
+data события - JSON в формате списков API, id - pk поста или
+комментария. При переподключении браузер присылает Last-Event-ID, и
+пропущенные за это время посты или комментарии (не больше
+EVENTS_REPLAY_LIMIT) отдаются из базы перед новыми. Раз в
+EVENTS_KEEPALIVE секунд в поток пишется комментарий, чтобы прокси не
+закрывали соединение.
+
+Приложение ASGI подключается в yatube/asgi.py перед Django: соединение
+держит только корутина, поток из пула занимается лишь на запросы к базе
+при подключении. Вокруг них, как у обработчиков запросов Django,
+закрываются устаревшие и сломанные соединения с базой: поток живет
+дольше запроса, и иначе соединение висело бы все время потока.
+"""
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from . import events
+from .models import Comment, Follow, Post
+
+FOLLOW_PATH = re.compile(r'^/events/follow/$')
+COMMENTS_PATH = re.compile(r'^/events/posts/(?P<post_id>\d+)/comments/$')
+
+
+def is_events_path(path):
+    return path.startswith('/events/')
+
+
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', ())}
+
+
+def _last_event_id(headers):
+    value = headers.get('last-event-id', '')
+    return int(value) if value.isdigit() else None
+
+
+def session_user(headers):
+    """
+    Пользователь сессии из cookie запроса, как у AuthenticationMiddleware
+    """
+    cookie = SimpleCookie(headers.get('cookie', ''))
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')(morsel.value if morsel else None)
+    return auth.get_user(SimpleNamespace(session=store))
+
+
+def follow_stream(subscription, headers):
+    """
+    Подписать на каналы ленты подписок; (пропущенные события,
+    обработчики служебных событий) или None для анонима
+    """
+    user = session_user(headers)
+    if not user.is_authenticated:
+        return None
+    # канал подписчика - до чтения подписок, чтобы не пропустить новые
+    subscription.add(events.follower_channel(user.pk))
+    authors = list(Follow.objects.filter(user=user).values_list('author_id', flat=True))
+    subscription.add(*map(events.author_channel, authors))
+    missed = []
+    last_id = _last_event_id(headers)
+    if last_id is not None and authors:
+        queryset = Post.objects.filter(author_id__in=authors, pk__gt=last_id).order_by('pk')
+        missed = events.post_events(queryset[:settings.EVENTS_REPLAY_LIMIT])
+
+    def on_follow(subscription, event):
+        channel = events.author_channel(event['author_id'])
+        if event['followed']:
+            subscription.add(channel)
+        else:
+            subscription.discard(channel)
+
+    return missed, {'follow': on_follow}
+
+
+def comments_stream(subscription, headers, post_id):
+    """
+    То же для комментариев поста или None, если поста нет
+    """
+    if not Post.objects.filter(pk=post_id).exists():
+        return None
+    subscription.add(events.post_channel(post_id))
+    missed = []
+    last_id = _last_event_id(headers)
+    if last_id is not None:
+        queryset = Comment.objects.filter(post_id=post_id, pk__gt=last_id).order_by('pk')
+        missed = events.comment_events(queryset[:settings.EVENTS_REPLAY_LIMIT])
+    return missed, {}
+
+
+def _with_connections(func):
+    """
+    func с close_old_connections() до и после, как request_started и
+    request_finished у запросов Django
+    """
+
+    def wrapper(*args):
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return wrapper
+
+
+def encode(event):
+    data = json.dumps(event['data'], ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n".encode()
+
+
+async def _plain_response(send, status, text):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': text.encode()})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def application(scope, receive, send):
+    """
+    ASGI-приложение потоков событий
+    """
+    if scope['method'] != 'GET':
+        return await _plain_response(send, 405, 'Method not allowed')
+    headers = _headers(scope)
+    broker = events.get_broker()
+
+    comments = COMMENTS_PATH.match(scope['path'])
+    if FOLLOW_PATH.match(scope['path']):
+        make_stream, args, missing = follow_stream, (headers,), (403, 'Authentication required')
+    elif comments:
+        make_stream, args, missing = comments_stream, (headers, int(comments['post_id'])), (404, 'Not found')
+    else:
+        return await _plain_response(send, 404, 'Not found')
+
+    # каналы подписываются до чтения пропущенных событий, чтобы ничего не
+    # потерять между ними; повторы отсеиваются по id
+    subscription = broker.subscribe()
+    try:
+        stream = await sync_to_async(_with_connections(make_stream))(subscription, *args)
+        if stream is None:
+            return await _plain_response(send, *missing)
+        missed, handlers = stream
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+
+        replayed = set()
+        for event in missed:
+            await send({'type': 'http.response.body', 'body': encode(event), 'more_body': True})
+            replayed.add(event['id'])
+
+        disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            while True:
+                get = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {get, disconnect}, timeout=settings.EVENTS_KEEPALIVE, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    get.cancel()
+                    break
+                if get not in done:
+                    get.cancel()
+                    await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                    continue
+
+                event = get.result()
+                if event['event'] in handlers:
+                    handlers[event['event']](subscription, event)
+                elif event['id'] not in replayed:
+                    await send({'type': 'http.response.body', 'body': encode(event), 'more_body': True})
+        finally:
+            disconnect.cancel()
+    finally:
+        subscription.close()
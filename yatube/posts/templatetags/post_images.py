@@ -0,0 +1,11 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+# изображение поста: готовые превью из фонового обработчика или оригинал
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post):
+    return {'image': thumbnails.sources(post)}
@@ -0,0 +1,13 @@
+from django import template
+from django.conf import settings
+
+register = template.Library()
+
+
+# "Кого читать": готовые рекомендации пользователя одним запросом по индексу
+@register.inclusion_tag('includes/recommendations.html')
+def who_to_follow(user):
+    if not user.is_authenticated:
+        return {'recommendations': []}
+    recommendations = user.recommendations.select_related('author').order_by('-score')[:settings.RECOMMENDATIONS_SHOWN]
+    return {'recommendations': recommendations}
@@ -0,0 +1,78 @@
+"""
+Фоновая подготовка превью изображений постов.
+
+Когда у поста появляется или меняется изображение, задача очереди
+'thumbnails' (jobs/queue.py) создает превью всех размеров из
+settings.POST_IMAGE_VARIANTS во всех форматах из POST_IMAGE_FORMATS.
+Имена файлов записываются в Post.image_variants, версия карточки и
+кэш страниц обновляются. Пока превью не готовы, шаблоны показывают
+оригинал, поэтому запрос страницы никогда не обрабатывает изображение.
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F
+from sorl.thumbnail import get_thumbnail
+
+from jobs.queue import enqueue
+
+from . import page_cache
+from .models import Post
+
+
+def schedule(post):
+    """
+    Поставить задачу подготовки превью изображения поста; задача видна
+    обработчику после фиксации транзакции
+    """
+    enqueue(generate, post.pk, post.image.name, queue='thumbnails')
+
+
+def generate(post_id, image_name):
+    """
+    Создать превью; если изображение поста уже сменилось - ничего не делать.
+    Ошибка обработки - повтор задачи.
+    """
+    post = Post.objects.filter(pk=post_id, image=image_name).first()
+    if post is None:
+        return
+    variants = {
+        geometry: {
+            image_format.lower(): get_thumbnail(post.image, geometry, format=image_format, **options).name
+            for image_format in settings.POST_IMAGE_FORMATS
+        }
+        for geometry, options in settings.POST_IMAGE_VARIANTS.items()
+    }
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        image_variants=variants, version=F('version') + 1,
+    )
+    if updated:
+        page_cache.bump(*page_cache.post_scopes(post_id))
+
+
+def sources(post):
+    """
+    Адреса и размеры изображения поста для шаблона: готовые превью или
+    оригинал; размеры берутся из поста, файл не открывается
+    """
+    if not post.image:
+        return None
+    widths = {geometry: int(geometry.split('x')[0]) for geometry in post.image_variants}
+    if not widths:
+        return {'src': post.image.url, 'width': post.image_width, 'height': post.image_height}
+
+    def srcset(image_format):
+        return ', '.join(
+            f'{default_storage.url(post.image_variants[geometry][image_format])} {width}w'
+            for geometry, width in sorted(widths.items(), key=lambda item: item[1])
+            if image_format in post.image_variants[geometry]
+        )
+
+    largest = max(widths, key=widths.get)
+    width, height = map(int, largest.split('x'))
+    return {
+        'src': default_storage.url(post.image_variants[largest].get('jpeg') or post.image.name),
+        'width': width,
+        'height': height,
+        'srcset': srcset('jpeg'),
+        'webp_srcset': srcset('webp'),
+    }
@@ -0,0 +1,244 @@
+"""
+Материализованные ленты подписок (fan-out on write).
+
+Новый пост автора сразу раскладывается в ленты его подписчиков
+(TimelineEntry), поэтому /follow/ читает готовый список по индексу
+(user, -pub_date) без JOIN через Follow. Для авторов с огромным числом
+подписчиков раскладка не делается: их посты подмешиваются в ленту при
+чтении (pull). Когда автор опускается ниже TIMELINE_FANOUT_LIMIT, его
+посты за время pull-режима раскладываются по лентам подписчиков задачей
+очереди (backfill_author).
+
+Лента хранит не больше TIMELINE_MAX_LENGTH записей: после раскладки
+поста лишние записи подписчиков с полной лентой удаляет задача очереди
+(trim_followers), а не запрос, создавший пост.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+
+from jobs.queue import enqueue
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .pagination import KeysetPaginator, decode_cursor, keyset_filter
+
+PULL_AUTHORS_CACHE_KEY = 'timelines:pull_authors'
+PULL_AUTHORS_CACHE_TIMEOUT = 60 * 5
+# последний вычисленный набор pull-авторов, без срока: по нему видно,
+# кто из авторов вернулся к раскладке
+PULL_AUTHORS_PREVIOUS_KEY = 'timelines:pull_authors:previous'
+CHUNK_SIZE = 500
+
+
+def pull_authors():
+    """
+    Авторы, чьи посты не раскладываются по лентам, а подмешиваются при чтении
+    """
+    def compute():
+        return set(
+            UserStats.objects.filter(followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+            .values_list('user_id', flat=True)
+        )
+    current = cache.get_or_set(PULL_AUTHORS_CACHE_KEY, compute, PULL_AUTHORS_CACHE_TIMEOUT)
+    check_pull_transitions(current)
+    return current
+
+
+def check_pull_transitions(current):
+    """
+    Сравнить набор pull-авторов с предыдущим и поставить backfill_author
+    для вернувшихся к раскладке - кто бы и когда ни пересчитал набор
+    """
+    previous = cache.get(PULL_AUTHORS_PREVIOUS_KEY)
+    if previous == current:
+        return
+    for author_id in (previous or set()) - current:
+        enqueue(backfill_author, author_id, queue='timelines', unique_key=f'timelines:backfill:{author_id}')
+    cache.set(PULL_AUTHORS_PREVIOUS_KEY, current, None)
+
+
+def fan_out(post):
+    """
+    Добавить новый пост в ленты подписчиков автора; переполненные ленты
+    обрезаются задачей очереди trim_followers
+    """
+    if post.author_id in pull_authors():
+        return
+    followers = list(Follow.objects.filter(author_id=post.author_id).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post.pk, author_id=post.author_id, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        batch_size=CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+    if followers:
+        enqueue(
+            trim_followers, post.author_id, queue='timelines', unique_key=f'timelines:trim:{post.author_id}',
+        )
+
+
+def latest_posts(author_id):
+    """
+    (id, pub_date) последних постов автора, которые могут попасть в ленту
+    """
+    return list(
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    )
+
+
+def _insert(user_id, author_id, posts):
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        batch_size=CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def backfill(user_id, author_id):
+    """
+    После подписки добавить в ленту последние посты автора
+    """
+    if author_id in pull_authors():
+        return
+    _insert(user_id, author_id, latest_posts(author_id))
+
+
+def backfill_author(author_id):
+    """
+    Задача: автор вернулся к раскладке - его последние посты, в том
+    числе опубликованные в pull-режиме, добавляются в ленты подписчиков
+    """
+    if author_id in pull_authors():
+        return
+    posts = latest_posts(author_id)
+    followers = Follow.objects.filter(author_id=author_id).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        _insert(user_id, author_id, posts)
+
+
+def remove(user_id, author_id):
+    """
+    После отписки убрать посты автора из ленты
+    """
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def trim(user_id):
+    """
+    Оставить в ленте не больше TIMELINE_MAX_LENGTH последних записей
+    """
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    last = (
+        entries.order_by('-pub_date', '-post_id')
+        .values_list('pub_date', 'post_id')[settings.TIMELINE_MAX_LENGTH - 1:settings.TIMELINE_MAX_LENGTH]
+    )
+    last = list(last)
+    if last:
+        keyset_filter(entries, ('pub_date', 'post_id'), last[0]).delete()
+
+
+def trim_followers(author_id):
+    """
+    Задача: обрезать переполненные ленты подписчиков автора
+    """
+    trim_full(list(Follow.objects.filter(author_id=author_id).values_list('user_id', flat=True)))
+
+
+def trim_full(user_ids):
+    """
+    trim() для тех из user_ids, у кого лента длиннее TIMELINE_MAX_LENGTH:
+    длина считается одним запросом на CHUNK_SIZE пользователей
+    """
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        overflowing = (
+            TimelineEntry.objects.filter(user_id__in=user_ids[start:start + CHUNK_SIZE])
+            .values('user_id').annotate(entries=Count('id')).order_by()
+            .filter(entries__gt=settings.TIMELINE_MAX_LENGTH)
+            .values_list('user_id', flat=True)
+        )
+        for user_id in overflowing:
+            trim(user_id)
+
+
+def rebuild(user_id):
+    """
+    Собрать ленту пользователя заново по его подпискам
+    """
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = (
+        Post.objects.filter(author__following__user_id=user_id)
+        .exclude(author_id__in=pull_authors())
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'author_id', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id, pub_date=pub_date)
+            for post_id, author_id, pub_date in posts
+        ],
+        batch_size=CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+class TimelinePaginator(KeysetPaginator):
+    """
+    Лента подписок по курсору: записи TimelineEntry пользователя
+    плюс посты pull-авторов, на которых он подписан, слитые по
+    (pub_date, id). queryset - посты, из которых собирается страница.
+    """
+
+    def __init__(self, queryset, per_page, user):
+        super().__init__(queryset, per_page, keys=('pub_date', 'post_id'))
+        self.user = user
+
+    def decode(self, cursor):
+        return decode_cursor(cursor, TimelineEntry, self.keys)
+
+    def sources(self):
+        yield TimelineEntry.objects.filter(user=self.user).values('pub_date', 'post_id'), self.keys
+        followed_pull_authors = pull_authors()
+        if followed_pull_authors:
+            followed_pull_authors = Follow.objects.filter(
+                user=self.user, author_id__in=followed_pull_authors
+            ).values_list('author_id', flat=True)
+            pulled = Post.objects.filter(author_id__in=list(followed_pull_authors))
+            yield pulled.values('pub_date', post_id=F('id')), ('pub_date', 'id')
+
+    def fetch(self, position, reverse, limit):
+        streams = []
+        for queryset, keys in self.sources():
+            if position is not None:
+                queryset = keyset_filter(queryset, keys, position, reverse)
+            ordering = keys if reverse else [f'-{key}' for key in keys]
+            streams.append(list(queryset.order_by(*ordering)[:limit]))
+        if len(streams) == 1:
+            return streams[0]
+
+        def sort_key(row):
+            return row['pub_date'], row['post_id']
+
+        rows = heapq.merge(*streams, key=sort_key, reverse=not reverse)
+        seen = set()
+        result = []
+        for row in rows:
+            if row['post_id'] not in seen:
+                seen.add(row['post_id'])
+                result.append(row)
+            if len(result) == limit:
+                break
+        return result
+
+    def resolve(self, rows):
+        posts = self.queryset.in_bulk([row['post_id'] for row in rows])
+        return [posts[row['post_id']] for row in rows if row['post_id'] in posts]
@@ -20,6 +20,9 @@ urlpatterns = [
     # path("follow/", views.follow_index, name="follow_index"),
     path("follow/", views_class_based.FollowPostsListView.as_view(), name="follow_index"),
 
+    # поиск по записям
+    path("search/", views_class_based.SearchPostsListView.as_view(), name="search"),
+
     # профайл пользователя
     # path('<str:username>/', views.profile, name='profile'),
     path('<str:slug>/', views_class_based.ProfileDetailView.as_view(), name='profile'),
@@ -38,4 +41,7 @@ urlpatterns = [
     # добавление комментария
     path("<str:username>/<int:post_id>/comment/", views.add_comment, name="add_comment"),
     # path("<str:username>/<int:post_id>/comment/", views_class_based.AddCommentView.as_view(), name="add_comment"),
+
+    # следующая страница комментариев
+    path("<str:username>/<int:post_id>/comments/", views.comments, name="comments"),
 ]
@@ -1,13 +1,20 @@
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from .models import Post, Group, User, Follow, Comment
+from . import follows
+from .counters import stats_for, is_following
+from .pagination import KeysetPaginator
+from .timelines import TimelinePaginator
+from .models import Post, Group, User, Comment
 from .forms import PostForm, CommentForm
-from django.views.decorators.cache import cache_page
+from .page_cache import (
+    cache_anonymous_page, comment_scopes, conditional_page, follow_scopes, group_scopes, index_scopes,
+    profile_scopes,
+)
 
 
-# @cache_page(20)
+@conditional_page(index_scopes)
+@cache_anonymous_page(index_scopes)
 def index(request):
     """
     Функция для представления главной страницы
@@ -15,16 +22,17 @@ def index(request):
 
     template = "index/index.html"
 
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.feed()
+    paginator = KeysetPaginator(post_list, 10)
+    page = paginator.get_page(request.GET.get('cursor'))
 
     context = {'page_obj': page, 'paginator': paginator}
 
     return render(request, template, context)
 
 
+@conditional_page(group_scopes)
+@cache_anonymous_page(group_scopes)
 def group_posts(request, slug):
     """
     Функция для представления страницы группы
@@ -34,10 +42,9 @@ def group_posts(request, slug):
 
     group = get_object_or_404(Group, slug=slug)
 
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = group.posts.feed()
+    paginator = KeysetPaginator(post_list, 10)
+    page = paginator.get_page(request.GET.get('cursor'))
 
     context = {"group": group, 'page_obj': page, 'paginator': paginator}
 
@@ -62,6 +69,8 @@ def new_post(request):
     return render(request, template, {'form': form})
 
 
+@conditional_page(profile_scopes)
+@cache_anonymous_page(profile_scopes)
 def profile(request, username):
     """
     Профиль пользователя
@@ -69,17 +78,18 @@ def profile(request, username):
 
     template = 'posts/profile.html'
 
-    author = get_object_or_404(User, username=username)
-
-    following = author.following.filter(user=request.user)
-    follower = author.follower.filter(user=request.user)
+    author = get_object_or_404(User.objects.select_related('stats'), username=username)
 
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = author.posts.feed()
+    paginator = KeysetPaginator(post_list, 10)
+    page = paginator.get_page(request.GET.get('cursor'))
 
-    context = {'author': author, 'page': page, 'follower': follower, 'following': following}
+    context = {
+        'author': author,
+        'page': page,
+        'stats': stats_for(author),
+        'following': is_following(request.user, author),
+    }
 
     return render(request, template, context)
 
@@ -90,14 +100,16 @@ def post_view(request, username, post_id):
     """
     template = 'posts/post_view.html'
 
-    author = get_object_or_404(User, username=username)
-
-    following = author.following.filter(user=request.user)
-    follower = author.follower.filter(user=request.user)
+    author = get_object_or_404(User.objects.select_related('stats'), username=username)
 
-    post = author.posts.filter(pk=post_id).first()
+    post = author.posts.feed().filter(pk=post_id).first()
 
-    context = {'author': author, 'post': post, 'following': following, 'follower': follower}
+    context = {
+        'author': author,
+        'post': post,
+        'stats': stats_for(author),
+        'following': is_following(request.user, author),
+    }
 
     return render(request, template, context)
 
@@ -131,9 +143,7 @@ def add_comment(request, username, post_id):
     """
     template = 'posts/comments.html'
 
-    post = get_object_or_404(Post, pk=post_id)
-
-    items = post.comments.all()
+    post = get_object_or_404(Post.objects.select_related('author'), pk=post_id)
 
     form = CommentForm(request.POST or None)
 
@@ -144,9 +154,26 @@ def add_comment(request, username, post_id):
         form.save()
         return redirect('post', username=post.author.username, post_id=post_id)
 
+    # страница комментариев нужна только для формы с ошибками
+    items = post.comments.page(request.GET.get('cursor'))
+
     return render(request, template, {'form': form, 'post': post, 'items': items})
 
 
+@conditional_page(comment_scopes)
+def comments(request, username, post_id):
+    """
+    Следующая страница комментариев поста (HTML-фрагмент для "Показать еще")
+    """
+    template = 'includes/comment_list.html'
+
+    post = get_object_or_404(Post.objects.select_related('author'), pk=post_id, author__username=username)
+
+    items = post.comments.page(request.GET.get('cursor'))
+
+    return render(request, template, {'post': post, 'items': items})
+
+
 def page_not_found(request, exception):
     """
     Страница 404 ошибки
@@ -162,16 +189,15 @@ def server_error(request):
 
 
 @login_required
+@conditional_page(follow_scopes)
 def follow_index(request):
     """
     Страница с постами авторов, на которых подписан пользователь
     """
     template = 'posts/follow.html'
 
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator = TimelinePaginator(Post.objects.feed(), 10, user=request.user)
+    page = paginator.get_page(request.GET.get('cursor'))
 
     context = {'page_obj': page}
 
@@ -183,10 +209,10 @@ def profile_follow(request, username):
     """
     Подписаться на пользователя
     """
-    follow_author = get_object_or_404(User, username=username)
+    follow_author = get_object_or_404(User.objects.only('pk'), username=username)
 
-    if follow_author != request.user and (not request.user.follower.filter(author=follow_author).exists()):
-        Follow.objects.create(user=request.user, author=follow_author)
+    # INSERT сразу, повтор и подписку на себя отсекают ограничения базы
+    follows.follow(request.user, follow_author.pk)
 
     return redirect('profile', username)
 
@@ -196,11 +222,8 @@ def profile_unfollow(request, username):
     """
     Отписаться от пользователя
     """
+    follow_author = get_object_or_404(User.objects.only('pk'), username=username)
 
-    follow_author = get_object_or_404(User, username=username)
-    data_follow = request.user.follower.filter(author=follow_author)
-
-    if data_follow.exists():
-        data_follow.delete()
+    follows.unfollow(request.user, [follow_author.pk])
 
     return redirect('profile', username)
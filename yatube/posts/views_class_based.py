@@ -3,10 +3,19 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from .models import Post, Group, User, Follow, Comment
 from .forms import PostForm, CommentForm
 from django.shortcuts import get_object_or_404, reverse
-from django.core.paginator import Paginator
-
-
-class PostsListView(ListView):
+from django.utils.decorators import method_decorator
+from .counters import stats_for, is_following
+from .page_cache import (
+    cache_anonymous_page, conditional_page, follow_scopes, group_scopes, index_scopes, profile_scopes,
+)
+from .pagination import CursorPaginationMixin, KeysetPaginator
+from .search import search_posts
+from .timelines import TimelinePaginator
+
+
+@method_decorator(conditional_page(index_scopes), name='dispatch')
+@method_decorator(cache_anonymous_page(index_scopes), name='dispatch')
+class PostsListView(CursorPaginationMixin, ListView):
     """
     Главная страница
     """
@@ -14,8 +23,13 @@ class PostsListView(ListView):
     template_name = 'index/index.html'
     paginate_by = 10
 
+    def get_queryset(self):
+        return Post.objects.feed()
 
-class GroupPostsListView(ListView):
+
+@method_decorator(conditional_page(group_scopes), name='dispatch')
+@method_decorator(cache_anonymous_page(group_scopes), name='dispatch')
+class GroupPostsListView(CursorPaginationMixin, ListView):
     """
     Cтраница группы
     """
@@ -24,7 +38,7 @@ class GroupPostsListView(ListView):
 
     def get_queryset(self):
         self.group = get_object_or_404(Group, slug=self.kwargs['slug'])
-        return self.group.posts.all()
+        return self.group.posts.feed()
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
@@ -32,6 +46,25 @@ class GroupPostsListView(ListView):
         return context
 
 
+class SearchPostsListView(ListView):
+    """
+    Поиск по постам, лучшие совпадения - первыми
+    """
+    template_name = 'posts/search.html'
+    paginate_by = 10
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
+            return Post.objects.none()
+        return search_posts(Post.objects.feed(), self.query)
+
+    def get_context_data(self, *, object_list=None, **kwargs):
+        context = super().get_context_data(object_list=object_list, **kwargs)
+        context['query'] = self.query
+        return context
+
+
 class NewPostCreateView(LoginRequiredMixin, CreateView):
     """
     Страница добавления нового поста
@@ -50,6 +83,8 @@ class NewPostCreateView(LoginRequiredMixin, CreateView):
         return reverse('index')
 
 
+@method_decorator(conditional_page(profile_scopes), name='dispatch')
+@method_decorator(cache_anonymous_page(profile_scopes), name='dispatch')
 class ProfileDetailView(DetailView):
     """
     Профиль пользователя
@@ -59,18 +94,18 @@ class ProfileDetailView(DetailView):
     slug_field = 'username'
     context_object_name = 'author'
 
+    def get_queryset(self):
+        return User.objects.select_related('stats')
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
 
-        following = self.object.following.filter(user=self.request.user)
-        follower = self.object.follower.filter(user=self.request.user)
-        context['following'] = following
-        context['follower'] = follower
+        context['stats'] = stats_for(self.object)
+        context['following'] = is_following(self.request.user, self.object)
 
-        post_list = self.object.posts.all()
-        paginator = Paginator(post_list, 10)
-        page_number = self.request.GET.get('page')
-        page = paginator.get_page(page_number)
+        post_list = self.object.posts.feed()
+        paginator = KeysetPaginator(post_list, 10)
+        page = paginator.get_page(self.request.GET.get('cursor'))
         context['page'] = page
 
         return context
@@ -86,14 +121,16 @@ class PostDetailView(DetailView):
     slug_field = 'username'
     pk_url_kwarg = 'post_id'
 
+    def get_queryset(self):
+        return Post.objects.feed()
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
         author = self.object.author
-        following = author.following.filter(user=self.request.user)
-        follower = author.follower.filter(user=self.request.user)
         context['author'] = author
-        context['follower'] = follower
-        context['following'] = following
+        context['stats'] = stats_for(author)
+        context['following'] = is_following(self.request.user, author)
+        context['items'] = self.object.comments.page()
         return context
 
 
@@ -115,7 +152,9 @@ class PostEditView(LoginRequiredMixin, UpdateView):
         return reverse('post', kwargs={'username': self.request.user, 'post_id': self.object.id})
 
 
-class FollowPostsListView(LoginRequiredMixin, ListView):
+# условная проверка - на get, после проверки входа в LoginRequiredMixin.dispatch
+@method_decorator(conditional_page(follow_scopes), name='get')
+class FollowPostsListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """
     Страница с постами авторов, на которых подписан пользователь
     """
@@ -124,4 +163,7 @@ class FollowPostsListView(LoginRequiredMixin, ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return super().get_queryset().filter(author__following__user=self.request.user)
+        return Post.objects.feed()
+
+    def get_cursor_paginator(self, queryset, page_size):
+        return TimelinePaginator(queryset, page_size, user=self.request.user)
@@ -1,4 +1,19 @@
+import pytest
+from django.core.cache import caches
+
 pytest_plugins = [
     'fixtures.fixture_user',
     'fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(settings, tmp_path):
+    # общий кэш - во временном файле, а не в cache.sqlite3 разработчика с
+    # его сессиями и страницами
+    settings.CACHES = {
+        **settings.CACHES,
+        'shared': {**settings.CACHES['shared'], 'LOCATION': str(tmp_path / 'cache.sqlite3')},
+    }
+    for alias in settings.CACHES:
+        caches[alias].clear()
@@ -1,4 +1,5 @@
 import pytest
+from rest_framework.test import APIClient
 
 
 @pytest.fixture
@@ -10,3 +11,15 @@ def user(django_user_model):
 def user_client(user, client):
     client.force_login(user)
     return client
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(username='author', password='1234567')
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
@@ -0,0 +1,122 @@
+import pickle
+import time
+
+import pytest
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import _token_key, _user_key, get_user
+
+AUTH_TABLES = ('auth_user', 'authtoken_token', 'django_session')
+
+
+def auth_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, [query['sql'] for query in context if any(table in query['sql'] for table in AUTH_TABLES)]
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+    return client
+
+
+def jwt_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+class TestAuthCache:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('make_client', [token_client, jwt_client])
+    def test_api_without_auth_queries(self, user, make_client):
+        client = make_client(user)
+        response, queries = auth_queries(client, '/api/v1/groups/')
+        assert response.status_code == 200 and queries
+
+        response, queries = auth_queries(client, '/api/v1/groups/')
+        assert response.status_code == 200
+        assert queries == [], 'Повторный запрос не должен читать токен и пользователя из базы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_session_without_auth_queries(self, user):
+        client = Client()
+        client.force_login(user)
+        client.get('/new/')
+        response, queries = auth_queries(client, '/new/')
+        assert response.status_code == 200
+        assert queries == [], 'Повторный запрос не должен читать сессию и пользователя из базы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_revoked_token(self, user):
+        client = token_client(user)
+        assert client.get('/api/v1/groups/').status_code == 200
+        Token.objects.get(user=user).delete()
+        assert client.get('/api/v1/groups/').status_code == 401, 'Удаленный токен должен сразу перестать работать'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('make_client', [token_client, jwt_client])
+    def test_deactivated_user(self, user, make_client):
+        client = make_client(user)
+        assert client.get('/api/v1/groups/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/groups/').status_code == 401, 'Заблокированный пользователь не должен проходить'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_forget_after_commit(self, user, settings):
+        cache = caches[settings.AUTH_CACHE_ALIAS]
+        get_user(user.pk)
+        stale = cache.get(_user_key(user.pk))
+        with transaction.atomic():
+            user.is_active = False
+            user.save()
+            # параллельный запрос читает еще не измененную строку и кэширует ее
+            cache.set(_user_key(user.pk), stale)
+        assert get_user(user.pk).is_active is False, 'Кэш пользователя должен сбрасываться после коммита'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_password_change_ends_sessions(self, user):
+        client = Client()
+        client.force_login(user)
+        assert client.get('/new/').status_code == 200
+        user.set_password('new password 1234')
+        user.save()
+        assert client.get('/new/').status_code == 302, 'После смены пароля старые сессии должны закончиться'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_within_ttl(self, user, settings, django_user_model):
+        settings.AUTH_CACHE_TIMEOUT = 0.2
+        client = token_client(user)
+        assert client.get('/api/v1/groups/').status_code == 200
+        # изменение в обход сигналов, как из другого процесса без сброса кэша
+        django_user_model.objects.filter(pk=user.pk).update(is_active=False)
+        time.sleep(0.3)
+        assert client.get('/api/v1/groups/').status_code == 401, 'Устаревание кэша ограничено AUTH_CACHE_TIMEOUT'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_secrets_in_cache(self, user, settings, django_user_model):
+        client = token_client(user)
+        assert client.get('/api/v1/groups/').status_code == 200
+        password, key = user.password, Token.objects.get(user=user).key
+        cache = caches[settings.AUTH_CACHE_ALIAS]
+        cached = pickle.dumps([cache.get(f'auth:user:{user.pk}'), cache.get(_token_key(key))])
+        assert password.encode() not in cached and key.encode() not in cached, \
+            'Хэш пароля и токен не должны попадать в общий кэш'
+
+        with CaptureQueriesContext(connection) as context:
+            cached_user = get_user(user.pk)
+        assert len(context) == 0 and cached_user.username == user.username
+        cached_user.first_name = 'Имя'
+        cached_user.save()
+        saved = django_user_model.objects.get(pk=user.pk)
+        assert saved.password == password and saved.first_name == 'Имя', \
+            'Пользователь из кэша сохраняет только загруженные поля'
@@ -0,0 +1,116 @@
+import pytest
+from rest_framework.test import APIClient
+
+from posts.api.batch import BatchView
+from posts.models import Comment, Follow, Post, TimelineEntry, UserStats
+
+
+class TestBatch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_batch_writes(self, api_client, user, author, post):
+        follower = APIClient()
+        follower.force_authenticate(author)
+        follower.post('/api/v1/follow/', {'author': user.username})
+
+        operations = [
+            {'op': 'create', 'model': 'post', 'data': {'text': 'Пакетный пост 1'}},
+            {'op': 'create', 'model': 'post', 'data': {'text': 'Пакетный пост 2'}},
+            {'op': 'update', 'model': 'post', 'id': post.pk, 'data': {'text': 'Исправленный пост'}},
+            {'op': 'create', 'model': 'comment', 'post': post.pk, 'data': {'text': 'Комментарий'}},
+            {'op': 'create', 'model': 'follow', 'data': {'author': author.username}},
+        ]
+        response = api_client.post('/api/v1/batch/', {'operations': operations}, format='json')
+        assert response.status_code == 200, response.json()
+        results = response.json()['results']
+        assert [result['status'] for result in results] == [201, 201, 200, 201, 201]
+        assert results[0]['data']['author'] == user.username
+
+        post.refresh_from_db()
+        assert post.text == 'Исправленный пост' and post.comment_count == 1
+        assert UserStats.objects.get(pk=user.pk).posts_count == 3, 'Счетчики должны обновляться и для пакетной записи'
+        assert TimelineEntry.objects.filter(user=author).count() == 3, \
+            'Пакетные посты должны попадать в ленты подписчиков'
+        assert Follow.objects.filter(user=user, author=author).exists()
+
+        comment_id = results[3]['data']['id']
+        operations = [
+            {'op': 'delete', 'model': 'comment', 'id': comment_id},
+            {'op': 'delete', 'model': 'follow', 'id': Follow.objects.get(user=user).pk},
+        ]
+        response = api_client.post('/api/v1/batch/', {'operations': operations}, format='json')
+        assert [result['status'] for result in response.json()['results']] == [204, 204]
+        post.refresh_from_db()
+        assert post.comment_count == 0 and not Follow.objects.filter(user=user).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_batch_is_atomic(self, api_client, author):
+        foreign_post = Post.objects.create(text='Чужой пост', author=author)
+        operations = [
+            {'op': 'create', 'model': 'post', 'data': {'text': 'Пост'}},
+            {'op': 'update', 'model': 'post', 'id': foreign_post.pk, 'data': {'text': 'Взлом'}},
+            {'op': 'create', 'model': 'comment', 'post': foreign_post.pk, 'data': {}},
+            {'op': 'update', 'model': 'follow', 'id': 1, 'data': {}},
+        ]
+        response = api_client.post('/api/v1/batch/', {'operations': operations}, format='json')
+        assert response.status_code == 400
+        results = response.json()
+        assert 'operations' in results, 'Недопустимая операция отклоняет пакет целиком'
+
+        response = api_client.post('/api/v1/batch/', {'operations': operations[:3]}, format='json')
+        assert response.status_code == 400
+        statuses = [result['status'] for result in response.json()['results']]
+        assert statuses == ['not applied', 403, 400]
+        assert Post.objects.count() == 1 and not Comment.objects.exists(), 'При ошибке ничего не записывается'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_on_deleted_post(self, api_client, user):
+        own_post = Post.objects.create(text='Свой пост', author=user)
+        operations = [
+            {'op': 'delete', 'model': 'post', 'id': own_post.pk},
+            {'op': 'create', 'model': 'comment', 'post': own_post.pk, 'data': {'text': 'Комментарий'}},
+        ]
+        response = api_client.post('/api/v1/batch/', {'operations': operations}, format='json')
+        assert response.status_code == 400
+        assert [result['status'] for result in response.json()['results']] == ['not applied', 404], \
+            'Комментарий к посту, удаленному раньше в пакете, должен получать 404'
+        assert Post.objects.filter(pk=own_post.pk).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_conflicts(self, api_client, user, author, post, monkeypatch):
+        prepare = BatchView.prepare
+        operations = [
+            {'op': 'create', 'model': 'post', 'data': {'text': 'Пакетный пост'}},
+            {'op': 'create', 'model': 'follow', 'data': {'author': author.username}},
+        ]
+
+        def follow_meanwhile(view, items):
+            prepared = prepare(view, items)
+            Follow.objects.create(user=user, author=author)
+            return prepared
+
+        monkeypatch.setattr(BatchView, 'prepare', follow_meanwhile)
+        response = api_client.post('/api/v1/batch/', {'operations': operations}, format='json')
+        assert response.status_code == 409, 'Подписка, созданная параллельно, не должна давать 500'
+        assert [result['status'] for result in response.json()['results']] == ['not applied', 409]
+        assert not Post.objects.filter(text='Пакетный пост').exists(), 'При конфликте ничего не записывается'
+
+        def delete_meanwhile(view, items):
+            prepared = prepare(view, items)
+            Post.objects.filter(pk=post.pk).delete()
+            return prepared
+
+        monkeypatch.setattr(BatchView, 'prepare', delete_meanwhile)
+        operations = [{'op': 'create', 'model': 'comment', 'post': post.pk, 'data': {'text': 'Комментарий'}}]
+        response = api_client.post('/api/v1/batch/', {'operations': operations}, format='json')
+        assert response.status_code == 409, 'Комментарий к посту, удаленному параллельно, не должен давать 500'
+        assert [result['status'] for result in response.json()['results']] == [409]
+        assert not Comment.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_batch_limit(self, api_client, settings):
+        settings.BATCH_MAX_OPERATIONS = 2
+        operations = [{'op': 'create', 'model': 'post', 'data': {'text': 'Пост'}}] * 3
+        response = api_client.post('/api/v1/batch/', {'operations': operations}, format='json')
+        assert response.status_code == 400
+        assert APIClient().post('/api/v1/batch/', {'operations': operations}, format='json').status_code == 401
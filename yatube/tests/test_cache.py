@@ -0,0 +1,88 @@
+import threading
+import time
+
+from django.core.cache import cache, caches
+
+from yatube.cache import TwoTierCache
+
+
+def two_tier(location, **options):
+    return TwoTierCache(location, {'OPTIONS': {'SHARED': 'shared', **options}})
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestTwoTierCache:
+
+    def test_local_tier(self):
+        other_process = two_tier('test-other')
+        cache.set('key', 'value')
+        assert other_process.get('key') == 'value', 'Значение должно быть видно через общий кэш'
+
+        caches['shared'].delete('key')
+        assert cache.get('key') == 'value', 'Повторное чтение должно обслуживаться локальным уровнем'
+
+        cache.delete('key')
+        assert cache.get('key') is None
+
+    def test_local_ttl_and_lru(self):
+        local = two_tier('test-lru', LOCAL_MAX_ENTRIES=2, LOCAL_TIMEOUT=0.05)
+        for key in ('a', 'b', 'c'):
+            local.set(key, key)
+        caches['shared'].clear()
+        assert local.get('a') is None, 'Старейший ключ должен вытесняться из LRU'
+        assert local.get('c') == 'c'
+
+        time.sleep(0.1)
+        assert local.get('c') is None, 'Значение должно устаревать в локальном уровне по LOCAL_TIMEOUT'
+
+    def test_single_flight(self):
+        processes = [two_tier(f'test-process-{i}') for i in range(2)]
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'hot value'
+
+        results = []
+
+        def worker(index):
+            # половина потоков - в одном «процессе», половина - в другом
+            process = processes[index % 2]
+            results.append(process.get_or_set('hot-key', compute, 60))
+
+        run_threads(worker, 8)
+        assert len(calls) == 1, 'Промах по горячему ключу должен пересчитываться один раз'
+        assert results == ['hot value'] * 8
+
+
+class TestSQLiteCache:
+
+    def test_atomic_incr_and_add(self):
+        shared = caches['shared']
+        shared.set('counter', 0)
+        added = []
+
+        def worker(index):
+            for _ in range(50):
+                shared.incr('counter')
+            added.append(shared.add('lock', 1))
+
+        run_threads(worker, 8)
+        assert shared.get('counter') == 400, 'incr должен быть атомарным'
+        assert added.count(True) == 1, 'add должен срабатывать ровно один раз'
+
+    def test_expiry(self):
+        shared = caches['shared']
+        shared.set('short', 'value', 0.05)
+        assert shared.get('short') == 'value'
+        time.sleep(0.1)
+        assert shared.get('short') is None
+        assert shared.get_many(['short']) == {}
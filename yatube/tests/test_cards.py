@@ -0,0 +1,68 @@
+import pytest
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from posts.models import Comment, Group, Post
+
+
+def card_key(post):
+    post.refresh_from_db()
+    return make_template_fragment_key('post_card', [post.pk, post.version])
+
+
+class TestPostCardCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_card_is_cached_and_invalidated(self, client, post_with_group, user):
+        post = post_with_group
+        client.get('/')
+        assert cache.get(card_key(post)) is not None, 'Карточка поста должна попасть в кэш'
+
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        assert cache.get(card_key(post)) is None, 'Новый комментарий должен менять версию карточки'
+        assert '1 комментариев' in client.get('/').content.decode()
+
+        Group.objects.filter(pk=post.group_id).first().save()
+        assert cache.get(card_key(post)) is None, 'Изменение группы должно менять версию карточек'
+
+        post.text = 'Исправленный текст'
+        post.save()
+        assert 'Исправленный текст' in client.get('/').content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_link_is_per_viewer(self, client, user_client, post, django_user_model):
+        assert 'Редактировать' in user_client.get('/').content.decode(), 'Автор должен видеть ссылку на редактирование'
+
+        other = django_user_model.objects.create_user(username='other', password='1234567')
+        client.force_login(other)
+        assert 'Редактировать' not in client.get('/').content.decode(), \
+            'Ссылка на редактирование не должна попадать в общий кэш карточки'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_author_save_without_name_change(self, user, post):
+        version = card_key(post)
+        user.set_password('new password 1234')
+        user.save()
+        user.last_login = None
+        user.save(update_fields=['last_login'])
+        assert card_key(post) == version, 'Сохранение автора без смены имени не должно менять версию карточек'
+
+        user.first_name = 'Имя'
+        user.save()
+        assert card_key(post) != version, 'Смена имени автора должна менять версию карточек'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_post_save_bumps_version(self, client, user, post):
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        Comment.objects.create(post=post, author=user, text='Комментарий 2')
+        client.get('/')
+        cached = card_key(post)
+        version = post.version
+
+        stale.text = 'Исправленный текст'
+        stale.save()
+        assert card_key(post) != cached and post.version == version + 1, \
+            'Правка устаревшей копии поста должна увеличивать версию, а не возвращать старую'
+        assert stale.version == post.version, 'Копия после сохранения знает версию из базы'
+        assert 'Исправленный текст' in client.get('/').content.decode()
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment
+
+
+def add_comments(post, author, count, start=0):
+    for i in range(start, start + count):
+        Comment.objects.create(post=post, author=author, text=f'Комментарий {i}')
+
+
+def shown(content):
+    return re.findall(r'Комментарий (\d+)', content)
+
+
+class TestCommentPages:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_page_shows_first_page(self, client, user, post, settings):
+        settings.COMMENTS_PAGE_SIZE = 5
+        url = f'/{user.username}/{post.pk}/'
+        add_comments(post, user, 2)
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        few = len(context)
+
+        add_comments(post, user, 20, start=2)
+        with CaptureQueriesContext(connection) as context:
+            content = client.get(url).content.decode()
+        assert len(context) == few, 'Число запросов на странице поста не должно зависеть от числа комментариев'
+        assert shown(content) == ['21', '20', '19', '18', '17'], 'Сначала показываются новые комментарии'
+        assert 'Показать еще' in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_load_more_fragment(self, client, user, post, settings):
+        settings.COMMENTS_PAGE_SIZE = 5
+        add_comments(post, user, 12)
+        content = client.get(f'/{user.username}/{post.pk}/').content.decode()
+
+        seen = shown(content)
+        while True:
+            fragment = re.search(r'data-fragment="([^"]+)"', content)
+            if fragment is None:
+                break
+            response = client.get(fragment.group(1).replace('&amp;', '&'))
+            assert response.status_code == 200
+            content = response.content.decode()
+            assert '<html' not in content, 'Следующая страница отдается фрагментом без обвязки страницы'
+            seen += shown(content)
+        assert seen == [str(i) for i in range(11, -1, -1)], 'Подгрузка должна пройти все комментарии без повторов'
+
+        assert client.get(f'/someone/{post.pk}/comments/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_page_paginated(self, user_client, user, post, settings):
+        settings.COMMENTS_PAGE_SIZE = 5
+        add_comments(post, user, 12)
+        content = user_client.get(f'/{user.username}/{post.pk}/comment/').content.decode()
+        assert shown(content) == ['11', '10', '9', '8', '7']
+        cursor = re.search(r'\?cursor=([\w-]+)"', content).group(1)
+        content = user_client.get(f'/{user.username}/{post.pk}/comment/?cursor={cursor}').content.decode()
+        assert shown(content) == ['6', '5', '4', '3', '2'], 'Без JavaScript "Показать еще" открывает следующую страницу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_valid_comment_skips_page(self, user_client, user, post):
+        add_comments(post, user, 3)
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(f'/{user.username}/{post.pk}/comment/', {'text': 'Новый'})
+        assert response.status_code == 302
+        pages = [query['sql'] for query in context if 'FROM "posts_comment"' in query['sql'] and 'LIMIT' in query['sql']]
+        assert pages == [], 'После сохранения комментария страница комментариев не читается'
@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Group, Post
+
+
+def assert_not_modified(client, url, response):
+    with CaptureQueriesContext(connection) as context:
+        repeated = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert repeated.status_code == 304, f'Неизменный `{url}` должен отдавать 304'
+    assert not any('posts_' in query['sql'] for query in context.captured_queries), \
+        'Ответ 304 не должен читать посты, комментарии и группы'
+
+
+class TestConditionalResponses:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_api(self, api_client, post, user):
+        url = '/api/v1/posts/'
+        response = api_client.get(url)
+        assert response.status_code == 200 and response.has_header('Last-Modified')
+        assert_not_modified(api_client, url, response)
+
+        detail = api_client.get(f'{url}{post.pk}/')
+        assert_not_modified(api_client, f'{url}{post.pk}/', detail)
+
+        Post.objects.create(text='Новый пост', author=user)
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200, \
+            'После нового поста ETag ленты должен смениться'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_and_groups_api(self, api_client, post, group, user):
+        url = f'/api/v1/posts/{post.pk}/comments/'
+        response = api_client.get(url)
+        assert_not_modified(api_client, url, response)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200
+
+        response = api_client.get('/api/v1/groups/')
+        assert_not_modified(api_client, '/api/v1/groups/', response)
+        Group.objects.create(title='Еще группа', slug='other', description='Описание')
+        assert api_client.get('/api/v1/groups/', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_html_feeds(self, user_client, post_with_group, user):
+        for url in ('/', f'/group/{post_with_group.group.slug}/', f'/{user.username}/', '/follow/'):
+            response = user_client.get(url)
+            assert response.status_code == 200
+            assert_not_modified(user_client, url, response)
+
+        response = user_client.get('/')
+        anonymous = Client().get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        assert anonymous.status_code == 200, 'ETag страницы зависит от пользователя'
+
+        modified_since = response['Last-Modified']
+        assert user_client.get('/', HTTP_IF_MODIFIED_SINCE=modified_since).status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_requires_login(self, user_client):
+        modified_since = user_client.get('/follow/')['Last-Modified']
+        for headers in ({'HTTP_IF_NONE_MATCH': '*'}, {'HTTP_IF_MODIFIED_SINCE': modified_since}):
+            response = Client().get('/follow/', **headers)
+            assert response.status_code == 302 and '/auth/login/' in response['Location'], \
+                'Анонимный условный запрос к ленте подписок должен вести на вход, а не получать 304'
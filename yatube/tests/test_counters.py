@@ -0,0 +1,81 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post, UserStats
+
+
+def stats(user):
+    return UserStats.objects.get(pk=user.pk)
+
+
+class TestCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_signals(self, user, author):
+        post = Post.objects.create(text='Пост', author=author)
+        Post.objects.create(text='Пост 2', author=author)
+        assert stats(author).posts_count == 2
+
+        comment = Comment.objects.create(post=post, author=user, text='Комментарий')
+        Comment.objects.create(post=post, author=user, text='Комментарий 2')
+        comment.delete()
+        post.refresh_from_db()
+        assert post.comment_count == 1
+
+        Follow.objects.create(user=user, author=author)
+        assert stats(author).followers_count == 1
+        assert stats(user).following_count == 1
+        Follow.objects.filter(user=user).delete()
+        assert stats(author).followers_count == 0
+        assert stats(user).following_count == 0
+
+        post.delete()
+        assert stats(author).posts_count == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_post_save_keeps_count(self, user, author):
+        post = Post.objects.create(text='Пост', author=author)
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        Comment.objects.create(post=post, author=user, text='Комментарий 2')
+
+        stale.text = 'Исправленный пост'
+        stale.save()
+        post.refresh_from_db()
+        assert post.text == 'Исправленный пост'
+        assert post.comment_count == 2, 'Правка поста, загруженного до комментариев, не должна сбрасывать счетчик'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_command(self, user, author):
+        post = Post.objects.create(text='Пост', author=author)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        Follow.objects.create(user=user, author=author)
+        call_command('rebuild_counters', '--check')
+
+        UserStats.objects.filter(pk=author.pk).update(posts_count=10, followers_count=0)
+        Post.objects.filter(pk=post.pk).update(comment_count=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_counters', '--check')
+
+        call_command('rebuild_counters')
+        call_command('rebuild_counters', '--check')
+        assert stats(author).posts_count == 1
+        assert stats(author).followers_count == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_does_not_count(self, client, user, author):
+        post = Post.objects.create(text='Пост', author=author)
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        Follow.objects.create(user=user, author=author)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/{author.username}/')
+        assert response.status_code == 200
+        assert not any('COUNT(' in query['sql'].upper() for query in context.captured_queries), \
+            'Страница профиля не должна считать COUNT(*) при каждом показе'
+        html = response.content.decode()
+        assert 'Подписчиков: 1' in html
+        assert 'Записей: 1' in html
+        assert '1 комментариев' in html
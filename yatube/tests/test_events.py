@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.test import Client
+
+from posts import events, sse
+from posts.models import Comment, Follow, Post
+
+
+class Connection:
+    """
+    Клиент ASGI: копит тело ответа потока событий
+    """
+
+    def __init__(self, path, headers=()):
+        self.scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': list(headers)}
+        self.incoming = asyncio.Queue()
+        self.messages = []
+        self.incoming.put_nowait({'type': 'http.request', 'body': b'', 'more_body': False})
+        self.task = asyncio.ensure_future(sse.application(self.scope, self.incoming.get, self.send))
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    @property
+    def status(self):
+        return self.messages[0]['status'] if self.messages else None
+
+    @property
+    def body(self):
+        return b''.join(message.get('body', b'') for message in self.messages[1:]).decode()
+
+    def events(self):
+        return [
+            json.loads(line[len('data: '):]) for line in self.body.splitlines() if line.startswith('data: ')
+        ]
+
+    async def wait(self, condition, timeout=2):
+        for _ in range(int(timeout / 0.01)):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError(f'Не дождались события, получено: {self.body!r}')
+
+    async def close(self):
+        await self.incoming.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, 2)
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return (b'cookie', f'sessionid={client.cookies["sessionid"].value}'.encode())
+
+
+@pytest.fixture
+def stranger(django_user_model):
+    return django_user_model.objects.create_user(username='stranger', password='1234567')
+
+
+create_post = sync_to_async(Post.objects.create)
+
+
+class TestEvents:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_stream(self, user, author, stranger):
+        Follow.objects.create(user=user, author=author)
+        cookie = session_cookie(user)
+
+        async def scenario():
+            connection = Connection('/events/follow/', [cookie])
+            await connection.wait(lambda: connection.status == 200)
+            await create_post(text='Пост автора', author=author)
+            await create_post(text='Пост незнакомца', author=stranger)
+            await connection.wait(lambda: len(connection.events()) == 1)
+
+            follow = await sync_to_async(Follow.objects.create)(user=user, author=stranger)
+            await create_post(text='Второй пост незнакомца', author=stranger)
+            await connection.wait(lambda: len(connection.events()) == 2)
+            await sync_to_async(follow.delete)()
+            await create_post(text='Третий пост незнакомца', author=stranger)
+            await create_post(text='Второй пост автора', author=author)
+            await connection.wait(lambda: len(connection.events()) == 3)
+            await connection.close()
+            return connection
+
+        connection = asyncio.run(scenario())
+        assert [event['text'] for event in connection.events()] == [
+            'Пост автора', 'Второй пост незнакомца', 'Второй пост автора',
+        ], 'Поток должен содержать только посты авторов, на которых пользователь подписан сейчас'
+        assert connection.messages[0]['headers'][0] == (b'content-type', b'text/event-stream; charset=utf-8')
+        assert events.get_broker().subscribers == {}, 'После отключения подписки должны сниматься'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments_stream_and_replay(self, user, post):
+        first = Comment.objects.create(post=post, author=user, text='Первый')
+        Comment.objects.create(post=post, author=user, text='Пропущенный')
+        add_comment = sync_to_async(Comment.objects.create)
+
+        async def scenario():
+            connection = Connection(f'/events/posts/{post.pk}/comments/', [(b'last-event-id', str(first.pk).encode())])
+            await connection.wait(lambda: len(connection.events()) == 1)
+            await add_comment(post=post, author=user, text='Новый')
+            await connection.wait(lambda: len(connection.events()) == 2)
+            await connection.close()
+            return connection
+
+        connection = asyncio.run(scenario())
+        assert [event['text'] for event in connection.events()] == ['Пропущенный', 'Новый'], \
+            'При переподключении пропущенные комментарии должны отдаваться из базы'
+        assert 'event: comment' in connection.body
+
+    @pytest.mark.django_db(transaction=True)
+    def test_errors_and_keepalive(self, settings, post):
+        settings.EVENTS_KEEPALIVE = 0.05
+
+        async def scenario():
+            anonymous = Connection('/events/follow/')
+            missing = Connection('/events/posts/0/comments/')
+            connection = Connection(f'/events/posts/{post.pk}/comments/')
+            await connection.wait(lambda: ': keepalive' in connection.body)
+            await connection.close()
+            await asyncio.gather(anonymous.task, missing.task)
+            return anonymous.status, missing.status
+
+        assert asyncio.run(scenario()) == (403, 404)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_old_connections_closed(self, post, monkeypatch):
+        calls = []
+        monkeypatch.setattr(sse, 'close_old_connections', lambda: calls.append(True))
+
+        async def scenario():
+            connection = Connection(f'/events/posts/{post.pk}/comments/')
+            await connection.wait(lambda: connection.status == 200)
+            await connection.close()
+
+        asyncio.run(scenario())
+        assert len(calls) == 2, 'Соединения с базой проверяются до и после запросов потока, как у запросов Django'
+
+    def test_asgi_routing(self):
+        from yatube import asgi
+
+        async def scenario():
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            scope = {'type': 'http', 'method': 'POST', 'path': '/events/follow/', 'headers': []}
+            await asgi.application(scope, receive, send)
+            return messages[0]['status']
+
+        assert asyncio.run(scenario()) == 405, '/events/ должен обслуживаться потоками событий, а не Django'
@@ -0,0 +1,111 @@
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+from datetime import timedelta
+
+import pytest
+from asgiref.testing import ApplicationCommunicator
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from posts import export
+from posts.models import Comment, Post
+
+
+def create_posts(user, count):
+    Post.objects.bulk_create(Post(text=f'Пост {i}, "с кавычками"', author=user) for i in range(count))
+
+
+def streamed(response):
+    assert response.streaming, 'Выгрузка должна отдаваться потоком'
+    return b''.join(response.streaming_content).decode()
+
+
+class TestExport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ndjson_and_csv(self, api_client, user, post):
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        create_posts(user, 4)
+        response = api_client.get('/api/v1/export/posts.ndjson')
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        lines = [json.loads(line) for line in streamed(response).splitlines()]
+        assert len(lines) == 5
+        assert lines[0] == api_client.get(f'/api/v1/posts/{lines[0]["id"]}/').json(), \
+            'Строки выгрузки совпадают с объектами API'
+
+        rows = list(csv.reader(io.StringIO(streamed(api_client.get('/api/v1/export/comments.csv')))))
+        assert rows[0] == ['id', 'author', 'post', 'text', 'created']
+        assert rows[1][3] == 'Комментарий'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_date_range(self, api_client, user, post):
+        Post.objects.filter(pk=post.pk).update(pub_date=timezone.now() - timedelta(days=10))
+        create_posts(user, 2)
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        content = streamed(api_client.get('/api/v1/export/posts.ndjson', {'date_from': since}))
+        assert len(content.splitlines()) == 2
+        assert api_client.get('/api/v1/export/posts.csv', {'date_from': 'вчера'}).status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_command(self, user, tmp_path):
+        create_posts(user, 3)
+        out = io.StringIO()
+        call_command('export_data', 'posts', '--format', 'csv', stdout=out)
+        assert len(list(csv.reader(io.StringIO(out.getvalue())))) == 4
+
+        path = tmp_path / 'posts.ndjson'
+        call_command('export_data', 'posts', '--output', str(path), '--chunk-size', '2')
+        assert len(path.read_text(encoding='utf-8').splitlines()) == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_flat_memory(self, user):
+        def peak(count):
+            Post.objects.all().delete()
+            create_posts(user, count)
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as context:
+                for _ in export.stream(export.EXPORTS['posts'], Post.objects.all(), 'ndjson', chunk_size=100):
+                    pass
+            _, peak_size = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            assert len(context) == 1, 'Выгрузка - один запрос без OFFSET'
+            assert 'OFFSET' not in context.captured_queries[0]['sql']
+            return peak_size
+
+        small, large = peak(500), peak(5000)
+        assert large < small * 2, 'Память выгрузки не должна расти с числом строк'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_asgi(self, user, settings):
+        from yatube import asgi
+
+        create_posts(user, 5)
+        token = Token.objects.create(user=user).key
+
+        async def scenario():
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': '/api/v1/export/posts.ndjson', 'query_string': b'',
+                'headers': [(b'authorization', f'Token {token}'.encode()), (b'host', b'localhost')],
+            }
+            communicator = ApplicationCommunicator(asgi.application, scope)
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output(5)
+            body = b''
+            while True:
+                message = await communicator.receive_output(5)
+                body += message.get('body', b'')
+                if not message.get('more_body'):
+                    break
+            await communicator.wait()
+            return start['status'], body
+
+        settings.EXPORT_CHUNK_SIZE = 2
+        status, body = asyncio.run(scenario())
+        assert status == 200
+        assert len(body.decode().splitlines()) == 5, 'Под ASGI выгрузка должна читать базу вне цикла событий'
@@ -0,0 +1,84 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import follows
+from posts.models import Follow, UserStats
+
+
+@pytest.fixture
+def authors(django_user_model):
+    return [django_user_model.objects.create_user(username=f'author{i}', password='1234567') for i in range(4)]
+
+
+def followed(user):
+    return sorted(Follow.objects.filter(user=user).values_list('author__username', flat=True))
+
+
+class TestFollows:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_race(self, user, authors):
+        author = authors[0]
+        assert follows.follow(user, author.pk) is True
+        # вторая подписка - как проигравший гонку запрос: строка уже вставлена
+        with CaptureQueriesContext(connection) as context:
+            assert follows.follow(user, author.pk) is False
+        sql = [query['sql'] for query in context if 'posts_follow' in query['sql']]
+        assert len(sql) == 1 and sql[0].startswith('INSERT'), 'Подписка должна быть одним INSERT без проверки SELECT'
+        assert Follow.objects.filter(user=user, author=author).count() == 1
+        assert UserStats.objects.get(pk=author.pk).followers_count == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_idempotent(self, user_client, user, authors):
+        url = f'/{authors[0].username}/follow/'
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            user_client.get(url)
+        assert not any('SELECT' in query['sql'] and 'posts_follow' in query['sql'] for query in context), \
+            'Повторная подписка не должна проверяться отдельным SELECT'
+        assert followed(user) == ['author0']
+
+        user_client.get(f'/{user.username}/follow/')
+        assert followed(user) == ['author0'], 'Подписка на себя невозможна'
+
+        for _ in range(2):
+            assert user_client.get(f'/{authors[0].username}/unfollow/').status_code == 302
+        assert followed(user) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_self_follow_constraint(self, user):
+        with pytest.raises(IntegrityError):
+            Follow.objects.create(user=user, author=user)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk(self, api_client, user, authors):
+        Follow.objects.create(user=user, author=authors[3])
+        response = api_client.post('/api/v1/follow/bulk/', {
+            'follow': ['author0', 'author1', 'author1', 'nobody', user.username],
+            'unfollow': ['author3', 'author2'],
+        }, format='json')
+        assert response.status_code == 200, response.content
+        assert response.json() == {'followed': ['author0', 'author1'], 'unfollowed': ['author3'], 'not_found': ['nobody']}
+        assert followed(user) == ['author0', 'author1']
+        assert UserStats.objects.get(pk=user.pk).following_count == 2, 'Счетчики должны обновляться и при массовых операциях'
+
+        response = api_client.post('/api/v1/follow/bulk/', {'follow': ['author0'], 'unfollow': ['author0']}, format='json')
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import(self, api_client, user, authors):
+        Follow.objects.create(user=user, author=authors[0])
+        response = api_client.post('/api/v1/follow/import/', {'authors': ['author1', 'nobody']}, format='json')
+        assert response.status_code == 400 and response.json() == {'not_found': ['nobody']}
+        assert followed(user) == ['author0'], 'Импорт с неизвестным автором ничего не должен менять'
+
+        response = api_client.post('/api/v1/follow/import/', {'authors': ['author1', 'author2']}, format='json')
+        assert response.json() == {'followed': ['author1', 'author2'], 'unfollowed': []}
+        assert followed(user) == ['author0', 'author1', 'author2']
+
+        response = api_client.post(
+            '/api/v1/follow/import/', {'authors': ['author2', 'author3'], 'replace': True}, format='json',
+        )
+        assert response.json() == {'followed': ['author3'], 'unfollowed': ['author0', 'author1']}
+        assert followed(user) == ['author2', 'author3'], 'С replace подписки становятся ровно списком импорта'
@@ -0,0 +1,135 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from jobs import queue
+from jobs.mail import deserialize, serialize
+from jobs.models import Job
+from posts.models import Follow
+
+calls = []
+
+
+def record(name):
+    calls.append(name)
+
+
+def broken(name):
+    raise ValueError(f'Ошибка в задаче {name}')
+
+
+@pytest.fixture(autouse=True)
+def jobs(settings):
+    settings.JOBS_EAGER = False
+    settings.JOBS_RETRY_DELAY = 10
+    settings.JOBS_RETRY_MAX_DELAY = 15
+    settings.JOBS_QUEUE_CONCURRENCY = {}
+    calls.clear()
+
+
+class TestJobs:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_priority_and_cleanup(self):
+        queue.enqueue(record, 'low')
+        queue.enqueue(record, 'high', priority=5)
+        queue.enqueue(record, 'later', delay=60)
+        assert queue.work(burst=True) == 2
+        assert calls == ['high', 'low'], 'Сначала выполняются задачи с большим приоритетом'
+        assert list(Job.objects.values_list('args', flat=True)) == [['later']], \
+            'Выполненные задачи удаляются, отложенные ждут своего времени'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_enqueued_with_transaction(self):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                queue.enqueue(record, 'rolled back')
+                raise RuntimeError
+        assert not Job.objects.exists(), 'Задача откатывается вместе с транзакцией'
+
+        queue.enqueue(record, 'once', unique_key='once')
+        queue.enqueue(record, 'once', unique_key='once')
+        assert Job.objects.count() == 1, 'Задача с тем же unique_key не добавляется, пока ждет в очереди'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_retry_backoff(self):
+        queue.enqueue(broken, 'x', max_attempts=3)
+        delays = []
+        for attempt in range(3):
+            Job.objects.update(run_at=timezone.now())
+            started = timezone.now()
+            job = queue.claim('worker')
+            assert job.attempts == attempt + 1
+            assert queue.run(job) is False
+            job.refresh_from_db()
+            delays.append(round((job.run_at - started).total_seconds()))
+
+        assert delays[:2] == [10, 15], 'Повтор через JOBS_RETRY_DELAY с удвоением, но не дольше предела'
+        assert job.status == Job.FAILED, 'После max_attempts попыток задача не повторяется'
+        assert 'Ошибка в задаче x' in job.last_error
+        assert queue.claim('worker') is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_queue_concurrency(self, settings):
+        settings.JOBS_QUEUE_CONCURRENCY = {'thumbnails': 1}
+        first = queue.enqueue(record, 'a', queue='thumbnails', priority=1)
+        queue.enqueue(record, 'b', queue='thumbnails', priority=1)
+        other = queue.enqueue(record, 'c')
+
+        assert queue.claim('w1').pk == first.pk
+        assert queue.claim('w2').pk == other.pk, 'Очередь на пределе пропускается'
+        assert queue.claim('w3') is None
+        assert queue.run(Job.objects.get(pk=first.pk))
+        assert queue.claim('w3').args == ['b'], 'После завершения задачи очередь снова доступна'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_expired_lease(self):
+        queue.enqueue(record, 'a')
+        job = queue.claim('lost worker')
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        assert queue.requeue_expired() == 1, 'Задача пропавшего обработчика возвращается в очередь'
+        job = queue.claim('worker')
+        assert job.attempts == 2 and job.locked_by == 'worker'
+
+        call_command('runworker', '--burst', stdout=io.StringIO())
+        assert Job.objects.filter(pk=job.pk).exists(), 'Чужую задачу обработчик не выполняет'
+        assert queue.run(job) and calls == ['a']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_schedules_recommendations(self, user, django_user_model):
+        for name in ('a1', 'a2'):
+            Follow.objects.create(user=user, author=django_user_model.objects.create_user(username=name))
+        job = Job.objects.get()
+        assert job.func == 'posts.recommendations.refresh', 'Подписки ставят один пересчет рекомендаций'
+        assert job.run_at > timezone.now()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_email_queued(self, settings):
+        settings.EMAIL_BACKEND = 'jobs.mail.QueuedEmailBackend'
+        settings.JOBS_EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        mail.outbox = []
+        assert mail.send_mail('Тема', 'Текст', 'from@example.com', ['to@example.com']) == 1
+        assert mail.outbox == [], 'Письмо отправляется обработчиком, а не в запросе'
+        assert Job.objects.get().queue == 'mail'
+
+        call_command('runworker', '--burst', '--queues', 'mail', stdout=io.StringIO())
+        assert [message.subject for message in mail.outbox] == ['Тема']
+        assert not Job.objects.exists()
+
+    def test_email_serialization(self):
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            bcc=['bcc@example.com'], headers={'X-Tag': 'test'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        restored = deserialize(serialize(message))
+        assert restored.message().as_bytes() and restored.bcc == ['bcc@example.com']
+        assert restored.alternatives == [('<p>Текст</p>', 'text/html')]
+        assert restored.attachments == [('data.bin', b'\x00\xff', 'application/octet-stream')]
+        assert restored.extra_headers == {'X-Tag': 'test'}
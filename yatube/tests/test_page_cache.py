@@ -0,0 +1,97 @@
+import pytest
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post
+
+
+def get_without_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(context) == 0, f'Повторный анонимный запрос `{url}` должен обслуживаться из кэша'
+    return response.content.decode()
+
+
+class TestAnonymousPageCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index(self, client, user, post):
+        client.get('/')
+        get_without_queries(client, '/')
+
+        Post.objects.create(text='Совсем новый пост', author=user)
+        assert 'Совсем новый пост' in client.get('/').content.decode(), \
+            'Новый пост должен сразу появиться на закэшированной главной'
+
+        get_without_queries(client, '/')
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        assert '1 комментариев' in client.get('/').content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_and_profile(self, client, user, post_with_group, django_user_model):
+        group_url = f'/group/{post_with_group.group.slug}/'
+        profile_url = f'/{user.username}/'
+        for url in (group_url, profile_url):
+            client.get(url)
+            get_without_queries(client, url)
+
+        group = post_with_group.group
+        group.title = 'Новое название группы'
+        group.save()
+        assert 'Новое название группы' in client.get(profile_url).content.decode()
+
+        follower = django_user_model.objects.create_user(username='follower', password='1234567')
+        Follow.objects.create(user=follower, author=user)
+        assert 'Подписчиков: 1' in client.get(profile_url).content.decode()
+
+        post_with_group.group = None
+        post_with_group.save()
+        assert post_with_group.text not in client.get(group_url).content.decode(), \
+            'Пост, убранный из группы, должен пропасть со страницы группы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_flatpage(self, client):
+        page = FlatPage.objects.create(url='/terms/', title='Условия', content='Старые условия')
+        page.sites.add(Site.objects.get_current())
+        client.get('/about/terms/')
+        get_without_queries(client, '/about/terms/')
+
+        page.content = 'Новые условия'
+        page.save()
+        assert 'Новые условия' in client.get('/about/terms/').content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authenticated_not_cached(self, user_client, post):
+        user_client.get('/')
+        with CaptureQueriesContext(connection) as context:
+            user_client.get('/')
+        assert len(context) > 0, 'Страницы авторизованных пользователей не должны браться из общего кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_save_keeps_pages(self, client, user, post):
+        client.get('/')
+        user.set_password('new password 1234')
+        user.is_staff = True
+        user.save()
+        get_without_queries(client, '/')
+
+        user.username = 'renamed'
+        user.save()
+        assert 'renamed' in client.get('/').content.decode(), 'Переименование автора должно обновлять страницы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_delete_reads_names_once(self, client, post_with_group):
+        profile_url = f'/{post_with_group.author.username}/'
+        group_url = f'/group/{post_with_group.group.slug}/'
+        for url in (profile_url, group_url):
+            client.get(url)
+        post = Post.objects.get(pk=post_with_group.pk)
+        with CaptureQueriesContext(connection) as context:
+            post.delete()
+        lookups = [query['sql'] for query in context if 'auth_user' in query['sql'] or 'posts_group' in query['sql']]
+        assert len(lookups) == 1, 'Имя автора и адрес группы удаляемого поста читаются одним запросом'
+        for url in (profile_url, group_url):
+            assert post.text not in client.get(url).content.decode()
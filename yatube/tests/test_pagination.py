@@ -0,0 +1,75 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from posts.api.pagination import PostCursorPagination
+from posts.models import Post
+from posts.pagination import KeysetPaginator
+
+
+@pytest.fixture
+def posts(user):
+    created = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(25)]
+    # часть постов с одинаковой датой - порядок должен держаться на id
+    Post.objects.filter(pk__in=[post.pk for post in created[5:15]]).update(pub_date=timezone.now())
+    return Post.objects.feed()
+
+
+class TestKeysetPaginator:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_walk_forward_and_back(self, posts):
+        expected = [post.pk for post in posts]
+        paginator = KeysetPaginator(Post.objects.feed(), 10)
+
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        walked = [post.pk for page in pages for post in page]
+        assert walked == expected, 'Листание вперед должно пройти все посты по порядку без повторов'
+        assert not pages[0].has_previous()
+
+        back = paginator.page(pages[-1].previous_cursor)
+        assert [post.pk for post in back] == [post.pk for post in pages[-2]], \
+            'Курсор previous должен вести на предыдущую страницу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_count_or_offset(self, posts):
+        paginator = KeysetPaginator(Post.objects.feed(), 10)
+        cursor = paginator.page().next_cursor
+        with CaptureQueriesContext(connection) as context:
+            list(paginator.page(cursor))
+        sql = ' '.join(query['sql'] for query in context.captured_queries).upper()
+        assert 'OFFSET' not in sql and 'COUNT(*)' not in sql
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_cursor(self, posts, user_client):
+        response = user_client.get('/?cursor=broken')
+        assert response.status_code == 200, 'Битый курсор на сайте должен открывать первую страницу'
+
+        client = APIClient()
+        client.force_authenticate(posts.first().author)
+        response = client.get('/api/v1/posts/?cursor=broken')
+        assert response.status_code == 404
+
+
+class TestApiCursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_pages(self, posts, user, monkeypatch):
+        client = APIClient()
+        client.force_authenticate(user)
+        data = client.get('/api/v1/posts/').json()
+        assert set(data) == {'next', 'previous', 'results'}
+        assert data['previous'] is None
+
+        monkeypatch.setattr(PostCursorPagination, 'page_size', 10)
+        seen = []
+        url = '/api/v1/posts/'
+        while url:
+            data = client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        assert seen == [post.pk for post in posts], 'Листание API по next должно пройти все посты'
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from posts.models import Post, Comment, Follow
+
+
+def create_posts(author, group, count):
+    for i in range(count):
+        post = Post.objects.create(text=f'Пост {i}', author=author, group=group)
+        Comment.objects.create(post=post, author=author, text='Комментарий')
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` вернула код {response.status_code}'
+    return len(context)
+
+
+class TestFeedQueryBudget:
+    """Число запросов на страницу ленты не зависит от количества постов на ней"""
+
+    def assert_constant(self, client, url, author, group):
+        # первый запрос кладет пользователя и сессию в кэш аутентификации
+        client.get(url)
+        create_posts(author, group, 2)
+        small_page = count_queries(client, url)
+        create_posts(author, group, 8)
+        full_page = count_queries(client, url)
+        assert small_page == full_page, \
+            f'Страница `{url}`: {small_page} запросов для 2 постов и {full_page} для 10 - проверьте N+1'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index(self, user_client, user, group):
+        self.assert_constant(user_client, '/', user, group)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group(self, user_client, user, group):
+        self.assert_constant(user_client, f'/group/{group.slug}/', user, group)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile(self, user_client, user, group):
+        self.assert_constant(user_client, f'/{user.username}/', user, group)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow(self, user_client, user, group, django_user_model):
+        author = django_user_model.objects.create_user(username='author', password='1234567')
+        Follow.objects.create(user=user, author=author)
+        self.assert_constant(user_client, '/follow/', author, group)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_posts(self, user, group):
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assert_constant(client, '/api/v1/posts/', user, group)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_comments(self, user, post):
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/v1/posts/{post.id}/comments/'
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        small_page = count_queries(client, url)
+        for _ in range(9):
+            Comment.objects.create(post=post, author=user, text='Комментарий')
+        assert count_queries(client, url) == small_page, \
+            f'Страница `{url}`: число запросов растет вместе с числом комментариев'
@@ -0,0 +1,63 @@
+import pytest
+from django.db import IntegrityError, connection, transaction
+
+from posts.models import Comment, Follow, Post, TimelineEntry
+from posts.pagination import keyset_filter
+
+
+def assert_indexed(queryset, table):
+    """
+    План запроса не должен перебирать таблицу целиком и сортировать во временном B-дереве
+    """
+    plan = queryset.explain()
+    for line in plan.splitlines():
+        assert not (f'SCAN {table}' in line and 'INDEX' not in line), \
+            f'Запрос перебирает {table} целиком:\n{queryset.query}\n{plan}'
+    assert 'TEMP B-TREE' not in plan, f'Запрос сортирует без индекса:\n{queryset.query}\n{plan}'
+
+
+def next_page(queryset, keys, position):
+    return keyset_filter(queryset, keys, position).order_by(*[f'-{key}' for key in keys])[:11]
+
+
+@pytest.fixture(autouse=True)
+def sqlite_only():
+    if connection.vendor != 'sqlite':
+        pytest.skip('Планы запросов проверяются для SQLite')
+
+
+class TestQueryPlans:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_feeds(self, post_with_group, user):
+        position = (post_with_group.pub_date, post_with_group.pk)
+        feeds = (
+            Post.objects.feed(),
+            post_with_group.group.posts.feed(),
+            user.posts.feed(),
+        )
+        for feed in feeds:
+            assert_indexed(feed[:11], 'posts_post')
+            assert_indexed(next_page(feed, ('pub_date', 'id'), position), 'posts_post')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comments(self, post, user):
+        comment = Comment.objects.create(post=post, author=user, text='Комментарий')
+        comments = post.comments.select_related('author')
+        assert_indexed(comments.order_by('-created', '-id')[:11], 'posts_comment')
+        assert_indexed(next_page(comments, ('created', 'id'), (comment.created, comment.pk)), 'posts_comment')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_and_timeline(self, user, django_user_model):
+        author = django_user_model.objects.create_user(username='author', password='1234567')
+        Follow.objects.create(user=user, author=author)
+        assert_indexed(Follow.objects.filter(user=user, author=author), 'posts_follow')
+        assert_indexed(Follow.objects.filter(author=author), 'posts_follow')
+        assert_indexed(TimelineEntry.objects.filter(user=user).order_by('-pub_date', '-post_id')[:11], 'posts_timelineentry')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unique_follow(self, user, django_user_model):
+        author = django_user_model.objects.create_user(username='author', password='1234567')
+        Follow.objects.create(user=user, author=author)
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=user, author=author)
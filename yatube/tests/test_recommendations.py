@@ -0,0 +1,87 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from posts import recommendations
+from posts.models import Follow, Post, Recommendation
+
+
+@pytest.fixture(autouse=True)
+def commit_lag(settings):
+    settings.SYNC_COMMIT_LAG = 0
+
+
+@pytest.fixture
+def graph(user, django_user_model):
+    """
+    user -> a1, a2; a1 -> c1, c2, c3, a2, user; a2 -> c1, c2; c2 пишет чаще c1
+    """
+    users = {name: django_user_model.objects.create_user(username=name, password='1234567')
+             for name in ('a1', 'a2', 'c1', 'c2', 'c3', 'c4')}
+    users['user'] = user
+    for follower, authors in {'user': ('a1', 'a2'), 'a1': ('c1', 'c2', 'c3', 'a2', 'user'), 'a2': ('c1', 'c2')}.items():
+        for author in authors:
+            Follow.objects.create(user=users[follower], author=users[author])
+    for i in range(3):
+        Post.objects.create(text=f'Пост {i}', author=users['c2'])
+    return users
+
+
+def recommended(user):
+    return list(Recommendation.objects.filter(user=user).order_by('-score').values_list('author__username', flat=True))
+
+
+class TestRecommendations:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_build(self, graph, user):
+        call_command('build_recommendations', '--full')
+        assert recommended(user) == ['c2', 'c1', 'c3'], \
+            'Кандидаты упорядочены по общим подпискам, при равенстве - по активности автора'
+        assert Recommendation.objects.get(user=user, author=graph['c1']).shared_follows == 2
+        assert recommended(graph['a1']) == [], 'Уже прочитанные авторы и сам пользователь не рекомендуются'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_incremental_refresh(self, graph, user):
+        recommendations.build()
+        Follow.objects.create(user=graph['a2'], author=graph['c4'])
+        Follow.objects.create(user=user, author=graph['c1'])
+        assert 'c1' not in recommended(user), 'Автор должен пропасть из рекомендаций сразу после подписки'
+
+        assert recommendations.refresh() == 3, 'Пересчитываются только подписчики и те, кто подписан на них'
+        assert recommended(user)[0] == 'c2' and set(recommended(user)) == {'c2', 'c3', 'c4'}
+        assert recommended(graph['a1']) == ['c4']
+        assert recommendations.refresh() == 0, 'Без новых изменений пересчитывать нечего'
+
+        Recommendation.objects.all().delete()
+        cache.clear()
+        assert recommendations.refresh() is None, 'Без курсора рекомендации строятся заново'
+        assert recommended(graph['a1']) == ['c4']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_and_pages(self, graph, user, user_client):
+        recommendations.build()
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/v1/recommendations/')
+        assert response.status_code == 200
+        assert [item['author'] for item in response.json()] == ['c2', 'c1', 'c3']
+        assert set(response.json()[0]) == {'author', 'score', 'shared_follows'}
+
+        for url in (f'/{user.username}/', '/follow/'):
+            content = user_client.get(url).content.decode()
+            assert 'Кого читать' in content and '@c2' in content, f'Рекомендации должны показываться на `{url}`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_not_modified_until_rebuild(self, graph, user, user_client):
+        urls = (f'/{user.username}/', f'/{graph["a1"].username}/', '/follow/')
+        etags = {url: user_client.get(url)['ETag'] for url in urls}
+        for url in urls:
+            assert user_client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code == 304
+
+        recommendations.build()
+        for url in urls:
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == 200, f'После пересчета рекомендаций `{url}` не должна отдавать 304'
+            assert '@c2' in response.content.decode(), f'На `{url}` должны быть новые рекомендации'
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from posts.models import Post
+from posts.search import search_posts
+
+
+@pytest.fixture
+def posts(user, group):
+    return [
+        Post.objects.create(text='Рецепт борща со сметаной', author=user),
+        Post.objects.create(text='Борщ, борщ и еще раз борщ', author=user),
+        Post.objects.create(text='Про котиков', author=user, group=group),
+    ]
+
+
+def found(query):
+    return list(search_posts(Post.objects.feed(), query))
+
+
+class TestSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_in_sync(self, posts, group):
+        assert set(found('борщ')) == {posts[0], posts[1]}
+        assert found('борщ')[0] == posts[1], 'Более релевантный пост должен идти первым'
+        assert found('котик') == [posts[2]], 'Слово запроса должно искаться как префикс'
+        assert found('Тестовая группа') == [posts[2]], 'Поиск должен учитывать название группы'
+
+        posts[0].text = 'Рецепт щей'
+        posts[0].save()
+        assert found('борщ') == [posts[1]], 'Изменение текста должно попадать в индекс'
+
+        group.title = 'Кошки'
+        group.save()
+        assert found('кошки') == [posts[2]], 'Переименование группы должно попадать в индекс'
+
+        posts[1].delete()
+        assert found('борщ') == []
+        assert found('"); DROP TABLE posts_post; --') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_uses_fts_index(self, posts):
+        if connection.vendor != 'sqlite':
+            pytest.skip('План запроса проверяется для SQLite')
+        plan = search_posts(Post.objects.all(), 'борщ').explain()
+        assert 'VIRTUAL TABLE INDEX' in plan and 'SCAN posts_post ' not in f'{plan} ', \
+            'Поиск должен идти по индексу FTS5, а не перебором таблицы постов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_web_and_api(self, posts, user, client):
+        response = client.get('/search/', {'q': 'борщ'})
+        assert response.status_code == 200
+        assert list(response.context['page_obj']) == [posts[1], posts[0]]
+
+        api = APIClient()
+        api.force_authenticate(user)
+        data = api.get('/api/v1/posts/', {'q': 'борщ'}).json()
+        assert data['count'] == 2, 'Результаты поиска в API листаются по страницам'
+        assert [item['id'] for item in data['results']] == [posts[1].pk, posts[0].pk]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_admin(self, posts, admin_client):
+        # более релевантный пост - старше, чтобы порядок по дате отличался
+        Post.objects.filter(pk=posts[1].pk).update(pub_date=posts[0].pub_date - timedelta(days=1))
+        response = admin_client.get('/admin/posts/post/', {'q': 'борщ'})
+        assert response.status_code == 200
+        assert list(response.context['cl'].result_list) == [posts[1], posts[0]], \
+            'Админка показывает результаты поиска в порядке ранжирования'
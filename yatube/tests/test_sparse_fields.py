@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Post
+
+
+@pytest.fixture
+def posts(user):
+    posts = [Post.objects.create(text=f'Пост {i}', author=user) for i in range(5)]
+    for post in posts:
+        for i in range(4):
+            Comment.objects.create(post=post, author=user, text=f'Комментарий {i} к посту {post.pk}')
+    return posts
+
+
+def both_paths(client, url, settings):
+    fast = client.get(url)
+    settings.API_VALUES_LISTS = False
+    regular = client.get(url)
+    settings.API_VALUES_LISTS = True
+    assert fast.status_code == regular.status_code
+    assert fast.content == regular.content, f'Оба пути сериализации должны совпадать для {url}'
+    return fast
+
+
+class TestSparseFields:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fields(self, api_client, posts, settings):
+        data = both_paths(api_client, '/api/v1/posts/?fields=text,id', settings).json()
+        assert list(data['results'][0]) == ['id', 'text']
+
+        with CaptureQueriesContext(connection) as context:
+            api_client.get('/api/v1/posts/?fields=id')
+        sql = context.captured_queries[-1]['sql']
+        assert '"text"' not in sql and '"image"' not in sql, 'Невыбранные колонки не должны читаться'
+
+        detail = api_client.get(f'/api/v1/posts/{posts[0].pk}/?fields=author').json()
+        assert detail == {'author': posts[0].author.username}
+
+        assert api_client.get('/api/v1/posts/?fields=password').status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_embedded_comments(self, api_client, posts, settings):
+        data = both_paths(api_client, '/api/v1/posts/?embed=comments:2', settings).json()
+        for item in data['results']:
+            assert [comment['text'] for comment in item['comments']] == [
+                f'Комментарий 3 к посту {item["id"]}', f'Комментарий 2 к посту {item["id"]}',
+            ], 'Встраиваются последние N комментариев поста'
+
+        both_paths(api_client, f'/api/v1/posts/{posts[0].pk}/?embed=comments&fields=id', settings)
+        assert api_client.get('/api/v1/posts/?embed=comments:1000').status_code == 400
+        assert api_client.get('/api/v1/posts/?embed=author').status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bounded_queries(self, api_client, posts, user, settings):
+        for regular in (False, True):
+            settings.API_VALUES_LISTS = not regular
+            with CaptureQueriesContext(connection) as context:
+                api_client.get('/api/v1/posts/?embed=comments:3')
+            count = len(context)
+            for i in range(10):
+                post = Post.objects.create(text=f'Еще пост {i}', author=user)
+                Comment.objects.create(post=post, author=user, text='Комментарий')
+            with CaptureQueriesContext(connection) as context:
+                api_client.get('/api/v1/posts/?embed=comments:3')
+            assert len(context) == count <= 2, 'Лента с комментариями - постоянное число запросов'
@@ -0,0 +1,74 @@
+import gzip
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from yatube.staticfiles import accepted_encodings
+
+
+@pytest.fixture
+def static_root(settings, tmp_path):
+    settings.STATIC_ROOT = str(tmp_path)
+    call_command('collectstatic', '--noinput', stdout=io.StringIO())
+    return tmp_path
+
+
+def manifest(root):
+    return json.loads((root / 'staticfiles.json').read_text())['paths']
+
+
+class TestStatic:
+
+    def test_collected_assets(self, static_root):
+        paths = manifest(static_root)
+        assert 'bootstrap/dist/css/bootstrap.min.css' in paths
+        assert not [name for name in paths if name.startswith(('jquery/src/', 'bootstrap/scss/'))], \
+            'Исходники библиотек не собираются'
+        assert not [name for name in paths if name.endswith(('.map', '.scss')) or name == 'jquery/dist/jquery.js'], \
+            'Карты кода и неминифицированные сборки не собираются'
+
+        hashed = paths['bootstrap/dist/css/bootstrap.min.css']
+        assert hashed != 'bootstrap/dist/css/bootstrap.min.css', 'В имени файла должен быть хэш содержимого'
+        original = (static_root / hashed).read_bytes()
+        assert gzip.decompress((static_root / f'{hashed}.gz').read_bytes()) == original, \
+            'Рядом с файлом должен лежать gzip-вариант'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_use_hashed_names(self, static_root, client):
+        hashed = manifest(static_root)['bootstrap/dist/css/bootstrap.min.css']
+        assert f'/static_files/{hashed}' in client.get('/').content.decode()
+
+    def test_serving(self, static_root, client):
+        hashed = manifest(static_root)['jquery/dist/jquery.min.js']
+        url = f'/static_files/{hashed}'
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'gzip', 'Клиенту, принимающему gzip, отдается сжатый вариант'
+        assert response['Content-Type'].startswith(('application/javascript', 'text/javascript'))
+        assert 'immutable' in response['Cache-Control'], 'Файлы с хэшем кэшируются бессрочно'
+        assert response['Vary'] == 'Accept-Encoding'
+        body = b''.join(response.streaming_content)
+        assert gzip.decompress(body) == (static_root / hashed).read_bytes()
+
+        plain = client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        assert not plain.has_header('Content-Encoding')
+        assert b''.join(plain.streaming_content) == (static_root / hashed).read_bytes()
+
+        assert plain['ETag'] != response['ETag'], 'У сжатого и исходного вариантов разные ETag'
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT_ENCODING='identity').status_code \
+            == 200, 'ETag сжатого варианта не подходит клиенту без сжатия'
+        head = client.head(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert int(head['Content-Length']) == len(body) and head['ETag'] == response['ETag'], \
+            'HEAD отдает размер выбранного варианта'
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == 304, 'Повторный запрос с ETag - 304 без тела'
+
+        response = client.get('/static_files/jquery/dist/jquery.min.js')
+        assert 'immutable' not in response['Cache-Control'], 'Файлы без хэша кэшируются ненадолго'
+
+    def test_accept_encoding(self):
+        assert accepted_encodings('gzip, br;q=0.5, deflate;q=0') == {'gzip', 'br'}
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from posts.models import ChangeLog, Comment, Follow, Post
+
+
+@pytest.fixture(autouse=True)
+def commit_lag(settings):
+    settings.SYNC_COMMIT_LAG = 0
+
+
+def sync(client, since):
+    response = client.get('/api/v1/sync/', {'since': since})
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+class TestSync:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changes_since_cursor(self, api_client, user, author, post):
+        other = Post.objects.create(text='Чужой пост', author=author)
+        cursor = api_client.get('/api/v1/sync/').json()['cursor']
+        assert sync(api_client, cursor)['posts'] == {'created': [], 'updated': [], 'deleted': []}
+
+        new = Post.objects.create(text='Новый пост', author=user)
+        new.text = 'Новый пост, исправленный'
+        new.save()
+        post.text = 'Исправленный пост'
+        post.save()
+        comment = Comment.objects.create(post=other, author=user, text='Комментарий')
+        Follow.objects.create(user=user, author=author)
+        Follow.objects.create(user=author, author=user)
+        other_id = other.pk
+        other.delete()
+
+        data = sync(api_client, cursor)
+        assert data['more'] is False
+        assert [item['text'] for item in data['posts']['created']] == ['Новый пост, исправленный'], \
+            'Созданный и измененный после курсора пост - созданный, в текущем состоянии'
+        assert [item['id'] for item in data['posts']['updated']] == [post.pk]
+        assert data['posts']['deleted'] == [other_id]
+        assert data['comments']['deleted'] == [comment.pk], \
+            'Комментарий, созданный и удаленный вместе с постом, должен прийти как удаленный'
+        assert [item['author'] for item in data['follows']['created']] == ['author'], \
+            'Клиент должен видеть только свои подписки'
+
+        assert sync(api_client, data['cursor'])['posts'] == {'created': [], 'updated': [], 'deleted': []}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_indirect_changes(self, api_client, user, post_with_group):
+        cursor = api_client.get('/api/v1/sync/').json()['cursor']
+        post_with_group.group.delete()
+        user.username = 'renamed'
+        user.save()
+        updated = sync(api_client, cursor)['posts']['updated']
+        assert [(item['author'], item['group']) for item in updated] == [('renamed', None)], \
+            'Пост должен прийти измененным после удаления группы и переименования автора'
+        assert ChangeLog.objects.filter(model=ChangeLog.POST, action=ChangeLog.UPDATED).count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_paging_and_cost(self, api_client, user, settings):
+        settings.SYNC_PAGE_SIZE = 3
+        cursor = api_client.get('/api/v1/sync/').json()['cursor']
+        for i in range(7):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        seen = []
+        while True:
+            with CaptureQueriesContext(connection) as context:
+                data = sync(api_client, cursor)
+            assert len(context) <= 6, 'Число запросов не должно зависеть от размера изменений'
+            seen += [item['text'] for item in data['posts']['created']]
+            cursor = data['cursor']
+            if not data['more']:
+                break
+        assert seen == [f'Пост {i}' for i in range(7)]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_expired_cursor(self, api_client, user):
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        first = ChangeLog.objects.order_by('id').first().pk
+        ChangeLog.objects.update(changed=timezone.now() - timedelta(days=60))
+        call_command('prune_changelog')
+        assert ChangeLog.objects.count() == 1, 'Последняя запись журнала должна сохраняться'
+
+        assert api_client.get('/api/v1/sync/', {'since': first}).status_code == 410, \
+            'Курсор, после которого журнал вычищен, должен давать 410'
+        latest = ChangeLog.objects.get().pk
+        assert sync(api_client, latest)['cursor'] == latest
+        assert api_client.get('/api/v1/sync/', {'since': 'x'}).status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recent_changes_held_back(self, api_client, user, settings):
+        settings.SYNC_COMMIT_LAG = 60
+        old = Post.objects.create(text='Старый пост', author=user)
+        ChangeLog.objects.update(changed=timezone.now() - timedelta(minutes=5))
+        assert api_client.get('/api/v1/sync/').json()['cursor'] == ChangeLog.objects.get().pk
+
+        Post.objects.create(text='Свежий пост', author=user)
+        data = sync(api_client, 0)
+        assert [item['id'] for item in data['posts']['created']] == [old.pk], \
+            'Записи моложе SYNC_COMMIT_LAG не отдаются: транзакции с меньшими id могут быть не зафиксированы'
+        assert sync(api_client, data['cursor'])['cursor'] == data['cursor']
+
+        settings.SYNC_COMMIT_LAG = 0
+        assert [item['text'] for item in sync(api_client, data['cursor'])['posts']['created']] == ['Свежий пост'], \
+            'Задержанная запись приходит со следующим запросом после окна'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_anonymous(self):
+        assert APIClient().get('/api/v1/sync/').status_code == 401
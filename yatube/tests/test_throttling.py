@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from posts.api import throttling
+
+
+class ThrottledView(APIView):
+    throttle_scope = 'test'
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates},
+        }
+    return set_rates
+
+
+def anonymous_request():
+    request = APIView().initialize_request(APIRequestFactory().get('/'))
+    request.user  # noqa: B018 - аутентификация, как в представлении
+    return request
+
+
+class TestSlidingWindowThrottle:
+
+    def test_concurrent_limit(self, rates):
+        rates(test='50/min')
+        allowed = []
+        timings = []
+
+        def worker():
+            request = anonymous_request()
+            for _ in range(20):
+                throttle = throttling.ScopedRateThrottle()
+                started = time.perf_counter()
+                allowed.append(throttle.allow_request(request, ThrottledView()))
+                timings.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert allowed.count(True) == 50, 'Под нагрузкой из нескольких потоков лимит должен соблюдаться точно'
+        average = sum(timings) / len(timings)
+        assert average < 0.02, 'Проверка лимита должна быть дешевой'
+
+    def test_sliding_window(self, rates, monkeypatch):
+        rates(test='10/min')
+        now = [600.0]
+        monkeypatch.setattr(throttling.SlidingWindowThrottle, 'timer', lambda self: now[0])
+        request = anonymous_request()
+
+        def allow():
+            return throttling.ScopedRateThrottle().allow_request(request, ThrottledView())
+
+        assert all(allow() for _ in range(10))
+        throttle = throttling.ScopedRateThrottle()
+        assert not throttle.allow_request(request, ThrottledView())
+        assert 0 < throttle.wait() <= 60
+
+        now[0] = 660.0 + 30
+        assert sum(allow() for _ in range(10)) == 5, 'Половина прошлого окна еще учитывается'
+        now[0] = 780.0
+        assert sum(allow() for _ in range(20)) == 10
+
+    @pytest.mark.django_db(transaction=True)
+    def test_scoped_rates(self, rates, user):
+        rates(read='3/min', write='1/min', token='2/min')
+        client = APIClient()
+        client.force_authenticate(user)
+        assert [client.get('/api/v1/groups/').status_code for _ in range(4)] == [200, 200, 200, 429]
+        assert client.post('/api/v1/posts/', {'text': 'Пост'}).status_code == 201
+        assert client.post('/api/v1/posts/', {'text': 'Пост'}).status_code == 429
+
+        anonymous = APIClient()
+        statuses = [anonymous.post('/api/v1/token/', {'username': 'x', 'password': 'y'}).status_code for _ in range(3)]
+        assert statuses == [401, 401, 429], 'Получение токенов ограничивается своей областью'
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def image_file(name='image.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 800), 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.JOBS_EAGER = True
+    return tmp_path
+
+
+class TestThumbnails:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_generated_after_save(self, media, user, client):
+        post = Post.objects.create(text='Пост с картинкой', author=user, image=image_file())
+        post.refresh_from_db()
+        assert set(post.image_variants) == {'960x339', '480x170'}
+        for variant in post.image_variants.values():
+            assert set(variant) == {'jpeg', 'webp'}
+            assert all((media / name).exists() for name in variant.values())
+        assert variant['webp'].endswith('.webp')
+
+        content = client.get('/').content.decode()
+        assert 'type="image/webp"' in content, 'На странице должны быть WebP-варианты превью'
+
+        post.image = image_file('other.png')
+        post.save()
+        post.refresh_from_db()
+        assert all('other' not in name for name in post.image_variants) and post.image_variants, \
+            'После смены изображения превью должны пересоздаваться'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_never_runs_pillow(self, media, user, client, settings, monkeypatch):
+        settings.JOBS_EAGER = False
+        post = Post.objects.create(text='Пост с картинкой', author=user, image=image_file())
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Страница не должна создавать превью')
+
+        monkeypatch.setattr(thumbnails, 'get_thumbnail', fail)
+        monkeypatch.setattr('sorl.thumbnail.shortcuts.get_thumbnail', fail)
+        content = client.get('/').content.decode()
+        assert f'src="{post.image.url}"' in content, 'Пока превью нет, показывается оригинал'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_background_worker(self, media, user, settings):
+        settings.JOBS_EAGER = False
+        post = Post.objects.create(text='Пост с картинкой', author=user, image=image_file())
+        assert not Post.objects.get(pk=post.pk).image_variants, 'Сохранение поста не должно создавать превью'
+        call_command('runworker', '--burst', '--queues', 'thumbnails', stdout=io.StringIO())
+        assert Post.objects.get(pk=post.pk).image_variants, 'Фоновый обработчик должен создать превью'
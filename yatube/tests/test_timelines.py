@@ -0,0 +1,93 @@
+import pytest
+from django.core.cache import cache
+
+from jobs import queue
+from posts import timelines
+from posts.models import Follow, Post, TimelineEntry
+
+
+def feed_ids(user):
+    page = timelines.TimelinePaginator(Post.objects.feed(), 10, user=user).page()
+    return [post.pk for post in page]
+
+
+class TestTimelines:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fan_out_and_unfollow(self, user, author):
+        old_post = Post.objects.create(text='Старый пост', author=author)
+        Follow.objects.create(user=user, author=author)
+        assert feed_ids(user) == [old_post.pk], 'После подписки в ленте должны появиться посты автора'
+
+        new_post = Post.objects.create(text='Новый пост', author=author)
+        assert feed_ids(user) == [new_post.pk, old_post.pk], 'Новый пост должен попасть в ленту подписчика'
+
+        Follow.objects.filter(user=user, author=author).delete()
+        assert not TimelineEntry.objects.filter(user=user).exists(), 'После отписки лента должна очиститься'
+
+        Post.objects.create(text='Пост после отписки', author=author)
+        assert feed_ids(user) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_delete(self, user, author):
+        Follow.objects.create(user=user, author=author)
+        post = Post.objects.create(text='Пост', author=author)
+        post.delete()
+        assert feed_ids(user) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pull_authors(self, user, author, settings):
+        settings.TIMELINE_FANOUT_LIMIT = 0
+        cache.delete(timelines.PULL_AUTHORS_CACHE_KEY)
+        Follow.objects.create(user=user, author=author)
+        cache.delete(timelines.PULL_AUTHORS_CACHE_KEY)
+        posts = [Post.objects.create(text=f'Пост {i}', author=author) for i in range(3)]
+        try:
+            assert not TimelineEntry.objects.exists(), 'Посты pull-автора не раскладываются по лентам'
+            assert feed_ids(user) == [post.pk for post in reversed(posts)], \
+                'Посты pull-автора должны подмешиваться в ленту при чтении'
+        finally:
+            cache.delete(timelines.PULL_AUTHORS_CACHE_KEY)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_trim(self, user, author, settings):
+        settings.TIMELINE_MAX_LENGTH = 3
+        posts = [Post.objects.create(text=f'Пост {i}', author=author) for i in range(5)]
+        Follow.objects.create(user=user, author=author)
+        assert set(TimelineEntry.objects.values_list('post_id', flat=True)) == {post.pk for post in posts[-3:]}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fan_out_bounded(self, user, author, settings):
+        settings.TIMELINE_MAX_LENGTH = 3
+        settings.JOBS_EAGER = False
+        Follow.objects.create(user=user, author=author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=author) for i in range(5)]
+        assert TimelineEntry.objects.filter(user=user).count() == 5, 'Ленты обрезаются задачей, а не в запросе'
+        queue.work(queues=['timelines'], burst=True)
+        assert TimelineEntry.objects.filter(user=user).count() == 3, \
+            'Раскладка новых постов не должна удлинять ленту сверх TIMELINE_MAX_LENGTH'
+        assert feed_ids(user) == [post.pk for post in reversed(posts[-3:])]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_back_from_pull(self, user, author, settings):
+        settings.JOBS_EAGER = False
+        settings.TIMELINE_FANOUT_LIMIT = 0
+        Follow.objects.create(user=user, author=author)
+        cache.delete(timelines.PULL_AUTHORS_CACHE_KEY)
+        assert timelines.pull_authors() == {author.pk}
+        posts = [Post.objects.create(text=f'Пост {i}', author=author) for i in range(3)]
+        assert not TimelineEntry.objects.exists()
+
+        settings.TIMELINE_FANOUT_LIMIT = 1000
+        cache.delete(timelines.PULL_AUTHORS_CACHE_KEY)
+        assert timelines.pull_authors() == set()
+        queue.work(queues=['timelines'], burst=True)
+        assert feed_ids(user) == [post.pk for post in reversed(posts)], \
+            'Посты, опубликованные в pull-режиме, должны попасть в ленту после возврата к раскладке'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_page(self, user_client, user, author):
+        Follow.objects.create(user=user, author=author)
+        post = Post.objects.create(text='Пост в ленте подписок', author=author)
+        response = user_client.get('/follow/')
+        assert [item.pk for item in response.context['page_obj']] == [post.pk]
@@ -0,0 +1,115 @@
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageFile
+from rest_framework.test import APIClient
+
+from posts.images import LimitedUploadHandler
+from posts.models import Post
+
+
+def jpeg(size=(4000, 3000), orientation=None):
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpeg', buffer.getvalue(), content_type='image/jpeg')
+
+
+def png(size=(300, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'blue').save(buffer, 'PNG')
+    return SimpleUploadedFile('small.png', buffer.getvalue(), content_type='image/png')
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.JOBS_EAGER = False
+    return tmp_path
+
+
+def stored(post):
+    with Image.open(post.image.path) as image:
+        return image.size, dict(image.getexif())
+
+
+class TestUploads:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_downsampled_without_exif(self, media, user_client):
+        user_client.post('/new/', {'text': 'Фото', 'image': jpeg(orientation=6)})
+        post = Post.objects.get()
+        size, exif = stored(post)
+        # ориентация 6 - поворот на 90 градусов: 4000x3000 -> 3000x4000 -> 1920x2560
+        assert size == (1920, 2560), 'Большой оригинал уменьшается с учетом EXIF-ориентации'
+        assert exif == {}, 'EXIF удаляется из сохраненного изображения'
+        assert (post.image_width, post.image_height) == (1920, 2560), 'Размеры записываются в пост'
+        assert post.image.name.endswith('.jpg')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_small_image_kept(self, media, user_client):
+        upload = png()
+        content = upload.read()
+        upload.seek(0)
+        user_client.post('/new/', {'text': 'Картинка', 'image': upload})
+        post = Post.objects.get()
+        with open(post.image.path, 'rb') as file:
+            assert file.read() == content, 'Изображение без EXIF в пределах размеров не пересжимается'
+        assert (post.image_width, post.image_height) == (300, 200)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_limits_checked_before_decoding(self, media, user_client, settings, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError('Изображение сверх пределов не должно декодироваться')
+
+        monkeypatch.setattr(ImageFile.ImageFile, 'load', fail)
+        settings.POST_IMAGE_MAX_PIXELS = 10 ** 6
+
+        def image_errors(upload):
+            response = user_client.post('/new/', {'text': 'Фото', 'image': upload})
+            return ' '.join(response.context['form'].errors['image'])
+
+        assert 'мегапикселей' in image_errors(jpeg())
+        assert 'правильное изображение' in image_errors(SimpleUploadedFile('text.png', b'not an image'))
+        settings.POST_IMAGE_MAX_BYTES = 100
+        assert 'Файл больше' in image_errors(png())
+        assert not Post.objects.exists()
+
+    def test_upload_handler_stops_buffering(self, settings):
+        settings.POST_IMAGE_MAX_BYTES = 1000
+        handler = LimitedUploadHandler()
+        handler.new_file('image', 'big.png', 'image/png', None)
+        chunk, received = b'x' * 400, 0
+        for _ in range(10):
+            handler.receive_data_chunk(chunk, received)
+            received += len(chunk)
+        upload = handler.file_complete(received)
+        assert upload.size == 4000, 'Размер загрузки - полный, чтобы отклонить ее по размеру'
+        assert len(upload.read()) <= 1000, 'Сверх предела загрузка не сохраняется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_upload(self, media, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/v1/posts/', {'text': 'Фото', 'image': jpeg((3000, 1000))}, format='multipart')
+        assert response.status_code == 201, response.content
+        post = Post.objects.get()
+        assert stored(post) == ((2560, 853), {}), 'API принимает изображения тем же конвейером'
+        assert (post.image_width, post.image_height) == (2560, 853)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_does_not_open_image(self, media, user, client, monkeypatch):
+        post = Post.objects.create(text='Пост', author=user, image=png())
+        assert (post.image_width, post.image_height) == (300, 200)
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Шаблон не должен открывать изображение')
+
+        monkeypatch.setattr(Image, 'open', fail)
+        content = client.get('/').content.decode()
+        assert 'width="300" height="200"' in content, 'Размеры изображения берутся из поста'
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from posts.api.pagination import PostCursorPagination
+from posts.api.renderers import FastJSONRenderer
+from posts.api.serializer import PostSerializer
+from posts.api.values import PostValuesSerializer
+from posts.models import Comment, Post
+
+TRICKY_TEXT = 'Кавычки " \\ </script> \n\t \x01     😀 é'
+
+
+@pytest.fixture
+def posts(user, group):
+    posts = [Post.objects.create(text=f'{TRICKY_TEXT} {i}', author=user, group=group if i % 2 else None) for i in range(100)]
+    Post.objects.filter(pk=posts[0].pk).update(image='posts/image.gif')
+    for post in posts[:3]:
+        Comment.objects.create(post=post, author=user, text=TRICKY_TEXT)
+    return posts
+
+
+def best_of(func, runs=5):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class TestValuesSerialization:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_same_bytes(self, api_client, posts, settings, monkeypatch):
+        monkeypatch.setattr(PostCursorPagination, 'page_size', 30)
+        urls = [
+            '/api/v1/posts/',
+            '/api/v1/posts/?q=Кавычки',
+            f'/api/v1/posts/{posts[0].pk}/comments/',
+        ]
+        next_url = api_client.get('/api/v1/posts/').json()['next']
+        urls.append(next_url)
+        for url in urls:
+            fast = api_client.get(url)
+            settings.API_VALUES_LISTS = False
+            regular = api_client.get(url)
+            settings.API_VALUES_LISTS = True
+            assert fast.status_code == regular.status_code == 200
+            assert fast.content == regular.content, f'Быстрый путь должен отдавать те же байты для {url}'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_benchmark(self, posts):
+        request = APIRequestFactory().get('/api/v1/posts/')
+        queryset = Post.objects.feed()[:100]
+
+        def regular():
+            return JSONRenderer().render(PostSerializer(list(queryset.all()), many=True, context={'request': request}).data)
+
+        def fast():
+            serializer = PostValuesSerializer(request)
+            return FastJSONRenderer().render(serializer.serialize(serializer.values(queryset.all())))
+
+        assert fast() == regular()
+        regular_time, fast_time = best_of(regular), best_of(fast)
+        assert fast_time * 2 < regular_time, \
+            f'Сериализация из values() должна быть заметно быстрее сериализатора модели: ' \
+            f'{fast_time * 1000:.1f} мс против {regular_time * 1000:.1f} мс'
@@ -0,0 +1,122 @@
+"""
+Кэш аутентифицированных пользователей.
+
+Токен DRF, JWT и сессия на каждом запросе поднимают из базы токен и
+пользователя. Здесь поля пользователя и связь токена с пользователем
+кэшируются на AUTH_CACHE_TIMEOUT секунд: сигналы (users/signals.py)
+удаляют записи при сохранении пользователя (смена пароля, блокировка)
+и при удалении токена, а TTL ограничивает устаревание в остальных
+случаях (например, update() в обход сигналов).
+
+Кэш общий и лежит на диске, поэтому в нем нет ни хэша пароля, ни
+самого токена: только USER_FIELDS, хэш сессии (HMAC от хэша пароля,
+меняется со сменой пароля) и pk пользователя токена. Пользователь из
+кэша собирается как после only(): остальные поля догружаются из базы
+при обращении, а save() записывает только загруженные поля.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+# поля пользователя, которые нужны аутентификации, правам и шаблонам
+USER_FIELDS = ('username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _token_key(key):
+    # сам токен в ключ кэша не попадает
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def get_user(user_id):
+    """
+    Пользователь по pk из кэша или базы, None - если его нет
+    """
+    cache = _cache()
+    fields = cache.get(_user_key(user_id))
+    if fields is not None:
+        return _build_user(fields)
+    user = get_user_model()._default_manager.filter(pk=user_id).first()
+    if user is not None:
+        fields = {name: getattr(user, name) for name in (user._meta.pk.attname,) + USER_FIELDS}
+        fields['session_auth_hash'] = user.get_session_auth_hash()
+        cache.set(_user_key(user_id), fields, settings.AUTH_CACHE_TIMEOUT)
+    return user
+
+
+def _build_user(fields):
+    fields = dict(fields)
+    session_auth_hash = fields.pop('session_auth_hash')
+    manager = get_user_model()._default_manager
+    # from_db ждет значения в порядке полей модели
+    names = [field.attname for field in manager.model._meta.concrete_fields if field.attname in fields]
+    user = manager.model.from_db(manager.db, names, [fields[name] for name in names])
+    # хэш сессии - из кэша, иначе проверка сессии загрузила бы пароль
+    user.get_session_auth_hash = lambda: session_auth_hash
+    return user
+
+
+def forget_user(user_id):
+    _cache().delete(_user_key(user_id))
+
+
+def forget_token(key):
+    _cache().delete(_token_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который берет токен и пользователя из кэша
+    """
+
+    def authenticate_credentials(self, key):
+        cache = _cache()
+        user_id = cache.get(_token_key(key))
+        if user_id is None:
+            model = self.get_model()
+            user_id = model.objects.filter(key=key).values_list('user_id', flat=True).first()
+            if user_id is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cache.set(_token_key(key), user_id, settings.AUTH_CACHE_TIMEOUT)
+
+        user = get_user(user_id)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, self.get_model()(key=key, user=user))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который берет пользователя из кэша
+    """
+
+    def get_user(self, validated_token):
+        if jwt_settings.USER_ID_FIELD not in ('id', 'pk'):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = get_user(user_id)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
@@ -0,0 +1,14 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .authentication import get_user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который берет пользователя сессии из кэша
+    (users/authentication.py)
+    """
+
+    def get_user(self, user_id):
+        user = get_user(user_id)
+        return user if self.user_can_authenticate(user) else None
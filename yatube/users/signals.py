@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_token, forget_user
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_cached_user(sender, instance, **kwargs):
+    # смена пароля, блокировка и любые другие изменения пользователя;
+    # после коммита: иначе параллельный запрос успел бы снова закэшировать старую строку
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+@receiver(post_delete, sender=Token)
+def forget_cached_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: forget_token(key))
@@ -0,0 +1,34 @@
+from django.contrib.staticfiles.apps import StaticFilesConfig as BaseStaticFilesConfig
+
+
+class StaticFilesConfig(BaseStaticFilesConfig):
+    """
+    collectstatic не копирует в STATIC_ROOT то, что страницы не загружают:
+    исходники и scss библиотек, карты кода, неминифицированные сборки
+    """
+    ignore_patterns = BaseStaticFilesConfig.ignore_patterns + [
+        '*.map',
+        '*.scss',
+        '*.md',
+        '*.ts',
+        '*.flow',
+        '*/package.json',
+        '*/bower.json',
+        '*/AUTHORS.txt',
+        'bootstrap/scss/*',
+        'bootstrap/js/*',
+        'bootstrap/dist/css/bootstrap-*',
+        'bootstrap/dist/css/bootstrap.css',
+        'bootstrap/dist/js/bootstrap.bundle*',
+        'bootstrap/dist/js/bootstrap.js',
+        'jquery/src/*',
+        'jquery/external/*',
+        'jquery/dist/core.js',
+        'jquery/dist/jquery.js',
+        'jquery/dist/jquery.slim*',
+        'popper.js/index*',
+        'popper.js/dist/esm/*',
+        'popper.js/dist/umd/*',
+        'popper.js/dist/popper-utils*',
+        'popper.js/dist/popper.js',
+    ]
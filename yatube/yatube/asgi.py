@@ -3,15 +3,31 @@ ASGI config for yatube project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Запросы /events/ обслуживают долгоживущие потоки server-sent events
+(posts/sse.py), все остальные - Django; потоковые ответы Django
+(выгрузка) перебираются вне цикла событий (yatube/handlers.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from yatube.handlers import StreamingASGIHandler
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+django_application = StreamingASGIHandler()
+
+from posts import sse  # noqa: E402 - после настройки Django
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and sse.is_events_path(scope['path']):
+        return await sse.application(scope, receive, send)
+    return await django_application(scope, receive, send)
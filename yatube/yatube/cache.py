@@ -0,0 +1,372 @@
+"""
+Кэш-бэкенды проекта.
+
+SQLiteCache - общий для всех процессов кэш в отдельном файле SQLite:
+add() и incr() атомарны между процессами, поэтому на нем работают
+блокировки и счетчики.
+
+TwoTierCache - двухуровневый кэш: небольшой LRU с коротким TTL внутри
+процесса перед общим кэшем. Промах по горячему ключу в get_or_set()
+пересчитывается один раз (single-flight): остальные потоки и процессы
+ждут, пока значение не появится в общем кэше.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кэш в файле SQLite (LOCATION - путь к файлу). Устаревшие и лишние
+    записи вычищаются не на каждой записи, а раз в CULL_EVERY записей.
+    Соединение открывается одно на поток и не закрывается после запроса.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._cull_every = int(params.get('OPTIONS', {}).get('CULL_EVERY', 100))
+        self._writes = 0
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _write(self):
+        """
+        Транзакция с блокировкой на запись: изменения атомарны между процессами
+        """
+        return _Transaction(self._connection)
+
+    @staticmethod
+    def _alive(expires):
+        return expires is None or expires > time.time()
+
+    def _fetch(self, key):
+        row = self._connection.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or not self._alive(row[1]):
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def _store(self, key, value, timeout):
+        self._connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, self.pickle_protocol), self.get_backend_timeout(timeout)),
+        )
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self._cull_every:
+            return
+        connection = self._connection
+        connection.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        value = self._fetch(key)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        if not made:
+            return {}
+        placeholders = ', '.join('?' * len(made))
+        rows = self._connection.execute(
+            f'SELECT key, value, expires FROM cache WHERE key IN ({placeholders})', list(made)
+        ).fetchall()
+        return {made[key]: pickle.loads(value) for key, value, expires in rows if self._alive(expires)}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write():
+            self._cull()
+            self._store(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write():
+            if self._fetch(key) is not _MISSING:
+                return False
+            self._cull()
+            self._store(key, value, timeout)
+            return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write():
+            if self._fetch(key) is _MISSING:
+                return False
+            self._connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ?', (self.get_backend_timeout(timeout), key)
+            )
+            return True
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+        return bool(cursor.rowcount)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._fetch(key) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write():
+            value = self._fetch(key)
+            if value is _MISSING:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            self._connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?', (pickle.dumps(value, self.pickle_protocol), key)
+            )
+            return value
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+
+class _Transaction:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+class _LocalStore:
+    """
+    LRU с TTL внутри процесса, общий для всех потоков
+    """
+
+    def __init__(self):
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.key_locks = {}
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return _MISSING
+            expires, value = item
+            if expires <= time.monotonic():
+                del self.data[key]
+                return _MISSING
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, max_entries):
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def key_lock(self, key):
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def release_key_lock(self, key, lock):
+        with self.lock:
+            if not lock.locked() and self.key_locks.get(key) is lock:
+                del self.key_locks[key]
+
+
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Двухуровневый кэш. LOCATION - имя локального уровня, OPTIONS:
+
+    SHARED: алиас общего кэша из settings.CACHES
+    LOCAL_MAX_ENTRIES: размер LRU внутри процесса
+    LOCAL_TIMEOUT: сколько секунд значение живет в локальном уровне,
+        это же верхняя граница устаревания между процессами
+    LOCK_TIMEOUT: сколько секунд держится блокировка пересчета ключа
+    LOCK_POLL_INTERVAL: как часто ждущие проверяют общий кэш
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 1000))
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self._lock_timeout = float(options.get('LOCK_TIMEOUT', 10))
+        self._lock_poll_interval = float(options.get('LOCK_POLL_INTERVAL', 0.05))
+        with _local_stores_lock:
+            self._local = _local_stores.setdefault(location, _LocalStore())
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_ttl(self, timeout):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        if timeout is None:
+            return self._local_timeout
+        return min(self._local_timeout, timeout)
+
+    def _remember(self, key, value, timeout=DEFAULT_TIMEOUT):
+        ttl = self._local_ttl(timeout)
+        if ttl > 0:
+            self._local.set(key, pickle.dumps(value, self.pickle_protocol), ttl, self._local_max_entries)
+
+    def _local_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        value = self._local.get(local_key)
+        if value is not _MISSING:
+            return pickle.loads(value)
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._remember(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._local.get(self._local_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(value)
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                self._remember(self._local_key(key, version), value)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(local_key, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local.delete(self._local_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(self._local_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self.shared.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout, version=version)
+            return self.get(key, default, version=version)
+
+        local_key = self._local_key(key, version)
+        key_lock = self._local.key_lock(local_key)
+        try:
+            # потоки процесса ждут друг друга здесь, процессы - на блокировке в общем кэше
+            with key_lock:
+                value = self.get(key, _MISSING, version=version)
+                if value is not _MISSING:
+                    return value
+                return self._compute_once(key, local_key, default, timeout, version)
+        finally:
+            self._local.release_key_lock(local_key, key_lock)
+
+    def _compute_once(self, key, local_key, default, timeout, version):
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + self._lock_timeout
+        while True:
+            if self.shared.add(lock_key, 1, self._lock_timeout, version=version):
+                try:
+                    value = default()
+                    self.set(key, value, timeout, version=version)
+                    return value
+                finally:
+                    self.shared.delete(lock_key, version=version)
+
+            time.sleep(self._lock_poll_interval)
+            value = self.shared.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self._remember(local_key, value, timeout)
+                return value
+            if time.monotonic() > deadline:
+                # держатель блокировки не успел или упал - считаем сами
+                value = default()
+                self.set(key, value, timeout, version=version)
+                return value
@@ -0,0 +1,52 @@
+"""
+Обработчик ASGI для Django.
+
+Django 3.2 перебирает потоковые ответы (StreamingHttpResponse) прямо в
+цикле событий, поэтому генератор, читающий базу по блокам, как выгрузка
+posts/export.py, падает с SynchronousOnlyOperation уже после отправки
+заголовков. StreamingASGIHandler перебирает такие ответы в отдельном
+потоке - одном на ответ, чтобы курсор и соединение с базой, открытые
+генератором, оставались в одном потоке, - и закрывает это соединение
+в конце.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections
+
+_END = object()
+
+
+class StreamingASGIHandler(ASGIHandler):
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((b'Set-Cookie', cookie.output(header='').encode('ascii').strip()))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+
+        loop = asyncio.get_running_loop()
+        parts = iter(response)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='streaming-response') as executor:
+            try:
+                while True:
+                    part = await loop.run_in_executor(executor, next, parts, _END)
+                    if part is _END:
+                        break
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            finally:
+                await loop.run_in_executor(executor, connections.close_all)
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
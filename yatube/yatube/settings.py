@@ -47,6 +47,7 @@ INTERNAL_IPS = [
 INSTALLED_APPS = [
     'posts',
     'users',
+    'jobs',
     'django.contrib.sites',
     'django.contrib.flatpages',
     'django.contrib.admin',
@@ -54,7 +55,7 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    'yatube.apps.StaticFilesConfig',
     'rest_framework.authtoken',
     "debug_toolbar",
     'sorl.thumbnail',
@@ -66,6 +67,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    'yatube.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -149,6 +151,13 @@ STATIC_URL = '/static_files/'
 
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
+# collectstatic пишет файлы с хэшем содержимого в имени и сжатые варианты
+# (yatube/staticfiles.py); StaticFilesMiddleware отдает файлы с хэшем
+# с immutable на год, остальные - на STATIC_MAX_AGE секунд
+STATICFILES_STORAGE = 'yatube.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_MAX_AGE = 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -157,21 +166,54 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Пользователь сессии берется из кэша (users/backends.py)
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+
+# Кэш аутентифицированных пользователей и токенов (users/authentication.py):
+# изменения пользователя и удаление токена сбрасывают его сразу, остальное
+# устаревает не дольше чем за AUTH_CACHE_TIMEOUT секунд
+AUTH_CACHE_ALIAS = 'default'
+AUTH_CACHE_TIMEOUT = 60
+
+# Сессии читаются из общего кэша и пишутся в базу; выход из аккаунта
+# сразу виден всем процессам. DJANGO_SESSION_ENGINE переопределяет движок,
+# например django.contrib.sessions.backends.db
+SESSION_ENGINE = os.getenv('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'shared'
+
 # Login
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 LOGOUT_REDIRECT_URL = "index"
 
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Письма отправляются задачами очереди (jobs/mail.py) через JOBS_EMAIL_BACKEND
+EMAIL_BACKEND = "jobs.mail.QueuedEmailBackend"
+JOBS_EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 SITE_ID = 1
 
+# Двухуровневый кэш: LRU внутри процесса перед общим для всех процессов
+# кэшем в SQLite (yatube/cache.py). Значение в локальном уровне живет не
+# дольше LOCAL_TIMEOUT секунд - это граница устаревания между процессами.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'yatube.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
 
 REST_FRAMEWORK = {
@@ -180,20 +222,25 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedTokenAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
 
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'posts.api.throttling.UserRateThrottle',
+        'posts.api.throttling.AnonRateThrottle',
+        'posts.api.throttling.ScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'user': '10000/day',
         'anon': '1000/day',
+        # ScopedRateThrottle: чтение, запись и получение токенов
+        'read': '600/min',
+        'write': '60/min',
+        'token': '10/min',
     },
 
     'DEFAULT_FILTER_BACKENDS': [
@@ -201,6 +248,108 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Счетчики ограничения частоты запросов к API (posts/api/throttling.py)
+# должны быть общими для всех процессов
+THROTTLE_CACHE_ALIAS = 'shared'
+
+# Кэш страниц для анонимных посетителей (posts/page_cache.py): страницы
+# крупные, поэтому хранятся только в общем кэше, без копий в процессах
+PAGE_CACHE_ALIAS = 'shared'
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Ленты подписок: авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+# не раскладываются по лентам при публикации, а подмешиваются при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+# Максимальная длина материализованной ленты одного пользователя
+TIMELINE_MAX_LENGTH = 1000
+
+# Полнотекстовый поиск по постам: сколько слов запроса учитывать и
+# конфигурация словаря для PostgreSQL (по ней же миграция 0007_post_search
+# строит GIN-индекс; после смены индекс нужно пересоздать)
+SEARCH_MAX_WORDS = 10
+SEARCH_CONFIG = 'russian'
+
+# Превью изображений постов (posts/thumbnails.py): размеры с опциями
+# sorl-thumbnail и форматы; превью создаются задачами очереди 'thumbnails'
+POST_IMAGE_VARIANTS = {
+    '960x339': {'crop': 'center', 'upscale': True},
+    '480x170': {'crop': 'center', 'upscale': True},
+}
+POST_IMAGE_FORMATS = ('JPEG', 'WEBP')
+
+# Загрузка изображений постов (posts/images.py): загрузки пишутся на диск
+# блоками; предел размера файла в байтах и в пикселях (проверяется по
+# заголовку до декодирования), допустимые форматы, до какой большей
+# стороны уменьшать оригинал и качество пересжатия
+FILE_UPLOAD_HANDLERS = ['posts.images.LimitedUploadHandler']
+POST_IMAGE_MAX_BYTES = 20 * 2 ** 20
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+POST_IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_QUALITY = 85
+
+# Списки постов и комментариев в JSON API сериализуются из values()
+# (posts/api/values.py), False - через обычные сериализаторы моделей
+API_VALUES_LISTS = True
+# ?embed=comments в API постов: сколько последних комментариев встраивать
+# по умолчанию и сколько можно запросить через ?embed=comments:N
+API_EMBED_COMMENTS = 3
+API_EMBED_COMMENTS_MAX = 20
+
+# Сколько комментариев показывать на странице поста и подгружать за раз
+COMMENTS_PAGE_SIZE = 20
+
+# Выгрузка постов и комментариев (posts/export.py): строк в одном блоке
+EXPORT_CHUNK_SIZE = 2000
+
+# Сколько операций можно передать в один запрос /api/v1/batch/
+BATCH_MAX_OPERATIONS = 100
+
+# Сколько авторов можно передать в /api/v1/follow/bulk/ и /api/v1/follow/import/
+FOLLOW_BULK_MAX = 1000
+FOLLOW_IMPORT_MAX = 5000
+
+# Рекомендации авторов (posts/recommendations.py): сколько хранить на
+# пользователя, за сколько дней и с каким весом учитывать активность автора
+RECOMMENDATIONS_PER_USER = 20
+RECOMMENDATIONS_ACTIVITY_DAYS = 30
+RECOMMENDATIONS_ACTIVITY_WEIGHT = 0.5
+# сколько рекомендаций показывать на страницах
+RECOMMENDATIONS_SHOWN = 5
+# через сколько секунд после подписки пересчитывать рекомендации задачей
+# очереди: подписки за это время учитываются одним пересчетом
+RECOMMENDATIONS_REFRESH_DELAY = 60
+
+# Синхронизация через журнал изменений (/api/v1/sync/): сколько записей
+# журнала читать за один ответ и сколько дней их хранить
+SYNC_PAGE_SIZE = 1000
+SYNC_RETENTION_DAYS = 30
+# записи журнала моложе стольких секунд не отдаются: транзакции с
+# меньшими id могут быть еще не зафиксированы (см. posts/changelog.py)
+SYNC_COMMIT_LAG = 5
+
+# Потоки server-sent events (posts/sse.py): брокер событий, размер очереди
+# одного соединения, сколько пропущенных событий отдавать при
+# переподключении и как часто писать keepalive (секунды)
+EVENTS_BROKER = 'posts.events.LocalBroker'
+EVENTS_QUEUE_SIZE = 100
+EVENTS_REPLAY_LIMIT = 50
+EVENTS_KEEPALIVE = 15
+
+# Очередь фоновых задач (jobs/queue.py, manage.py runworker): выполнять
+# ли задачи сразу после фиксации транзакции без обработчика, сколько
+# попыток давать задаче, задержка первого повтора и предел задержки
+# (секунды), на сколько секунд задача закрепляется за обработчиком и
+# сколько задач очереди могут выполняться одновременно
+JOBS_EAGER = bool(strtobool(os.getenv('DJANGO_JOBS_EAGER', 'no')))
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 3600
+JOBS_LEASE = 600
+JOBS_QUEUE_CONCURRENCY = {
+    'thumbnails': 2,
+}
+
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^/api/.*$'
 
@@ -0,0 +1,221 @@
+"""
+Статические файлы с хэшем в имени, заранее сжатыми вариантами и
+бессрочным кэшированием.
+
+CompressedManifestStaticFilesStorage (STATICFILES_STORAGE) при
+collectstatic пишет файлы с хэшем содержимого в имени и манифест
+staticfiles.json, как ManifestStaticFilesStorage, а для текстовых
+файлов - рядом варианты .gz и, если установлен brotli, .br. Исходники,
+карты кода и неминифицированные сборки библиотек в STATIC_ROOT не
+попадают (StaticFilesConfig.ignore_patterns в yatube/apps.py).
+
+StaticFilesMiddleware отдает файлы из STATIC_ROOT до остальных
+middleware: вариант выбирается по Accept-Encoding (у каждого варианта
+свой ETag и Content-Length), файлы с хэшем в
+имени - с Cache-Control: immutable на STATIC_IMMUTABLE_MAX_AGE секунд,
+остальные - на STATIC_MAX_AGE. Список файлов строится один раз и
+перечитывается, когда collectstatic обновит манифест.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli не обязателен
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.svg', '.txt', '.xml', '.yaml', '.html', '.eot', '.ttf')
+# файлы меньше этого размера и не сжимающиеся хотя бы на 5% не сжимаем
+MIN_SIZE = 256
+MIN_RATIO = 0.95
+
+
+def compress(data):
+    """
+    {расширение: сжатые данные} для вариантов, которые есть смысл хранить
+    """
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: value for suffix, value in variants.items() if len(value) < len(data) * MIN_RATIO}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage с вариантами .gz/.br. Без манифеста (в
+    разработке, до первого collectstatic) адреса строятся без хэша.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            with self.open(name) as file:
+                data = file.read()
+            if len(data) < MIN_SIZE:
+                continue
+            for suffix, content in compress(data).items():
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(content))
+                yield name, name + suffix, True
+
+
+def accepted_encodings(header):
+    """
+    Кодировки из Accept-Encoding, которые клиент принимает (q > 0)
+    """
+    accepted = set()
+    for part in header.split(','):
+        encoding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    """
+    Файл из STATIC_ROOT с заранее сжатыми вариантами
+    """
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.last_modified = int(stat.st_mtime)
+        tag = f'{int(stat.st_mtime):x}-{stat.st_size:x}'
+        # тип - по исходному файлу, а не по .gz/.br
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.immutable = immutable
+        # (кодировка, путь, размер, ETag) в порядке предпочтения, исходный
+        # файл - последним; у каждого варианта свой ETag
+        self.variants = []
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            try:
+                size = os.stat(path + suffix).st_size
+            except OSError:
+                continue
+            self.variants.append((encoding, path + suffix, size, f'"{tag}-{encoding}"'))
+        self.compressed = bool(self.variants)
+        self.variants.append((None, path, stat.st_size, f'"{tag}"'))
+
+    def pick(self, accept_encoding):
+        """
+        (кодировка, путь, размер, ETag) варианта для Accept-Encoding
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for variant in self.variants:
+            if variant[0] is None or variant[0] in accepted:
+                return variant
+
+
+def scan(root, immutable_names):
+    """
+    {имя: StaticFile} для всех файлов root, кроме самих сжатых вариантов
+    """
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if name.endswith(('.gz', '.br')) and os.path.isfile(path[:-3]):
+                continue
+            files[name] = StaticFile(path, name in immutable_names)
+    return files
+
+
+class StaticFilesMiddleware:
+    """
+    Отдача STATIC_ROOT с выбором сжатого варианта и кэшированием
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.files = {}
+        self.version = None
+
+    def load(self):
+        """
+        Файлы STATIC_ROOT; перечитываются после нового collectstatic
+        """
+        root = settings.STATIC_ROOT
+        manifest = os.path.join(root or '', ManifestStaticFilesStorage.manifest_name)
+        try:
+            version = (root, os.stat(manifest).st_mtime_ns)
+        except OSError:
+            version = (root, None)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    storage = ManifestStaticFilesStorage(location=root)
+                    immutable = set(storage.load_manifest().values()) if version[1] else set()
+                    self.files = scan(root, immutable) if root and os.path.isdir(root) else {}
+                    self.version = version
+        return self.files
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(settings.STATIC_URL):
+            name = posixpath.normpath(request.path_info[len(settings.STATIC_URL):]).lstrip('/')
+            static_file = self.load().get(name)
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def serve(self, request, static_file):
+        encoding, path, size, etag = static_file.pick(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        max_age = settings.STATIC_IMMUTABLE_MAX_AGE if static_file.immutable else settings.STATIC_MAX_AGE
+        headers = {
+            'Cache-Control': f'public, max-age={max_age}' + (', immutable' if static_file.immutable else ''),
+            'ETag': etag,
+            'Last-Modified': http_date(static_file.last_modified),
+        }
+        if static_file.compressed:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if (
+            (if_none_match and etag in if_none_match)
+            or (if_none_match is None and if_modified_since and if_modified_since >= static_file.last_modified)
+        ):
+            response = HttpResponseNotModified()
+        else:
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=static_file.content_type)
+            else:
+                response = FileResponse(
+                    open(path, 'rb'), content_type=static_file.content_type,
+                    filename=os.path.basename(static_file.path),
+                )
+            # размер отдаваемого варианта, и для HEAD тоже
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        for header, value in headers.items():
+            response[header] = value
+        return response
@@ -20,6 +20,10 @@ from django.contrib.flatpages import views
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from posts.page_cache import cache_anonymous_page, flatpage_scopes
+
+
+flatpage = cache_anonymous_page(flatpage_scopes)(views.flatpage)
 
 handler404 = "posts.views.page_not_found"
 handler500 = "posts.views.server_error"
@@ -28,7 +32,7 @@ urlpatterns = [
     # раздел администратора
     path('admin/', admin.site.urls),
     # flatpages
-    path('about/', include('django.contrib.flatpages.urls')),
+    path('about/<path:url>', flatpage, name='django.contrib.flatpages.views.flatpage'),
     # регистрация и авторизация
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
@@ -41,13 +45,13 @@ urlpatterns = [
 ]
 
 urlpatterns += [
-        path('about-us/', views.flatpage, {'url': '/about-us/'}, name='about'),
-        path('terms/', views.flatpage, {'url': '/terms/'}, name='terms'),
+        path('about-us/', flatpage, {'url': '/about-us/'}, name='about'),
+        path('terms/', flatpage, {'url': '/terms/'}, name='terms'),
 ]
 
 urlpatterns += [
-        path('about-author/', views.flatpage, {'url': '/about-author/'}, name='about-author'),
-        path('about-spec/', views.flatpage, {'url': '/about-spec/'}, name='about-spec'),
+        path('about-author/', flatpage, {'url': '/about-author/'}, name='about-author'),
+        path('about-spec/', flatpage, {'url': '/about-spec/'}, name='about-spec'),
 ]
 
 if settings.DEBUG: